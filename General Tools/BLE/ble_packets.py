@@ -0,0 +1,122 @@
+"""Fixed-layout binary packets for the BLE peripherals (controller, car, OpenMV).
+
+Copy this file onto every hub / camera that uses it, next to BLE_CEEO.py,
+and add it to the PyScript page's files for the browser side. The browser
+turns packets into channel JSON and back; over BLE only packets go.
+
+Every packet starts with its type and a sequence number (0-255, wrapping),
+is little-endian and fits in one 20-byte BLE notification:
+
+    AXES  controller tilt    x, y (milli-g)                            6 bytes
+    CAR   drive command      x, y (milli-g), flags (SPIN)              7 bytes
+    TAG   biggest tag seen   flags (DETECTED), id, x, y (pixels),
+                             distance (mm), rotation (degrees), area  17 bytes
+"""
+import struct
+
+AXES = 1
+CAR = 2
+TAG = 3
+
+FORMATS = {
+    AXES: '<BBhh',
+    CAR: '<BBhhB',
+    TAG: '<BBBHhhHhI',
+}
+SIZES = {kind: struct.calcsize(layout) for kind, layout in FORMATS.items()}
+
+SPIN = 0x01  # CAR: hit by a banana
+DETECTED = 0x01  # TAG: a tag is in view
+
+class Packer:
+    """Builds numbered packets of one type in one reused buffer"""
+    def __init__(self, kind):
+        self.kind = kind
+        self.layout = FORMATS[kind]
+        self.buffer = bytearray(SIZES[kind])
+        self.seq = 0
+
+    def pack(self, *values):
+        """The next packet; only valid until the next pack()"""
+        struct.pack_into(self.layout, self.buffer, 0, self.kind, self.seq, *values)
+        self.seq = (self.seq + 1) & 0xFF
+        return self.buffer
+
+def unpack(data):
+    """(type, seq, values) of one packet; ValueError if it isn't one"""
+    if not data or data[0] not in FORMATS or len(data) != SIZES[data[0]]:
+        raise ValueError("not a packet")
+    values = struct.unpack(FORMATS[data[0]], data)
+    return values[0], values[1], values[2:]
+
+# How far back a sequence number still counts as late, and how far ahead
+# it still counts as lost packets in between. Anything else means the
+# sender restarted, which is not counted as loss - and so does a 0 that
+# would otherwise look late, since every sender starts at 0. A 0 shortly
+# after the wrap (254, lost 255, 0) is still just loss.
+LATE_WINDOW = 16
+LOSS_WINDOW = 64
+
+def tag_message(values):
+    """A TAG packet's values as the JSON message the camera used to send"""
+    flags, tag_id, x, y, distance_mm, rotation, area = values
+    return {"detected": bool(flags & DETECTED), "tag_id": tag_id, "x": x, "y": y,
+            "distance": distance_mm / 1000, "rotation": rotation, "area": area}
+
+class Sequence:
+    """Counts lost packets and spots late ones from the sequence numbers"""
+    def __init__(self):
+        self.last = None
+        self.received = 0
+        self.lost = 0
+        self.late = 0
+        self.restarts = 0
+
+    def check(self, seq):
+        """False for a packet that is older than (or repeats) the last one"""
+        self.received += 1
+        if self.last is not None:
+            step = (seq - self.last) & 0xFF
+            if LOSS_WINDOW < step <= 256 - LATE_WINDOW or (seq == 0 and step > LOSS_WINDOW):
+                self.restarts += 1
+            elif step == 0 or step > 256 - LATE_WINDOW:
+                self.late += 1
+                return False
+            else:
+                self.lost += step - 1
+        self.last = seq
+        return True
+
+def benchmark(rounds=1000):
+    """Time building and parsing a tag report as JSON and as a packet"""
+    import json
+    import time
+    message = {"detected": True, "tag_id": 1, "x": 80, "y": 60,
+               "distance": 0.42, "rotation": 87, "area": 900}
+    packer = Packer(TAG)
+    ticks = getattr(time, 'ticks_us', None)
+    now = ticks if ticks else lambda: int(time.perf_counter() * 1000000)
+
+    start = now()
+    for _ in range(rounds):
+        text = json.dumps(message)
+    json_build = now() - start
+    start = now()
+    for _ in range(rounds):
+        value = json.loads(text)
+        float(value["x"]), float(value["y"]), float(value["distance"])
+    json_parse = now() - start
+
+    start = now()
+    for _ in range(rounds):
+        packet = packer.pack(DETECTED, 1, 80, 60, 420, 87, 900)
+    packet_build = now() - start
+    start = now()
+    for _ in range(rounds):
+        kind, seq, values = unpack(packet)
+    packet_parse = now() - start
+
+    print("JSON:   {} bytes, build {:.1f} us, parse {:.1f} us".format(
+        len(text), json_build / rounds, json_parse / rounds))
+    print("Packet: {} bytes, build {:.1f} us, parse {:.1f} us".format(
+        len(packet), packet_build / rounds, packet_parse / rounds))
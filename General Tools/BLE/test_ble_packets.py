@@ -0,0 +1,30 @@
+"""Sequence number bookkeeping: python -m pytest test_ble_packets.py"""
+from ble_packets import Sequence, Packer, unpack, CAR
+
+def check_all(seqs):
+    sequence = Sequence()
+    accepted = [sequence.check(seq) for seq in seqs]
+    return accepted, (sequence.lost, sequence.late, sequence.restarts)
+
+def test_in_order_and_across_the_wrap():
+    assert check_all([253, 254, 255, 0, 1]) == ([True] * 5, (0, 0, 0))
+
+def test_lost_255_is_loss_not_a_restart():
+    assert check_all([253, 254, 0, 1]) == ([True] * 4, (1, 0, 0))
+
+def test_gap_and_late_packet():
+    assert check_all([0, 1, 2, 4, 3, 5, 5]) == ([True, True, True, True, False, True, False], (1, 2, 0))
+
+def test_restart_at_0():
+    # Soon after the sender's own start, and well into its count
+    assert check_all([5, 6, 7, 0, 1]) == ([True] * 5, (0, 0, 1))
+    assert check_all([100, 101, 0, 1]) == ([True] * 4, (0, 0, 1))
+
+def test_restart_missing_its_first_packets():
+    assert check_all([10, 11, 200, 201]) == ([True] * 4, (0, 0, 1))
+    assert check_all([100, 101, 3, 4]) == ([True] * 4, (0, 0, 1))
+
+def test_packer_round_trip():
+    packer = Packer(CAR)
+    packer.pack(-120, 450, 0)
+    assert unpack(bytes(packer.pack(3, -4, 1))) == (CAR, 1, (3, -4, 1))
@@ -2,26 +2,28 @@ import time
 from hub import motion_sensor
 from BLE_CEEO import Yell, Listen
 import time
-import json
 from hub import light_matrix, port
 import motor
-import ujson
+import ble_packets
+
+received = ble_packets.Sequence()
 
 def callback(data):
     try:   
-        print("RECEIVED: ", data)
-        decoded_data = data.decode()
-        controller_data = json.loads(decoded_data)
+        kind, seq, values = ble_packets.unpack(data)
+        print("RECEIVED: ", kind, seq, values)
+        if kind != ble_packets.CAR or not received.check(seq):
+            return  # not a drive command, or older than the last one
+        controller_x, controller_y, flags = values
         
         # x and y SWITCHED bc my controller is built sideways
-        x_raw = float(controller_data.get("y", 0))
-        y_raw = float(controller_data.get("x", 0))
+        x_raw = controller_y
+        y_raw = controller_x
         x = x_raw / 1000.0
         y = y_raw / 1000.0
         
         try:
-            spin = float(controller_data.get("s", 0))
-            if (spin == True):
+            if flags & ble_packets.SPIN:
                 print("HIT BY BANANA")
                 # sound.beep(440)
                 motor.run(port.A, 500)
@@ -61,8 +63,8 @@ def callback(data):
         motor.run(port.B, int(right_speed))
         print("Motors: left {}, right {}".format(int(left_speed), int(right_speed)))
         
-    except json.JSONDecodeError as e:
-        print("JSON decode error:", e)
+    except ValueError as e:
+        print("Packet error:", e)
     except Exception as e:
         print("Callback error: {}".format(e))
 
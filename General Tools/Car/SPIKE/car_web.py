@@ -1,8 +1,15 @@
-import json
+from ble_packets import Packer, CAR, SPIN
 
-controller_data = {"x": 0, "y": 0}
+# Channel JSON comes in; the car only gets CAR packets
+controller_data = {"x": 0, "y": 0, "s": False}
+packer = Packer(CAR)
 print("Starting...")
 
+async def send_to_car():
+    packet = packer.pack(int(controller_data["x"]), int(controller_data["y"]),
+                         SPIN if controller_data["s"] else 0)
+    await myBle.write(list(packet))
+
 async def fred(message):
     try:
         topic, value = myChannel.check('/Controller/data', message)
@@ -10,15 +17,13 @@ async def fred(message):
             controller_data["x"] = value.get("x", 0)
             controller_data["y"] = value.get("y", 0)
             
-            combined_data = json.dumps(controller_data)
-            await myBle.send_str(combined_data)
+            await send_to_car()
             return  # Keep the early exit?
         
         topic, value = myChannel.check('/Car_Location_1/Peeled', message)
         if topic:
-            controller_data["s"] = value
-            combined_data = json.dumps(controller_data)
-            await myBle.send_str(combined_data)
+            controller_data["s"] = bool(value)
+            await send_to_car()
             
     except Exception as e:
         print('Error in controller handler:', e)
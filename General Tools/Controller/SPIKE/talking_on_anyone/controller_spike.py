@@ -2,7 +2,7 @@ import time
 from hub import motion_sensor
 from BLE_CEEO import Yell, Listen
 import time
-import json
+import ble_packets
 
 # === Configuration ===
 SAMPLES_PER_SEND = 5  # Number of samples to average before sending (over 0.25s)
@@ -10,6 +10,7 @@ SAMPLES_PER_SEND = 5  # Number of samples to average before sending (over 0.25s)
 # === Global variables ===
 x_buffer = []
 y_buffer = []
+packer = ble_packets.Packer(ble_packets.AXES)
 
 def sample_and_average():
     """Take multiple samples over ~0.25s and return averaged values"""
@@ -38,10 +39,9 @@ def sample_and_average():
         return 0, 0
 
 def grabData():
-    """Get averaged IMU data"""
+    """Get averaged IMU data as an AXES packet (see ble_packets.py)"""
     x_avg, y_avg = sample_and_average()
-    message = {'x': x_avg, 'y': y_avg}
-    return str(json.dumps(message))
+    return packer.pack(x_avg, y_avg)
 
 def peripheral(name): 
     try:
@@ -53,7 +53,7 @@ def peripheral(name):
             while p.is_connected:
                 data = grabData()
                 p.send(data)
-                print("Sent:", data)
+                print("Sent:", ble_packets.unpack(data))
                 time.sleep(0.3)
             print('lost connection')
     except Exception as e:
@@ -1,8 +1,13 @@
-import json
+from ble_packets import unpack, AXES, Sequence
+
+# The hub sends AXES packets; they only become channel JSON here
+received = Sequence()
 
 async def myCallback(message):
-    value = json.loads(message.decode())
-    controller_data = { 'x': value['x'], 'y': value['y'] }
+    kind, seq, values = unpack(bytes(message))
+    if kind != AXES or not received.check(seq):
+        return
+    controller_data = { 'x': values[0], 'y': values[1] }
     await myChannel.post('/Controller/data', controller_data)
 
 myBle.callback = myCallback
@@ -1,8 +1,8 @@
 import sensor
 import time
 import math
-import json
 from BLE_CEEO import Yell, Listen
+import ble_packets
 
 # === Configuration ===
 TAG_SIZE = 0.06  # Tag size in meters (6cm)
@@ -28,39 +28,28 @@ def calculate_distance(tag):
     return 0
 
 # === Tag Detection ===
-def grabData():
-    message = {
-        "detected": False,
-        "tag_id": 0,
-        "x": 0,
-        "y": 0,
-        "distance": 0,
-        "rotation": 0,
-        "area": 0
-    }
+packer = ble_packets.Packer(ble_packets.TAG)
 
+def grabData():
+    """The largest tag in view as a TAG packet (see ble_packets.py)"""
     img = sensor.snapshot()
     tags = img.find_apriltags()
 
-    if tags:
-        # Find the largest tag
-        tag = max(tags, key=lambda t: t.w * t.h)
+    if not tags:
+        return packer.pack(0, 0, 0, 0, 0, 0, 0)
 
-        message["detected"] = True
-        message["tag_id"] = tag.id
-        message["x"] = tag.cx
-        message["y"] = tag.cy
-        message["distance"] = calculate_distance(tag)
-        message["rotation"] = int(math.degrees(tag.rotation))
-        message["area"] = tag.w * tag.h
+    # Find the largest tag
+    tag = max(tags, key=lambda t: t.w * t.h)
+    distance = calculate_distance(tag)
 
-        # Draw detection visualization
-        img.draw_rectangle(tag.rect, color=(255, 0, 0))
-        img.draw_cross(tag.cx, tag.cy, color=(0, 255, 0))
-        img.draw_string(tag.cx - 20, tag.cy - 30, "ID:" + str(tag.id), color=(255, 255, 255))
-        img.draw_string(tag.cx - 20, tag.cy - 20, "{:.2f}m".format(message["distance"]), color=(255, 255, 255))
+    # Draw detection visualization
+    img.draw_rectangle(tag.rect, color=(255, 0, 0))
+    img.draw_cross(tag.cx, tag.cy, color=(0, 255, 0))
+    img.draw_string(tag.cx - 20, tag.cy - 30, "ID:" + str(tag.id), color=(255, 255, 255))
+    img.draw_string(tag.cx - 20, tag.cy - 20, "{:.2f}m".format(distance), color=(255, 255, 255))
 
-    return str(json.dumps(message))
+    return packer.pack(ble_packets.DETECTED, tag.id, tag.cx, tag.cy,
+                       min(65535, int(distance * 1000)), int(math.degrees(tag.rotation)), tag.w * tag.h)
 
 # === BLE Peripheral Loop ===
 def callback(data):
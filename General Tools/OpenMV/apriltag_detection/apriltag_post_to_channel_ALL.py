@@ -1,7 +1,11 @@
-import json
+from ble_packets import unpack, tag_message, TAG
 
 async def myCallback(message):
-    value = json.loads(message.decode())
+    # The camera sends TAG packets; they only become channel JSON here
+    kind, seq, values = unpack(bytes(message))
+    if kind != TAG:
+        return
+    value = tag_message(values)
     
     if value['detected']:
         car_location = {
@@ -10,6 +10,8 @@ import sensor
 import image
 import ubinascii
 import gc
+import struct
+import random
 
 # WiFi credentials
 WIFI_SSID = ""
@@ -20,6 +22,36 @@ WS_HOST = "chrisrogers.pyscriptapps.com"
 WS_PORT = 443
 WS_PATH = "/talking-on-a-channel/api/channels/hackathon"
 
+# Frames are built in one reused buffer with the payload word-aligned at
+# PAYLOAD_OFFSET, so the mask is applied in place 32 bits at a time
+PAYLOAD_OFFSET = 16
+frame_buffer = bytearray(PAYLOAD_OFFSET + 16384)
+
+# Send raw JPEGs in binary frames instead of base64 inside JSON. The frame
+# payload is BINARY_HEADER (magic b'OM', topic id 1 = /camera, flags,
+# sequence number, timestamp ms) followed by the JPEG bytes.
+BINARY_FRAMES = False
+BINARY_HEADER = '>2sBBII'
+BINARY_HEADER_SIZE = struct.calcsize(BINARY_HEADER)
+
+try:
+    import micropython
+
+    @micropython.viper
+    def mask_words(buf: ptr32, start: int, end: int, mask: int):
+        i = start
+        while i < end:
+            buf[i] = buf[i] ^ mask
+            i += 1
+
+except (ImportError, AttributeError, NameError, SyntaxError):
+    # No viper emitter (or CPython): mask the words as one big integer
+    def mask_words(buf, start, end, mask):
+        first, last = start * 4, end * 4
+        words = int.from_bytes(buf[first:last], 'little')
+        mask = int.from_bytes(mask.to_bytes(4, 'little') * (end - start), 'little')
+        buf[first:last] = (words ^ mask).to_bytes(last - first, 'little')
+
 def init_camera_optimized():
     print("Initializing camera...")
     sensor.reset()
@@ -131,6 +163,9 @@ def capture_image_optimized():
     try:
         img = sensor.snapshot()
         jpeg_bytes = img.compress(quality=45)
+        if BINARY_FRAMES:
+            print(f"Image: {len(jpeg_bytes)}B")
+            return jpeg_bytes
         base64_str = ubinascii.b2a_base64(jpeg_bytes).decode('utf-8').strip()
         
         print(f"Image: {len(jpeg_bytes)}B -> {len(base64_str)}B base64")
@@ -140,6 +175,56 @@ def capture_image_optimized():
         print(f"Image capture error: {e}")
         return None
 
+def reserve_frame_buffer(length):
+    """Grow the reused buffer in 4 KB steps when a frame doesn't fit"""
+    global frame_buffer
+    needed = PAYLOAD_OFFSET + (length + 3) // 4 * 4
+    if len(frame_buffer) < needed:
+        frame_buffer = None
+        gc.collect()
+        frame_buffer = bytearray((needed + 4095) // 4096 * 4096)
+    return frame_buffer
+
+def write_frame(ssl_sock, length, opcode):
+    """Add header and mask to the payload at PAYLOAD_OFFSET and write it"""
+    buf = frame_buffer
+    
+    # Header ends right before the payload; payload length with mask bit
+    if length <= 125:
+        start = PAYLOAD_OFFSET - 6
+        buf[start + 1] = 0x80 | length
+    else:
+        start = PAYLOAD_OFFSET - 8
+        buf[start + 1] = 0x80 | 126
+        struct.pack_into('>H', buf, start + 2, length)
+    buf[start] = opcode
+    
+    # Masking key, little-endian so word-wide XOR lines up with key byte i % 4
+    mask = random.getrandbits(32)
+    struct.pack_into('<I', buf, PAYLOAD_OFFSET - 4, mask)
+    mask_words(buf, PAYLOAD_OFFSET // 4, (PAYLOAD_OFFSET + length + 3) // 4, mask)
+    
+    ssl_sock.write(memoryview(buf)[start:PAYLOAD_OFFSET + length])
+
+def send_binary_image(ssl_sock, image_id, jpeg_bytes):
+    try:
+        jpeg = memoryview(jpeg_bytes)
+        length = BINARY_HEADER_SIZE + len(jpeg)
+        
+        if length > 50000:
+            print(f"Message too large: {length} bytes")
+            return False
+        
+        buf = reserve_frame_buffer(length)
+        struct.pack_into(BINARY_HEADER, buf, PAYLOAD_OFFSET, b'OM', 1, 0, image_id, time.ticks_ms())
+        buf[PAYLOAD_OFFSET + BINARY_HEADER_SIZE:PAYLOAD_OFFSET + length] = jpeg
+        write_frame(ssl_sock, length, 0x82)  # FIN bit set + binary frame opcode
+        return True
+        
+    except Exception as e:
+        print(f"Send error: {e}")
+        return False
+
 def send_websocket_message(ssl_sock, message_dict):
     try:
         json_data = json.dumps(message_dict)
@@ -150,29 +235,9 @@ def send_websocket_message(ssl_sock, message_dict):
             print(f"Message too large: {length} bytes")
             return False
         
-        # Create WebSocket frame
-        frame = bytearray()
-        frame.append(0x81)  # FIN bit set + text frame opcode
-        
-        # Add payload length with mask bit
-        if length <= 125:
-            frame.append(0x80 | length)
-        elif length < 65536:
-            frame.append(0x80 | 126)
-            frame.extend(length.to_bytes(2, 'big'))
-        else:
-            frame.append(0x80 | 127)
-            frame.extend(length.to_bytes(8, 'big'))
-        
-        # Add masking key
-        mask = os.urandom(4)
-        frame.extend(mask)
-        
-        # Mask payload
-        for i, byte in enumerate(payload):
-            frame.append(byte ^ mask[i % 4])
-        
-        ssl_sock.write(frame)
+        buf = reserve_frame_buffer(length)
+        buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + length] = payload
+        write_frame(ssl_sock, length, 0x81)  # FIN bit set + text frame opcode
         return True
         
     except Exception as e:
@@ -210,6 +275,8 @@ def main_simplified():
     image_count = 0
     connection_count = 0
     last_heartbeat = 0
+    stats_start = time.ticks_ms()
+    stats_frames = 0
     
     try:
         while True:
@@ -247,22 +314,27 @@ def main_simplified():
                     continue
             
             # Capture and send image
-            base64_image = capture_image_optimized()
+            image = capture_image_optimized()
             
-            if base64_image:
-                image_message = {
-                    "topic": "/camera",
-                    "value": base64_image,
-                    "image_id": image_count,
-                    "connection": connection_count,
-                    "timestamp": time.ticks_ms()
-                }
-                
+            if image:
                 print(f"Sending image #{image_count}...")
                 
-                if send_websocket_message(ssl_sock, image_message):
+                if BINARY_FRAMES:
+                    sent = send_binary_image(ssl_sock, image_count, image)
+                else:
+                    image_message = {
+                        "topic": "/camera",
+                        "value": image,
+                        "image_id": image_count,
+                        "connection": connection_count,
+                        "timestamp": time.ticks_ms()
+                    }
+                    sent = send_websocket_message(ssl_sock, image_message)
+                
+                if sent:
                     print(f"Image #{image_count} sent! (Conn #{connection_count})")
                     image_count += 1
+                    stats_frames += 1
                 else:
                     print(f"Failed to send image #{image_count}")
                     ssl_sock.close()
@@ -275,6 +347,12 @@ def main_simplified():
             # Periodic cleanup
             if image_count % 5 == 0:
                 gc.collect()
+            
+            elapsed = time.ticks_diff(time.ticks_ms(), stats_start)
+            if elapsed > 5000:
+                print(f"{stats_frames * 1000 / elapsed:.1f} fps")
+                stats_start = time.ticks_ms()
+                stats_frames = 0
     
     except KeyboardInterrupt:
         print("Stopping transmission...")
@@ -0,0 +1,104 @@
+"""Benchmark the OpenMV streaming code on a PC, no camera or Wi-Fi needed.
+
+Runs main_code.py (or all_in_one_file.py) unchanged against a local
+ws_server.py. The stand-in sensor plays back image files, or a moving test
+card. When the time is up it reports frames/s and bytes/s as the server
+saw them, plus the time spent per stage: capture, compress, encode
+(base64), mask and write.
+
+    python bench.py [--script main_code.py] [--frames DIR_OR_FILES...] [--seconds 10]
+                    [--set BINARY_FRAMES=True ...] [--capture-fps 30] [--no-tls] [--echo]
+
+--set overrides a setting at the top of the script for this run only, e.g.
+--set "FRAME_SIZES=[(sensor.VGA, 'VGA')]" --set START_FRAME_SIZE=0
+"""
+import _thread
+import argparse
+import ast
+import contextlib
+import os
+import sys
+import threading
+import time
+
+import shim
+from ws_server import StreamServer
+
+STAGES = ('capture', 'compress', 'encode', 'mask', 'write')
+
+def load_script(path, overrides):
+    """Compile a streaming script with some of its top-level settings replaced"""
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    remaining = dict(overrides)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and \
+                isinstance(node.targets[0], ast.Name) and node.targets[0].id in remaining:
+            node.value = ast.parse(remaining.pop(node.targets[0].id), mode='eval').body
+    if remaining:
+        raise SystemExit(f"No such setting in {os.path.basename(path)}: {', '.join(remaining)}")
+    return compile(ast.fix_missing_locations(tree), path, 'exec')
+
+def run(script, seconds, overrides, quiet):
+    """Run the script until seconds are up; returns the wall time it ran"""
+    code = load_script(script, overrides)
+    timer = threading.Timer(seconds, _thread.interrupt_main)
+    start = time.perf_counter()
+    timer.start()
+    output = open(os.devnull, 'w') if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(code, {'__name__': '__main__', '__file__': script})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        timer.cancel()
+    return time.perf_counter() - start
+
+def print_report(wall, server):
+    print(f"\n=== {wall:.1f} s ===")
+    print(f"{'topic':<22}{'messages':>9}{'per s':>8}{'kbps':>9}{'bad':>5}{'latency ms':>12}")
+    for topic, stats in sorted(server.report().items()):
+        latency = '-' if stats['latency_ms'] is None else stats['latency_ms']
+        print(f"{topic:<22}{stats['messages']:>9}{stats['per_s']:>8}{stats['kbps']:>9}"
+              f"{stats['bad']:>5}{latency:>12}")
+    print(f"WebSocket frames: {server.frames}, pings: {server.pings}, connections: {server.connections}")
+
+    report = shim.stages.report()
+    print(f"\n{'stage':<10}{'calls':>8}{'ms/call':>10}{'total ms':>10}{'% of run':>10}{'MB':>8}")
+    for stage in STAGES + tuple(sorted(set(report) - set(STAGES))):
+        if stage in report:
+            calls, total_ms, per_call, size = report[stage]
+            print(f"{stage:<10}{calls:>8}{per_call:>10.2f}{total_ms:>10.0f}"
+                  f"{total_ms / wall / 10:>9.1f}%{size / 1e6:>8.2f}")
+    if 'compress' in report:
+        print(f"\nJPEGs encoded: {report['compress'][0] / wall:.1f}/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--script', default=os.path.join(shim.STREAMING, 'main_code.py'))
+    parser.add_argument('--frames', nargs='*', help='image folder, image files or a video')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--set', action='append', default=[], metavar='NAME=VALUE')
+    parser.add_argument('--capture-fps', type=float, default=0, help='pace the sensor (0 = as fast as possible)')
+    parser.add_argument('--no-tls', action='store_true')
+    parser.add_argument('--echo', action='store_true', help='relay messages back, like the channel')
+    parser.add_argument('--verbose', action='store_true', help="show the script's own output")
+    args = parser.parse_args()
+
+    overrides = dict(setting.split('=', 1) for setting in args.set)
+    server = StreamServer(tls=not args.no_tls, echo=args.echo, clock=shim.ticks_ms)
+    server.start_thread()
+    frames = args.frames[0] if args.frames and len(args.frames) == 1 else args.frames
+    shim.install(server.port, tls=not args.no_tls, frames=frames, capture_fps=args.capture_fps)
+
+    print(f"Running {os.path.basename(args.script)} for {args.seconds:.0f} s against "
+          f"{'wss' if not args.no_tls else 'ws'}://127.0.0.1:{server.port}")
+    server.reset_stats()
+    shim.stages.reset()
+    wall = run(os.path.abspath(args.script), args.seconds, overrides, not args.verbose)
+    print_report(wall, server)
+    server.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""CPython stand-in for the OpenMV image module; the images themselves live in sensor.py"""
+from sensor import Image
+
+AREA = 1
+BILINEAR = 2
+BICUBIC = 3
@@ -0,0 +1,50 @@
+"""CPython stand-in for MicroPython's micropython module.
+
+@micropython.viper functions run as plain Python: arguments annotated
+ptr8/ptr16/ptr32 are handed in as memoryviews cast to that width, so
+buf[i] reads and writes whole words just like on the camera. Every viper
+call is timed into the stage it belongs to (see shim.stages).
+"""
+import builtins
+import functools
+
+import shim
+
+# Viper pointer types, so the annotations in the streaming code resolve
+class ptr8: format = 'B'
+class ptr16: format = 'H'
+class ptr32: format = 'I'
+builtins.ptr8, builtins.ptr16, builtins.ptr32 = ptr8, ptr16, ptr32
+
+# Which benchmark stage each viper function is part of
+VIPER_STAGES = {'mask_words': 'mask', 'b64_into': 'encode'}
+
+def _as_pointer(value, kind):
+    view = memoryview(value)
+    if view.format != 'B':
+        view = view.cast('B')
+    size = {'B': 1, 'H': 2, 'I': 4}[kind.format]
+    return view[:len(view) // size * size].cast(kind.format)
+
+def viper(function):
+    pointers = {name: kind for name, kind in function.__annotations__.items()
+                if kind in (ptr8, ptr16, ptr32)}
+    names = function.__code__.co_varnames[:function.__code__.co_argcount]
+    stage = VIPER_STAGES.get(function.__name__, function.__name__)
+
+    @functools.wraps(function)
+    def wrapper(*args):
+        args = [_as_pointer(arg, pointers[name]) if name in pointers else arg
+                for name, arg in zip(names, args)]
+        with shim.stages.timing(stage):
+            return function(*args)
+    return wrapper
+
+def native(function):
+    return function
+
+def const(value):
+    return value
+
+def mem_info(*args):
+    pass
@@ -0,0 +1,25 @@
+"""CPython stand-in for MicroPython's network module: Wi-Fi is always up"""
+STA_IF = 0
+AP_IF = 1
+
+class WLAN:
+    def __init__(self, interface=STA_IF):
+        self._active = False
+        self._connected = False
+
+    def active(self, state=None):
+        if state is None:
+            return self._active
+        self._active = bool(state)
+
+    def connect(self, ssid=None, password=None, **kwargs):
+        self._connected = True
+
+    def disconnect(self):
+        self._connected = False
+
+    def isconnected(self):
+        return self._connected
+
+    def ifconfig(self):
+        return ('127.0.0.1', '255.0.0.0', '127.0.0.1', '127.0.0.1')
@@ -0,0 +1,319 @@
+"""CPython stand-in for the OpenMV sensor module (and the image objects it returns).
+
+snapshot() plays back image files - a folder of them, a list, or a
+video - resized to the current frame size. Images are kept as numpy
+arrays and the image methods the streaming code uses are done with
+OpenCV. Like on the camera, compress() turns the image into a JPEG in
+place. The JPEG bytes are a new bytearray each time, which compress()
+returns and bytearray() hands out: CPython won't resize a buffer that a
+memoryview still points at, where the camera just writes over it.
+"""
+import glob
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+import shim
+
+GRAYSCALE = 1
+RGB565 = 2
+JPEG = 3
+
+QQVGA, HQVGA, QVGA, VGA, HD = 10, 11, 12, 13, 14
+FRAME_SIZES = {QQVGA: (160, 120), HQVGA: (240, 160), QVGA: (320, 240),
+               VGA: (640, 480), HD: (1280, 720)}
+
+_sources = []  # frames as loaded, BGR
+_resized = {}  # (index, size) -> frame at that size
+_index = 0
+_size = FRAME_SIZES[QVGA]
+_pixformat = RGB565
+_capture_interval = 0.0
+_last_capture = 0.0
+_framebuffers = []
+_framebuffer_count = 1
+
+def configure(frames=None, capture_fps=0):
+    """Where frames come from: a folder of images, a list of files or a video; None = test card"""
+    global _sources, _capture_interval, _index
+    _sources = []
+    if isinstance(frames, str) and os.path.isdir(frames):
+        frames = sorted(glob.glob(os.path.join(frames, '*')))
+    elif isinstance(frames, str):
+        frames = [frames]
+    for path in frames or []:
+        image = cv2.imread(path)
+        if image is not None:
+            _sources.append(image)
+            continue
+        video = cv2.VideoCapture(path)
+        while True:
+            ok, image = video.read()
+            if not ok:
+                break
+            _sources.append(image)
+        video.release()
+    if not _sources:
+        _sources = [_test_card(i) for i in range(30)]
+    _resized.clear()
+    _index = 0
+    _capture_interval = 1.0 / capture_fps if capture_fps else 0.0
+
+def _test_card(i):
+    """Moving test pattern, for when there are no frames to play back"""
+    image = np.zeros((480, 640, 3), np.uint8)
+    image[:, :, 0] = np.linspace(0, 255, 640, dtype=np.uint8)
+    image[:, :, 1] = np.linspace(0, 255, 480, dtype=np.uint8)[:, None]
+    x = 40 + i * 18
+    cv2.rectangle(image, (x, 180), (x + 120, 300), (255, 255, 255), -1)
+    cv2.putText(image, f"frame {i}", (20, 460), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 255), 2)
+    return image
+
+# --- sensor functions ----------------------------------------------------------
+
+def reset():
+    global _framebuffers, _framebuffer_count
+    _framebuffers = []
+    _framebuffer_count = 1
+
+def set_pixformat(pixformat):
+    global _pixformat
+    _pixformat = pixformat
+
+def set_framesize(framesize):
+    global _size
+    _size = FRAME_SIZES[framesize]
+
+def set_framebuffers(count):
+    global _framebuffer_count
+    _framebuffer_count = count
+
+def set_auto_gain(*args, **kwargs):
+    pass
+
+def set_auto_exposure(*args, **kwargs):
+    pass
+
+def set_auto_whitebal(*args, **kwargs):
+    pass
+
+def skip_frames(n=None, time=0):
+    pass
+
+def width():
+    return _size[0]
+
+def height():
+    return _size[1]
+
+def snapshot():
+    """Next frame, in one of the set_framebuffers() buffers like on the camera"""
+    global _index, _last_capture
+    with shim.stages.timing('capture'):
+        if _capture_interval:
+            # Wait for the sensor's next frame
+            wait = _last_capture + _capture_interval - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            _last_capture = time.perf_counter()
+        key = (_index, _size)
+        if key not in _resized:
+            _resized[key] = cv2.resize(_sources[_index], _size, interpolation=cv2.INTER_AREA)
+        _index = (_index + 1) % len(_sources)
+        pixels = _resized[key]
+        if _pixformat == GRAYSCALE:
+            pixels = cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY)
+        if len(_framebuffers) < _framebuffer_count:
+            _framebuffers.append(Image(pixels.copy()))
+        image = _framebuffers.pop(0)
+        _framebuffers.append(image)
+        image.load(pixels)
+        return image
+
+def alloc_extra_fb(width, height, pixformat):
+    shape = (height, width) if pixformat == GRAYSCALE else (height, width, 3)
+    return Image(np.zeros(shape, np.uint8))
+
+def dealloc_extra_fb():
+    pass
+
+# --- image objects ----------------------------------------------------------------
+
+class Statistics:
+    def __init__(self, pixels):
+        self._mean = float(pixels.mean()) if pixels.size else 0.0
+
+    def mean(self):
+        return self._mean
+
+class Blob:
+    def __init__(self, x, y, w, h, pixels, cx, cy):
+        self._rect = (x, y, w, h)
+        self._pixels = pixels
+        self._cx, self._cy = int(cx), int(cy)
+
+    def rect(self):
+        return self._rect
+
+    def pixels(self):
+        return self._pixels
+
+    def cx(self):
+        return self._cx
+
+    def cy(self):
+        return self._cy
+
+class AprilTag:
+    """The attributes of an OpenMV apriltag object the streaming code reads"""
+    def __init__(self, tag_id, corners):
+        self.id = int(tag_id)
+        self.corners = [tuple(int(v) for v in corner) for corner in corners]
+        x, y, w, h = cv2.boundingRect(corners.astype(np.int32))
+        self.rect, self.x, self.y, self.w, self.h = (x, y, w, h), x, y, w, h
+        self.cx, self.cy = int(corners[:, 0].mean()), int(corners[:, 1].mean())
+        # Direction of the tag's top edge, 0..2pi like the camera
+        dx, dy = corners[1] - corners[0]
+        self.rotation = math.atan2(-dy, dx) % (2 * math.pi)
+
+_apriltag_detector = None
+
+def _bgr(color):
+    if isinstance(color, tuple):
+        return color[::-1]
+    return (color, color, color)
+
+class Jpeg(bytearray):
+    """A compressed image's bytes; everything else is looked up on the image"""
+    def __init__(self, data, image):
+        super().__init__(data)
+        self.image = image
+
+    def __getattr__(self, name):
+        return getattr(self.image, name)
+
+class Image:
+    """An OpenMV image: numpy pixels, or JPEG bytes once compressed"""
+    def __init__(self, pixels):
+        self.pixels = pixels
+        self.jpeg = None
+
+    def load(self, pixels):
+        """Refill this frame buffer with a new frame"""
+        self.jpeg = None
+        if self.pixels.shape == pixels.shape:
+            np.copyto(self.pixels, pixels)
+        else:
+            self.pixels = pixels.copy()
+
+    def width(self):
+        return self.pixels.shape[1]
+
+    def height(self):
+        return self.pixels.shape[0]
+
+    def size(self):
+        return len(self.jpeg) if self.jpeg else self.pixels.size * (1 if self.pixels.ndim == 2 else 2)
+
+    def bytearray(self):
+        return self.jpeg
+
+    def _mutable(self):
+        """Pixels to draw on; like the camera, a compressed image can't be drawn on"""
+        if self.jpeg:
+            raise OSError("Image is not mutable")
+        return self.pixels
+
+    def _roi(self, roi):
+        if roi is None:
+            return self.pixels
+        x, y, w, h = roi
+        return self.pixels[y:y + h, x:x + w]
+
+    def compress(self, quality=50, **kwargs):
+        """JPEG in place; returns the JPEG, which also stands in for the image"""
+        with shim.stages.timing('compress'):
+            ok, jpeg = cv2.imencode('.jpg', self.pixels, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            self.jpeg = Jpeg(jpeg.tobytes(), self)
+        return self.jpeg
+
+    def copy(self, roi=None, x_scale=1.0, y_scale=1.0, **kwargs):
+        pixels = self._roi(roi)
+        if x_scale != 1.0 or y_scale != 1.0:
+            size = (max(1, int(pixels.shape[1] * x_scale)), max(1, int(pixels.shape[0] * y_scale)))
+            pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+        return Image(pixels.copy())
+
+    def scale(self, x_scale=1.0, y_scale=1.0, roi=None, copy=False, **kwargs):
+        """copy() that works in place unless copy=True"""
+        if copy:
+            return self.copy(roi, x_scale, y_scale)
+        pixels = self._roi(roi)
+        size = (max(1, int(pixels.shape[1] * x_scale)), max(1, int(pixels.shape[0] * y_scale)))
+        self._mutable()
+        self.pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+        return self
+
+    def draw_image(self, image, x, y, x_scale=1.0, y_scale=1.0, roi=None, **kwargs):
+        pixels = image._roi(roi)
+        if x_scale != 1.0 or y_scale != 1.0:
+            size = (max(1, round(pixels.shape[1] * x_scale)), max(1, round(pixels.shape[0] * y_scale)))
+            pixels = cv2.resize(pixels, size, interpolation=cv2.INTER_AREA)
+        if pixels.ndim != self.pixels.ndim:
+            pixels = cv2.cvtColor(pixels, cv2.COLOR_BGR2GRAY if pixels.ndim == 3 else cv2.COLOR_GRAY2BGR)
+        self._mutable()
+        h = min(pixels.shape[0], self.pixels.shape[0] - y)
+        w = min(pixels.shape[1], self.pixels.shape[1] - x)
+        self.pixels[y:y + h, x:x + w] = pixels[:h, :w]
+        return self
+
+    def difference(self, image, **kwargs):
+        cv2.absdiff(self._mutable(), image.pixels, dst=self.pixels)
+        return self
+
+    def binary(self, thresholds, invert=False, **kwargs):
+        low, high = thresholds[0][:2]
+        gray = self.pixels if self.pixels.ndim == 2 else cv2.cvtColor(self.pixels, cv2.COLOR_BGR2GRAY)
+        mask = ((gray >= low) & (gray <= high)) != invert
+        self._mutable()
+        result = np.where(mask, 255, 0).astype(np.uint8)
+        self.pixels[...] = result if self.pixels.ndim == 2 else result[:, :, None]
+        return self
+
+    def get_statistics(self, roi=None, **kwargs):
+        return Statistics(self._roi(roi))
+
+    def find_blobs(self, thresholds, merge=False, pixels_threshold=1, **kwargs):
+        low, high = thresholds[0][:2]
+        gray = self.pixels if self.pixels.ndim == 2 else cv2.cvtColor(self.pixels, cv2.COLOR_BGR2GRAY)
+        mask = ((gray >= low) & (gray <= high)).astype(np.uint8)
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask)
+        return [Blob(*stats[i][:4], stats[i][4], *centroids[i])
+                for i in range(1, count) if stats[i][4] >= pixels_threshold]
+
+    def find_apriltags(self, **kwargs):
+        """AprilTags (36h11) found with OpenCV's ArUco module"""
+        global _apriltag_detector
+        if _apriltag_detector is None:
+            dictionary = cv2.aruco.getPredefinedDictionary(cv2.aruco.DICT_APRILTAG_36h11)
+            _apriltag_detector = cv2.aruco.ArucoDetector(dictionary, cv2.aruco.DetectorParameters())
+        corners, ids, _ = _apriltag_detector.detectMarkers(self.pixels)
+        if ids is None:
+            return []
+        return [AprilTag(tag_id, corner[0]) for tag_id, corner in zip(ids.flatten(), corners)]
+
+    def draw_rectangle(self, rect, color=(255, 255, 255), thickness=1, **kwargs):
+        x, y, w, h = rect
+        cv2.rectangle(self._mutable(), (x, y), (x + w, y + h), _bgr(color), thickness)
+        return self
+
+    def draw_cross(self, x, y, color=(255, 255, 255), size=5, **kwargs):
+        cv2.drawMarker(self._mutable(), (x, y), _bgr(color), cv2.MARKER_CROSS, size * 2)
+        return self
+
+    def draw_string(self, x, y, text, color=(255, 255, 255), **kwargs):
+        cv2.putText(self._mutable(), text, (x, y + 8), cv2.FONT_HERSHEY_PLAIN, 0.8, _bgr(color))
+        return self
@@ -0,0 +1,164 @@
+"""Run the OpenMV streaming code under CPython.
+
+install() puts this folder's stand-ins for sensor, network, ubinascii and
+micropython on the import path and patches what the rest of MicroPython
+adds to standard modules: time.ticks_ms() and friends, asyncio.sleep_ms(),
+the MicroPython form of ssl.wrap_socket(), gc.mem_free() and
+sys.print_exception(). Connections to any other host go to the local
+test server instead (see ws_server.py).
+"""
+import asyncio
+import gc
+import os
+import socket
+import ssl
+import sys
+import time
+import traceback
+from contextlib import contextmanager
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STREAMING = os.path.dirname(HERE)
+
+# MicroPython ticks wrap at 2**30 on the OpenMV
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALF = TICKS_PERIOD // 2
+
+class Stages:
+    """Time spent in each stage of the capture -> send path"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.seconds = {}
+        self.calls = {}
+        self.bytes = {}
+        self.start = time.perf_counter()
+
+    @contextmanager
+    def timing(self, stage, size=0):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, size)
+
+    def add(self, stage, seconds, size=0):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        self.bytes[stage] = self.bytes.get(stage, 0) + size
+
+    def report(self):
+        """{stage: (calls, total ms, ms per call, bytes)}"""
+        return {stage: (self.calls[stage], self.seconds[stage] * 1000,
+                        self.seconds[stage] * 1000 / self.calls[stage], self.bytes[stage])
+                for stage in self.seconds}
+
+stages = Stages()
+
+# --- time -------------------------------------------------------------------
+
+_epoch = time.monotonic()
+
+def ticks_ms():
+    return int((time.monotonic() - _epoch) * 1000) & TICKS_MAX
+
+def ticks_us():
+    return int((time.monotonic() - _epoch) * 1000000) & TICKS_MAX
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_HALF) & TICKS_MAX) - TICKS_HALF
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+def sleep_ms(ms):
+    time.sleep(max(0, ms) / 1000)
+
+def sleep_us(us):
+    time.sleep(max(0, us) / 1000000)
+
+def _async_sleep_ms(ms):
+    return asyncio.sleep(max(0, ms) / 1000)
+
+# --- ssl / socket -------------------------------------------------------------
+
+class MicroSSLSocket:
+    """A CPython SSL socket with MicroPython's stream methods.
+
+    read/readinto/write return None instead of raising when a non-blocking
+    socket has nothing to give or no room, like they do on the camera.
+    """
+    def __init__(self, sock):
+        self.sock = sock
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def setblocking(self, flag):
+        self.sock.setblocking(flag)
+
+    def settimeout(self, value):
+        self.sock.settimeout(value)
+
+    def read(self, size=-1):
+        try:
+            return self.sock.recv(size if size > 0 else 16384)
+        except (ssl.SSLWantReadError, BlockingIOError):
+            return None
+
+    def readinto(self, buf, size=None):
+        try:
+            return self.sock.recv_into(buf, size or len(buf))
+        except (ssl.SSLWantReadError, BlockingIOError):
+            return None
+
+    def write(self, data):
+        with stages.timing('write', len(data)):
+            try:
+                return self.sock.send(data)
+            except (ssl.SSLWantWriteError, ssl.SSLWantReadError, BlockingIOError):
+                return None
+
+    def close(self):
+        self.sock.close()
+
+def wrap_socket(sock, server_side=False, cert_reqs=ssl.CERT_NONE, server_hostname=None,
+                do_handshake=True, **kwargs):
+    """ssl.wrap_socket() as MicroPython has it; no certificate checks, like the camera"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return MicroSSLSocket(context.wrap_socket(sock, server_hostname=server_hostname,
+                                              do_handshake_on_connect=do_handshake))
+
+def install(port, tls=True, frames=None, capture_fps=0):
+    """Make MicroPython imports work and send every connection to 127.0.0.1:port"""
+    for path in (STREAMING, HERE):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+    time.ticks_ms, time.ticks_us = ticks_ms, ticks_us
+    time.ticks_diff, time.ticks_add = ticks_diff, ticks_add
+    time.sleep_ms, time.sleep_us = sleep_ms, sleep_us
+    asyncio.sleep_ms = _async_sleep_ms
+    gc.mem_free = lambda: 0
+    gc.mem_alloc = lambda: 0
+    sys.print_exception = traceback.print_exception
+
+    if tls:
+        ssl.wrap_socket = wrap_socket
+    else:
+        # Plain TCP: the stream methods without the TLS layer
+        ssl.wrap_socket = lambda sock, **kwargs: MicroSSLSocket(sock)
+
+    real_getaddrinfo = socket.getaddrinfo
+    def getaddrinfo(host, host_port, *args):
+        if host in ('0.0.0.0', '127.0.0.1', 'localhost'):
+            return real_getaddrinfo(host, host_port, *args)  # servers the camera runs itself
+        return real_getaddrinfo('127.0.0.1', port, *args)
+    socket.getaddrinfo = getaddrinfo
+
+    import sensor
+    sensor.configure(frames, capture_fps)
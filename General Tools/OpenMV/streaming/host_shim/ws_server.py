@@ -0,0 +1,258 @@
+"""Local TLS WebSocket server to stream into, in place of the channel server.
+
+It accepts the camera's handshake, answers pings and reassembles
+fragmented messages. Every message is checked: camera frames must hold a
+JPEG, as base64 in JSON or behind the binary header. Totals are kept per
+topic. With echo on, every message goes back out to all connected clients,
+the way the channel relays it.
+
+    python ws_server.py [--host 0.0.0.0] [--port 8443] [--no-tls] [--echo]
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+
+WS_GUID = b'258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+BINARY_TOPICS = {1: '/camera', 2: '/camera/tiles', 3: '/camera/roi'}
+JPEG_TOPICS = ('/camera', '/camera/roi')
+
+def self_signed_context():
+    """Server TLS context with a throwaway certificate made by openssl"""
+    folder = tempfile.mkdtemp(prefix='ws_server_')
+    cert, key = os.path.join(folder, 'cert.pem'), os.path.join(folder, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-keyout', key,
+                    '-out', cert, '-days', '1', '-subj', '/CN=localhost'],
+                   check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    return context
+
+class TopicStats:
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.bad = 0
+        self.latency_ms = []
+
+class StreamServer:
+    def __init__(self, port=0, tls=True, echo=False, clock=None, host='127.0.0.1'):
+        """clock: the camera's ticks_ms when it runs in this process, to time latency"""
+        self.echo = echo
+        self.clock = clock
+        self.context = self_signed_context() if tls else None
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((host, port))
+        self.listener.listen(4)
+        self.port = self.listener.getsockname()[1]
+        self.clients = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self.lock:
+            self.topics = {}
+            self.frames = 0  # WebSocket frames, fragments included
+            self.pings = 0
+            self.connections = 0
+            self.start = time.perf_counter()
+
+    def start_thread(self):
+        self.running = True
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+        return self.port
+
+    def stop(self):
+        self.running = False
+        try:
+            self.listener.close()
+        except OSError:
+            pass
+        for client in list(self.clients):
+            try:
+                client.close()
+            except OSError:
+                pass
+
+    def accept_loop(self):
+        while self.running:
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.serve, args=(sock,), daemon=True).start()
+
+    def serve(self, sock):
+        try:
+            if self.context:
+                sock = self.context.wrap_socket(sock, server_side=True)
+            if not self.handshake(sock):
+                return
+            with self.lock:
+                self.clients.append(sock)
+                self.connections += 1
+            self.read_loop(sock)
+        except (OSError, ssl.SSLError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                if sock in self.clients:
+                    self.clients.remove(sock)
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def handshake(self, sock):
+        request = b''
+        while b'\r\n\r\n' not in request:
+            chunk = sock.recv(1024)
+            if not chunk:
+                return False
+            request += chunk
+        key = None
+        for line in request.split(b'\r\n'):
+            if line.lower().startswith(b'sec-websocket-key:'):
+                key = line.split(b':', 1)[1].strip()
+        if key is None:
+            return False
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+        sock.sendall(b'HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n'
+                     b'Connection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + b'\r\n\r\n')
+        return True
+
+    def read_exactly(self, sock, count):
+        data = bytearray()
+        while len(data) < count:
+            chunk = sock.recv(count - len(data))
+            if not chunk:
+                raise OSError('closed')
+            data.extend(chunk)
+        return data
+
+    def read_loop(self, sock):
+        message = None  # [opcode, payload] of a fragmented message
+        while self.running:
+            head = self.read_exactly(sock, 2)
+            fin, opcode = head[0] & 0x80, head[0] & 0x0F
+            length = head[1] & 0x7F
+            if length == 126:
+                length = struct.unpack('>H', self.read_exactly(sock, 2))[0]
+            elif length == 127:
+                length = struct.unpack('>Q', self.read_exactly(sock, 8))[0]
+            mask = self.read_exactly(sock, 4) if head[1] & 0x80 else None
+            payload = self.read_exactly(sock, length)
+            if mask:
+                payload = unmask(payload, mask)
+            with self.lock:
+                self.frames += 1
+
+            if opcode == 0x9:
+                with self.lock:
+                    self.pings += 1
+                self.send(sock, 0x8A, payload)
+            elif opcode == 0x8:
+                self.send(sock, 0x88, payload[:2])
+                return
+            elif opcode in (0x1, 0x2):
+                message = [opcode, payload]
+            elif opcode == 0x0 and message:
+                message[1].extend(payload)
+            if fin and opcode < 0x8 and message:
+                self.received(*message)
+                message = None
+
+    def received(self, opcode, payload):
+        """Check and count one whole message"""
+        timestamp = None
+        if opcode == 0x1:
+            try:
+                message = json.loads(payload)
+                topic = message.get('topic', '?')
+                timestamp = message.get('timestamp')
+                value = message.get('value')
+                ok = topic not in JPEG_TOPICS or base64.b64decode(value)[:2] == b'\xff\xd8'
+            except (ValueError, TypeError, AttributeError):
+                topic, ok = '?', False
+        elif len(payload) < 12:
+            topic, ok = 'binary', False
+        else:
+            magic, topic_id, _, _, timestamp = struct.unpack_from('>2sBBII', payload)
+            topic = BINARY_TOPICS.get(topic_id, 'binary')
+            ok = magic == b'OM' and (topic not in JPEG_TOPICS or payload[12:14] == b'\xff\xd8')
+            if topic == '/camera/roi':
+                ok = magic == b'OM' and payload[20:22] == b'\xff\xd8'
+
+        with self.lock:
+            stats = self.topics.setdefault(topic, TopicStats())
+            stats.messages += 1
+            stats.bytes += len(payload)
+            stats.bad += not ok
+            if self.clock and isinstance(timestamp, int):
+                stats.latency_ms.append(((self.clock() - timestamp + (1 << 29)) & ((1 << 30) - 1)) - (1 << 29))
+            clients = list(self.clients) if self.echo else []
+        for client in clients:
+            try:
+                self.send(client, 0x80 | opcode, payload)
+            except OSError:
+                pass
+
+    def send(self, sock, opcode, payload):
+        """Unmasked server frame"""
+        length = len(payload)
+        if length < 126:
+            head = bytes([opcode, length])
+        elif length < 65536:
+            head = bytes([opcode, 126]) + struct.pack('>H', length)
+        else:
+            head = bytes([opcode, 127]) + struct.pack('>Q', length)
+        sock.sendall(head + bytes(payload))
+
+    def report(self):
+        """{topic: {messages, per_s, kbps, bad, latency_ms}} since reset_stats()"""
+        elapsed = max(1e-6, time.perf_counter() - self.start)
+        with self.lock:
+            report = {}
+            for topic, stats in self.topics.items():
+                latency = sorted(stats.latency_ms)
+                report[topic] = {
+                    'messages': stats.messages,
+                    'per_s': round(stats.messages / elapsed, 1),
+                    'kbps': round(stats.bytes * 8 / elapsed / 1000, 1),
+                    'bad': stats.bad,
+                    'latency_ms': latency[len(latency) // 2] if latency else None
+                }
+            return report
+
+def unmask(payload, mask):
+    key = int.from_bytes(mask * ((len(payload) + 3) // 4), 'big')
+    data = int.from_bytes(payload + b'\0' * (-len(payload) % 4), 'big')
+    return bytearray((data ^ key).to_bytes(len(payload) + (-len(payload) % 4), 'big')[:len(payload)])
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0', help='address to listen on')
+    parser.add_argument('--port', type=int, default=8443)
+    parser.add_argument('--no-tls', action='store_true')
+    parser.add_argument('--echo', action='store_true', help='relay every message to all clients')
+    args = parser.parse_args()
+    server = StreamServer(args.port, tls=not args.no_tls, echo=args.echo, host=args.host)
+    server.start_thread()
+    print(f"Listening on {'ws' if args.no_tls else 'wss'}://{args.host}:{server.port}")
+    try:
+        while True:
+            time.sleep(5)
+            print(server.report())
+            server.reset_stats()
+    except KeyboardInterrupt:
+        server.stop()
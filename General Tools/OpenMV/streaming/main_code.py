@@ -1,9 +1,15 @@
 import network
 import time
+import math
 import sensor
 import ubinascii
-import gc
+import struct
 import websocket
+import mjpeg
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
 
 # WiFi credentials
 WIFI_SSID = ""
@@ -14,15 +20,358 @@ WS_HOST = "chrisrogers.pyscriptapps.com"
 WS_PORT = 443
 WS_PATH = "/talking-on-a-channel/api/channels/hackathon"
 
-wait_time = 0.1
+# Rate control: quality, frame size and the pause between frames follow
+# what the link actually carries, aiming for TARGET_FPS without going over
+# TARGET_KBPS (0 = no bitrate limit)
+TARGET_FPS = 10
+TARGET_KBPS = 0
+QUALITY_RANGE = (20, 70)
+FRAME_SIZES = [(sensor.QQVGA, "QQVGA"), (sensor.HQVGA, "HQVGA"), (sensor.QVGA, "QVGA")]
+START_FRAME_SIZE = 2  # index into FRAME_SIZES
+# Send raw JPEGs in binary frames (websocket.BINARY_HEADER) instead of
+# base64 inside JSON - a third less data and no encoding on either end.
+# The OpenMV Stream page shows both kinds.
+BINARY_FRAMES = False
+# Send frames bigger than this as a run of continuation frames, so the send
+# buffer stays one fragment big and VGA / high quality frames fit in the
+# heap (add (sensor.VGA, "VGA") to FRAME_SIZES to use it). 0 = one frame
+# per message, capped at websocket.MAX_PAYLOAD.
+FRAGMENT_SIZE = 8192
+# Motion gate: only send a frame when enough of the picture changed since the
+# last frame sent, plus a keyframe every KEYFRAME_INTERVAL_MS for still scenes
+MOTION_GATE = True
+MOTION_SIZE = (80, 60)  # grayscale thumbnail the comparison runs on
+MOTION_PIXEL_THRESHOLD = 24  # per-pixel change (0-255) that counts as moved
+MOTION_PERCENT = 0.5  # percent of changed pixels that triggers a send
+KEYFRAME_INTERVAL_MS = 2000
+# Tile-delta mode: split the frame into TILE_GRID (columns, rows) and only
+# send the tiles that changed (uses the motion gate's difference image).
+# A full frame still goes out every KEYFRAME_INTERVAL_MS and whenever more
+# than MAX_TILES_PERCENT of the tiles changed.
+TILE_MODE = False
+TILE_GRID = (4, 4)
+TILE_PERCENT = 1.0  # percent of a tile's pixels that must change to send it
+MAX_TILES_PERCENT = 50
+# Dual stream: capture at DUAL_FRAME_SIZE, send a small OVERVIEW_SIZE copy
+# of the whole field on /camera every frame and a sharp ROI_SIZE crop of the
+# full-size frame on /camera/roi every ROI_INTERVAL_MS. ROI = None follows
+# the biggest moving area (uses the motion gate), or pin it to (x, y, w, h).
+# The rate controller adapts the overview quality; the frame size stays put.
+# A VGA frame buffer needs a camera with the memory for it (H7 Plus, RT1062).
+DUAL_STREAM = False
+DUAL_FRAME_SIZE = (sensor.VGA, "VGA")
+OVERVIEW_SIZE = (160, 120)
+ROI_SIZE = (240, 180)
+ROI = None
+ROI_QUALITY = 70
+ROI_INTERVAL_MS = 500
+# AprilTag mode: look for tags in every snapshot and publish each car's
+# position on /Car_Location_N/All at the full frame rate, like
+# apriltag_detection/ does over BLE. Video only goes out every VIDEO_EVERY
+# frames, and only when the send queue is empty, so positions come first.
+APRILTAG_MODE = False
+TAG_TOPICS = {0: "Car_Location_1", 1: "Car_Location_2"}  # tag id -> car
+POSITION_SCALE = 10  # pixels -> position units, as in apriltag_post_to_channel_ALL.py
+VIDEO_EVERY = 5
+# Two sensor frame buffers: the next frame is read out while this one is
+# encoded (together with the two websocket send buffers this caps frame memory)
+SENSOR_FRAMEBUFFERS = 2
+STATS_INTERVAL_MS = 5000  # How often to publish frames/s, bitrate and settings on /camera/stats
+# Local MJPEG server: viewers on the camera's own network open
+# http://<camera ip>:MJPEG_PORT/ (or put .../stream in an <img>) and get the
+# raw JPEGs straight from the camera - no relay, no base64, well under 100 ms.
+# A slow viewer skips frames instead of holding up the camera. The channel
+# keeps getting frames too, unless CHANNEL = False (tiles, the ROI crop and
+# tag positions only go out on the channel, so those modes are off then).
+MJPEG_SERVER = False
+MJPEG_PORT = 8080
+MJPEG_VIEWERS = 3
+CHANNEL = True
+if not CHANNEL:
+    TILE_MODE = DUAL_STREAM = APRILTAG_MODE = False
 
 websock = websocket.Microwebsocket(WS_HOST, WS_PORT, WS_PATH)
+websock.fragment_size = FRAGMENT_SIZE
+
+class RateController:
+    """Adapts JPEG quality, frame size and inter-frame delay to the link.
+
+    Each frame reports how long capture + send took and how many bytes it
+    was. When a frame takes longer than the TARGET_FPS budget (or the
+    bitrate goes over TARGET_KBPS) quality drops, and then the frame size.
+    When there is plenty of slack, quality and then frame size go back up.
+    The pause between frames is only what is left of the budget, so there
+    is no sleep at all while the link is the bottleneck.
+    """
+    def __init__(self):
+        self.quality_range = QUALITY_RANGE
+        self.quality = (QUALITY_RANGE[0] + QUALITY_RANGE[1]) // 2
+        self.frame_sizes = FRAME_SIZES
+        self.size_index = START_FRAME_SIZE
+        self.set_target_fps(TARGET_FPS)
+        self.delay_ms = 0
+        self.frame_ms = self.budget_ms  # smoothed capture + send time
+        self.frame_bytes = 0  # smoothed frame size
+        self.last_resize = time.ticks_ms()
+
+        # Totals for the stats report
+        self.frames = 0
+        self.bytes = 0
+
+    def set_target_fps(self, fps):
+        self.target_fps = max(1, fps)
+        self.budget_ms = 1000 // self.target_fps
+
+    def set_quality(self, quality):
+        """Pin the JPEG quality, or None to let it adapt again"""
+        self.quality_range = QUALITY_RANGE if quality is None else (quality, quality)
+        self.quality = max(self.quality_range[0], min(self.quality_range[1], self.quality))
+
+    def lock_frame_size(self, frame_size):
+        """Capture at one (framesize, name) only; quality still adapts"""
+        self.frame_sizes = [frame_size]
+        self.size_index = 0
+
+    def apply_frame_size(self):
+        sensor.set_framesize(self.frame_sizes[self.size_index][0])
+        self.last_resize = time.ticks_ms()
+
+    def update(self, frame_ms, frame_bytes):
+        """Record one sent frame and adjust the settings for the next one"""
+        self.frames += 1
+        self.bytes += frame_bytes
+        self.frame_ms = (3 * self.frame_ms + frame_ms) // 4
+        self.frame_bytes = (3 * self.frame_bytes + frame_bytes) // 4
+
+        kbps = self.frame_bytes * 8 * self.target_fps // 1000
+        over_bitrate = TARGET_KBPS and kbps > TARGET_KBPS
+        # Frame size changes need a few frames to show in the averages
+        can_resize = time.ticks_diff(time.ticks_ms(), self.last_resize) > 2000
+
+        if self.frame_ms > self.budget_ms * 11 // 10 or over_bitrate:
+            if self.quality > self.quality_range[0]:
+                self.quality = max(self.quality_range[0], self.quality - 5)
+            elif self.size_index > 0 and can_resize:
+                self.size_index -= 1
+                self.quality = (self.quality_range[0] + self.quality_range[1]) // 2
+                self.apply_frame_size()
+        elif self.frame_ms < self.budget_ms * 6 // 10 and not (TARGET_KBPS and kbps > TARGET_KBPS * 8 // 10):
+            if self.quality < self.quality_range[1]:
+                self.quality = min(self.quality_range[1], self.quality + 2)
+            elif self.size_index < len(self.frame_sizes) - 1 and can_resize and \
+                    self.frame_ms < self.budget_ms * 4 // 10:
+                self.size_index += 1
+                self.quality = self.quality_range[0]
+                self.apply_frame_size()
+
+        # Only sleep off whatever is left of the frame budget
+        self.delay_ms = max(0, self.budget_ms - frame_ms)
+
+    def too_large(self):
+        """A frame didn't fit in one message: step down right away"""
+        if self.quality > self.quality_range[0]:
+            self.quality = max(self.quality_range[0], self.quality - 10)
+        elif self.size_index > 0:
+            self.size_index -= 1
+            self.apply_frame_size()
+
+    def take_stats(self, elapsed_ms):
+        """Stats since the last call, for /camera/stats"""
+        stats = {
+            "fps": round(self.frames * 1000 / elapsed_ms, 1),
+            "kbps": self.bytes * 8 // elapsed_ms,
+            "quality": self.quality,
+            "framesize": self.frame_sizes[self.size_index][1],
+            "frame_ms": self.frame_ms,
+            "delay_ms": self.delay_ms
+        }
+        self.frames = 0
+        self.bytes = 0
+        return stats
+
+class MotionGate:
+    """Decides whether a frame changed enough to be worth sending.
+
+    The frame is shrunk into a grayscale thumbnail and differenced against
+    the thumbnail of the last frame sent, using the camera's built-in
+    difference(), binary() and get_statistics(), so the check costs a few
+    milliseconds on 80x60 pixels instead of an encode and a send.
+    """
+    def __init__(self):
+        width, height = MOTION_SIZE
+        self.thumb = sensor.alloc_extra_fb(width, height, sensor.GRAYSCALE)
+        self.work = sensor.alloc_extra_fb(width, height, sensor.GRAYSCALE)
+        self.reference = sensor.alloc_extra_fb(width, height, sensor.GRAYSCALE)
+        self.has_reference = False
+        self.last_sent = time.ticks_ms()
+        self.keyframe = False
+        self.skipped = 0
+        self.change = 0.0
+        self.tile_rois = None  # thumbnail ROIs of the tiles last sent, None = whole frame
+
+    def check(self, img):
+        """True if img should be sent; sets keyframe when it is only the still-scene refresh"""
+        width, height = MOTION_SIZE
+        self.thumb.draw_image(img, 0, 0, x_scale=width / img.width(), y_scale=height / img.height())
+        if not self.has_reference:
+            self.keyframe = True
+            return True
+
+        self.work.draw_image(self.thumb, 0, 0)
+        self.work.difference(self.reference)
+        self.work.binary([(MOTION_PIXEL_THRESHOLD, 255)])
+        self.change = self.work.get_statistics().mean() * 100 / 255  # percent of pixels changed
+
+        if self.change >= MOTION_PERCENT:
+            self.keyframe = False
+            return True
+        if time.ticks_diff(time.ticks_ms(), self.last_sent) > KEYFRAME_INTERVAL_MS:
+            self.keyframe = True
+            return True
+        self.skipped += 1
+        return False
+
+    def changed_tiles(self, img, grid):
+        """(frame ROI, thumbnail ROI) of every grid tile that changed, after check()"""
+        columns, rows = grid
+        width, height = MOTION_SIZE
+        tile_w, tile_h = width // columns, height // rows
+        scale_x, scale_y = img.width() // columns, img.height() // rows
+        tiles = []
+        for row in range(rows):
+            for column in range(columns):
+                roi = (column * tile_w, row * tile_h, tile_w, tile_h)
+                if self.work.get_statistics(roi=roi).mean() * 100 / 255 >= TILE_PERCENT:
+                    tiles.append(((column * scale_x, row * scale_y, scale_x, scale_y), roi))
+        return tiles
+
+    def hotspot(self, img):
+        """Frame (x, y) centre of the biggest moving area after check(), or None"""
+        if not self.has_reference or self.change < MOTION_PERCENT:
+            return None
+        blobs = self.work.find_blobs([(128, 255)], merge=True)
+        if not blobs:
+            return None
+        blob = max(blobs, key=lambda b: b.pixels())
+        width, height = MOTION_SIZE
+        return (blob.cx() * img.width() // width, blob.cy() * img.height() // height)
+
+    def sent(self, tile_rois=None):
+        """The checked frame (or just these thumbnail tiles) went out: new reference"""
+        if tile_rois is None:
+            self.reference.draw_image(self.thumb, 0, 0)
+            self.last_sent = time.ticks_ms()
+        else:
+            # Unsent tiles keep comparing against what the viewer still shows
+            for roi in tile_rois:
+                self.reference.draw_image(self.thumb, roi[0], roi[1], roi=roi)
+        self.has_reference = True
+
+    def take_skipped(self):
+        skipped, self.skipped = self.skipped, 0
+        return skipped
+
+class RegionOfInterest:
+    """Picks and sends the crop for the dual stream, and shrinks the frame to the overview"""
+    def __init__(self):
+        self.roi = ROI  # pinned region, or None to follow motion
+        self.center = None
+        self.last_sent = time.ticks_ms()
+        self.frames = 0
+
+    def shrink(self, img):
+        """The whole field at OVERVIEW_SIZE, scaled in place once the crop is sent"""
+        # Not drawn into a kept buffer: that still holds last frame's JPEG, which can't be drawn on
+        width, height = OVERVIEW_SIZE
+        return img.scale(x_scale=width / img.width(), y_scale=height / img.height())
+
+    def due(self):
+        return time.ticks_diff(time.ticks_ms(), self.last_sent) >= ROI_INTERVAL_MS
+
+    def region(self, img):
+        """(x, y, w, h) to crop: the pinned ROI, or ROI_SIZE around the latest motion"""
+        if self.roi:
+            return self.roi
+        if motion:
+            self.center = motion.hotspot(img) or self.center
+        width, height = min(ROI_SIZE[0], img.width()), min(ROI_SIZE[1], img.height())
+        cx, cy = self.center or (img.width() // 2, img.height() // 2)
+        x = max(0, min(img.width() - width, cx - width // 2))
+        y = max(0, min(img.height() - height, cy - height // 2))
+        return (x, y, width, height)
+
+    async def send(self, seq, img):
+        """Crop, encode and queue the region on /camera/roi; returns bytes sent or None"""
+        self.last_sent = time.ticks_ms()
+        x, y, w, h = self.region(img)
+        jpeg = img.copy(roi=(x, y, w, h)).compress(quality=ROI_QUALITY)
+        if not FRAGMENT_SIZE and len(jpeg) > websocket.MAX_PAYLOAD - 100:
+            print(f"\nROI too large ({len(jpeg)}B), lower ROI_QUALITY or ROI_SIZE")
+            return 0
+        if BINARY_FRAMES:
+            sent = await websock.asend_binary("/camera/roi", seq, [struct.pack(websocket.ROI_HEADER, x, y, w, h), jpeg])
+        else:
+            sent = await websock.asend_image("/camera/roi", jpeg, f'"roi": [{x}, {y}, {w}, {h}]')
+        if not sent:
+            return None
+        self.frames += 1
+        return len(jpeg)
+
+    def take_frames(self):
+        frames, self.frames = self.frames, 0
+        return frames
+
+rate = RateController()
+if DUAL_STREAM:
+    rate.lock_frame_size(DUAL_FRAME_SIZE)
+motion = None
+dual = None
+local = None  # the MJPEG server
+paused = False
+
+def handle_message(message):
+    """Handle viewer commands sent on /camera/control, and clock requests"""
+    # e.g. {"quality": 30}, {"quality": "auto"}, {"fps": 5}, {"pause": true},
+    # {"roi": [x, y, w, h]}, {"roi": "auto"}
+    global paused
+    if not isinstance(message, dict):
+        return
+    if message.get("topic") == "/camera/clock":
+        # Viewers time a round trip against our clock to turn frame timestamps into latency
+        request = message.get("value")
+        if isinstance(request, dict) and "t0" in request:
+            # Queued by a task: this runs inside poll(), both send buffers may be full,
+            # and a fragmented frame may be part way out (asend waits its turn)
+            now = time.ticks_ms()
+            asyncio.create_task(websock.asend({"topic": "/camera/clock/reply",
+                                               "value": {"id": request.get("id"), "t0": request["t0"], "t1": now, "t2": now}}))
+        return
+    if message.get("topic") != "/camera/control":
+        return
+    command = message.get("value")
+    if not isinstance(command, dict):
+        return
+    print(f"\nCommand: {command}")
+    if "pause" in command:
+        paused = bool(command["pause"])
+    if "quality" in command:
+        rate.set_quality(None if command["quality"] == "auto" else int(command["quality"]))
+    if "fps" in command:
+        rate.set_target_fps(int(command["fps"]))
+    if "roi" in command and dual:
+        dual.roi = None if command["roi"] == "auto" else tuple(int(v) for v in command["roi"])
+
+websock.on_message = handle_message
 
 def init_camera():
     print("Initializing camera...")
     sensor.reset()
     sensor.set_pixformat(sensor.RGB565)
-    sensor.set_framesize(sensor.QVGA)
+    rate.apply_frame_size()
+    try:
+        sensor.set_framebuffers(SENSOR_FRAMEBUFFERS)
+    except (AttributeError, OSError):
+        print("Single frame buffer only")
 
     sensor.set_auto_gain(True)  #False, gain_db=10)
     sensor.set_auto_exposure(True)  #False, exposure_us=8000)
@@ -30,16 +379,68 @@ def init_camera():
 
 def snap():
     try:
-        img = sensor.snapshot()
-        jpeg_bytes = img.compress(quality=45)
-        base64_str = ubinascii.b2a_base64(jpeg_bytes).decode('utf-8').strip()
+        return sensor.snapshot()
+    except Exception as e:
+        print(f"Image capture error: {e}")
+        return None
+
+def encode_tiles(img, tiles, quality):
+    """JPEG each changed tile; returns [(x, y, w, h, jpeg), ...]"""
+    encoded = []
+    for (x, y, w, h), _ in tiles:
+        jpeg = img.copy(roi=(x, y, w, h)).compress(quality=quality)
+        encoded.append((x, y, w, h, jpeg))
+    return encoded
+
+async def publish_tags(img):
+    """Find AprilTags and publish the position of every known car; None if a send failed"""
+    tags = img.find_apriltags()
+    for tag in tags:
+        topic = TAG_TOPICS.get(tag.id)
+        if topic is None:
+            continue
+        position = {"x": tag.cx * POSITION_SCALE, "y": tag.cy * POSITION_SCALE,
+                    "rotation": int(math.degrees(tag.rotation))}
+        if not await websock.asend({"topic": f"/{topic}/All", "value": position}):
+            return None
+    return tags
 
-        #print(f"Image: {len(jpeg_bytes)}B -> {len(base64_str)}B base64")
+def draw_tags(img, tags):
+    """Mark the tags on the video frame"""
+    for tag in tags:
+        img.draw_rectangle(tag.rect, color=(255, 0, 0))
+        img.draw_cross(tag.cx, tag.cy, color=(0, 255, 0))
+        img.draw_string(tag.cx - 20, tag.cy - 30, "ID:" + str(tag.id), color=(255, 255, 255))
+
+async def send_tiles(seq, img, encoded):
+    """Queue the encoded tiles of one frame as one /camera/tiles message"""
+    if BINARY_FRAMES:
+        parts = [struct.pack(websocket.TILES_HEADER, img.width(), img.height(), len(encoded))]
+        for x, y, w, h, jpeg in encoded:
+            parts.append(struct.pack(websocket.TILE_HEADER, x, y, w, h, len(jpeg)))
+            parts.append(jpeg)
+        return await websock.asend_binary("/camera/tiles", seq, parts)
+    return await websock.asend({
+        "topic": "/camera/tiles",
+        "value": {
+            "seq": seq,
+            "width": img.width(),
+            "height": img.height(),
+            "tiles": [[x, y, w, h, ubinascii.b2a_base64(jpeg).decode('utf-8').strip()]
+                      for x, y, w, h, jpeg in encoded]
+        },
+        "timestamp": time.ticks_ms()
+    })
+
+def encode(img, quality):
+    """JPEG the frame in place; returns a view of the JPEG bytes (no copy)"""
+    try:
+        img.compress(quality=quality)
         print('.',end = '')
-        return base64_str
+        return memoryview(img.bytearray())
 
     except Exception as e:
-        print(f"Image capture error: {e}")
+        print(f"Image encode error: {e}")
         return None
 
 wlan = network.WLAN(network.STA_IF)
@@ -63,38 +464,155 @@ def connect_wifi():
     print(f"WiFi connected: {wlan.ifconfig()}")
     return True
 
-def main():
+async def keep_channel():
+    """Keep the channel connected, alongside capture and the local viewers"""
+    while True:
+        await websock.acheck()
+        await asyncio.sleep_ms(20)
+
+async def main():
+    global motion, dual, local
     init_camera()
+    if MOTION_GATE or TILE_MODE or (DUAL_STREAM and ROI is None):
+        motion = MotionGate()
+    if DUAL_STREAM:
+        dual = RegionOfInterest()
     if not connect_wifi():
         print("WiFi connection failed!")
         return
+    # Frames are queued and written in the background from here on
+    writer = websock.start_writer()
+    channel = asyncio.create_task(keep_channel()) if CHANNEL else None
+    server = None
+    if MJPEG_SERVER:
+        local = mjpeg.MjpegServer(MJPEG_PORT, MJPEG_VIEWERS)
+        server = asyncio.create_task(local.run())
+        print(f"MJPEG stream on http://{wlan.ifconfig()[0]}:{MJPEG_PORT}/")
 
     try:
         counter = 0
+        tag_frames = 0  # frames with tag updates since the last video frame
+        tag_updates = 0
+        stats_start = time.ticks_ms()
         while True:
-            if not websock.check():
+            # While the channel is down (re)connecting, local viewers still get frames
+            channel_up = CHANNEL and websock.ssl_sock is not None
+            if paused or not (channel_up or local):
+                await asyncio.sleep_ms(100)
+                continue
+
+            elapsed = time.ticks_diff(time.ticks_ms(), stats_start)
+            if elapsed > STATS_INTERVAL_MS:
+                stats = rate.take_stats(elapsed)
+                stats["send_ms"] = websock.take_stats()[1]
+                if motion:
+                    stats["skipped"] = motion.take_skipped()
+                if dual:
+                    stats["roi_frames"] = dual.take_frames()
+                if APRILTAG_MODE:
+                    stats["tag_fps"] = round(tag_updates * 1000 / elapsed, 1)
+                    tag_updates = 0
+                if local:
+                    stats["mjpeg"] = local.take_stats()
+                print(f"\n{stats}")
+                if channel_up:
+                    await websock.asend({"topic": "/camera/stats", "value": stats, "timestamp": time.ticks_ms()})
+                stats_start = time.ticks_ms()
+
+            frame_start = time.ticks_ms()
+            img = snap()
+            if img is None:
+                continue
+            if APRILTAG_MODE:
+                tags = await publish_tags(img) if channel_up else img.find_apriltags()
+                if tags is None:
+                    print(f"Failed to send tags ")
+                    websock.close()
+                    continue
+                tag_updates += 1
+                tag_frames += 1
+                if tag_frames < VIDEO_EVERY or websock.pending:
+                    # Positions only this frame; keep the frame rate
+                    await asyncio.sleep_ms(max(0, rate.budget_ms - time.ticks_diff(time.ticks_ms(), frame_start)))
+                    continue
+                tag_frames = 0
+                draw_tags(img, tags)
+            if motion and not motion.check(img):
+                # Nothing moved: skip the encode and send, check again next frame
+                await asyncio.sleep_ms(rate.budget_ms)
                 continue
 
-            base64_image = snap()
-            if base64_image:
-                image_message = {
-                    "topic": "/camera",
-                    "value": base64_image,
-                    "timestamp": time.ticks_ms()
-                }
-                #print(f"Sending image ...")
+            if dual:
+                # The sharp crop first, from the full-size frame, at its own pace
+                if channel_up and dual.due():
+                    roi_start = time.ticks_ms()
+                    roi_bytes = await dual.send(counter, img)
+                    if roi_bytes is None:
+                        print(f"Failed to send ROI ")
+                        websock.close()
+                        continue
+                    rate.bytes += roi_bytes
+                    # Keep the crop's time out of the overview's frame budget
+                    frame_start = time.ticks_add(frame_start, time.ticks_diff(time.ticks_ms(), roi_start))
+                img = dual.shrink(img)
+
+            if TILE_MODE and channel_up and not motion.keyframe and \
+                    time.ticks_diff(frame_start, motion.last_sent) < KEYFRAME_INTERVAL_MS:
+                tiles = motion.changed_tiles(img, TILE_GRID)
+                if not tiles:
+                    # Changes spread too thin to matter in any one tile
+                    await asyncio.sleep_ms(rate.budget_ms)
+                    continue
+                if len(tiles) * 100 <= MAX_TILES_PERCENT * TILE_GRID[0] * TILE_GRID[1]:
+                    encoded = encode_tiles(img, tiles, rate.quality)
+                    if not await send_tiles(counter, img, encoded):
+                        print(f"Failed to send tiles ")
+                        websock.close()
+                        continue
+                    rate.update(time.ticks_diff(time.ticks_ms(), frame_start),
+                                sum(len(tile[4]) for tile in encoded))
+                    motion.sent([roi for _, roi in tiles])
+                    counter += 1
+                    if rate.delay_ms:
+                        await asyncio.sleep_ms(rate.delay_ms)
+                    continue
 
-                if not websock.send(image_message):
+            # Give the writer a turn to top up the socket between steps
+            await asyncio.sleep_ms(0)
+            image = encode(img, rate.quality)
+            await asyncio.sleep_ms(0)
+            size = len(image) if BINARY_FRAMES or not image else websocket.base64_size(len(image))
+            if image and not FRAGMENT_SIZE and size > websocket.MAX_PAYLOAD - 100:
+                rate.too_large()
+                continue
+            if image:
+                if local:
+                    # Local viewers first: a copy, and no waiting on them
+                    local.offer(image)
+                keyframe = bool(motion and motion.keyframe)
+                if not channel_up:
+                    sent = True
+                elif BINARY_FRAMES:
+                    sent = await websock.asend_binary("/camera", counter, image,
+                                               websocket.FLAG_KEYFRAME if keyframe else 0)
+                else:
+                    # Base64 + JSON go straight into the send buffer
+                    sent = await websock.asend_image("/camera", image, '"keyframe": %s, "seq": %d' %
+                                                     ("true" if keyframe else "false", counter))
+
+                if not sent:
                     print(f"Failed to send image ")
-                    websock.ssl_sock.close()
-                    websock.ssl_sock = None
+                    websock.close()
                     continue
+                rate.update(time.ticks_diff(time.ticks_ms(), frame_start), size)
+                if motion:
+                    motion.sent()
 
-            # Wait between images
-            time.sleep(wait_time)
+            # Wait out the rest of the frame budget, if any
+            if rate.delay_ms:
+                await asyncio.sleep_ms(rate.delay_ms)
+            # Frames no longer leave garbage behind, so no regular gc.collect()
             counter += 1
-            if not (counter % 10): # garbage collect every 10 iterations
-                gc.collect()
 
     except KeyboardInterrupt:
         print("Stopping transmission...")
@@ -103,6 +621,12 @@ def main():
         print(f"Main error: {e}")
 
     finally:
+        writer.cancel()
+        if channel:
+            channel.cancel()
+        if server:
+            server.cancel()
+            local.close()
         if websock.ssl_sock:
             try:
                 websock.ssl_sock.close()
@@ -111,4 +635,8 @@ def main():
             except:
                 pass
         print("Connection closed")
-main()
+
+try:
+    asyncio.run(main())
+finally:
+    asyncio.new_event_loop()  # clean slate for the next run from the IDE
@@ -0,0 +1,236 @@
+import socket
+import time
+import errno
+import gc
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# MJPEG over plain HTTP, straight from the camera to viewers on the same
+# network: http://<camera ip>:<port>/ shows the stream, and /stream can go
+# in any <img>. Each frame is copied once, with its multipart part header
+# in front, and every viewer is sent that copy with non-blocking writes.
+# A viewer still busy with an older frame simply skips to the newest one
+# when it is done, so a slow viewer never holds up the camera or the
+# others. Two copies let a new frame come in while older ones go out.
+
+# What a non-blocking socket raises for "nothing yet, try again" (some
+# ports report a timeout rather than EAGAIN)
+WOULD_BLOCK = (errno.EAGAIN, errno.ETIMEDOUT)
+REQUEST_TIMEOUT_MS = 5000
+MAX_REQUEST = 1024
+
+STREAM_RESPONSE = (b'HTTP/1.1 200 OK\r\n'
+                   b'Content-Type: multipart/x-mixed-replace; boundary=frame\r\n'
+                   b'Cache-Control: no-cache, no-store\r\n'
+                   b'Access-Control-Allow-Origin: *\r\n'
+                   b'Connection: close\r\n\r\n')
+PAGE = (b'<!DOCTYPE html><html><head><title>OpenMV</title></head>'
+        b'<body style="margin:0;background:#000">'
+        b'<img src="/stream" style="display:block;margin:auto;max-width:100%">'
+        b'</body></html>')
+PAGE_RESPONSE = (b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n'
+                 b'Content-Length: ' + str(len(PAGE)).encode() + b'\r\n'
+                 b'Connection: close\r\n\r\n' + PAGE)
+NOT_FOUND = b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+BUSY = b'HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+
+# Content-Length is zero-padded so the digits can be written in place
+PART_HEADER = b'\r\n--frame\r\nContent-Type: image/jpeg\r\nContent-Length: 0000000\r\n\r\n'
+LENGTH_END = len(PART_HEADER) - 4  # just past the last digit
+
+class Frame:
+    """One copy of a JPEG, part header included, and how many viewers are sending it"""
+    def __init__(self):
+        self.buffer = bytearray(0)
+        self.length = 0
+        self.readers = 0
+
+    def fill(self, jpeg):
+        size = len(jpeg)
+        needed = len(PART_HEADER) + size
+        if len(self.buffer) < needed:
+            self.buffer = None
+            gc.collect()
+            self.buffer = bytearray((needed + 4095) // 4096 * 4096)
+            self.buffer[:len(PART_HEADER)] = PART_HEADER
+        pos = LENGTH_END
+        for _ in range(7):
+            pos -= 1
+            self.buffer[pos] = 48 + size % 10
+            size //= 10
+        self.buffer[len(PART_HEADER):needed] = jpeg
+        self.length = needed
+
+class Viewer:
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.request = bytearray()
+        self.opened = time.ticks_ms()
+        self.streaming = False
+        self.closing = False  # close once out is written
+        self.out = None  # what is being written, and how far
+        self.offset = 0
+        self.frame = None
+        self.seq = 0
+
+class MjpegServer:
+    def __init__(self, port=8080, max_viewers=3):
+        self.port = port
+        self.max_viewers = max_viewers
+        self.listener = None
+        self.viewers = []
+        self.frames = [Frame(), Frame()]
+        self.latest = None
+        self.seq = 0
+        # For the stats: frames written out, frames viewers skipped, and
+        # frames no copy was free for
+        self.sent = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def listen(self):
+        address = socket.getaddrinfo('0.0.0.0', self.port)[0][-1]
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind(address)
+        self.listener.listen(self.max_viewers)
+        self.listener.setblocking(False)
+
+    def close(self):
+        for viewer in self.viewers:
+            try:
+                viewer.sock.close()
+            except OSError:
+                pass
+        self.viewers = []
+        if self.listener:
+            self.listener.close()
+            self.listener = None
+
+    def offer(self, jpeg):
+        """Make a JPEG the newest frame; never waits for a viewer"""
+        for viewer in self.viewers:
+            if viewer.streaming:
+                break
+        else:
+            return  # nobody watching: skip the copy
+        for frame in self.frames:
+            if not frame.readers:
+                break
+        else:
+            # Both copies are still going out to slow viewers
+            self.dropped += 1
+            return
+        frame.fill(jpeg)
+        self.latest = frame
+        self.seq += 1
+
+    async def run(self):
+        """Accept viewers and feed them frames, alongside everything else"""
+        self.listen()
+        while True:
+            busy = self.accept()
+            for i in range(len(self.viewers) - 1, -1, -1):
+                busy = self.serve(self.viewers[i]) or busy
+            await asyncio.sleep_ms(0 if busy else 5)
+
+    def accept(self):
+        try:
+            sock, address = self.listener.accept()
+        except OSError:
+            return False
+        sock.setblocking(False)
+        if len(self.viewers) >= self.max_viewers:
+            print(f"\n⚠ MJPEG viewer turned away, {self.max_viewers} already watching")
+            try:
+                sock.send(BUSY)
+            except OSError:
+                pass
+            sock.close()
+            return True
+        self.viewers.append(Viewer(sock, address))
+        return True
+
+    def drop(self, viewer):
+        if viewer.frame:
+            viewer.frame.readers -= 1
+            viewer.frame = None
+        try:
+            viewer.sock.close()
+        except OSError:
+            pass
+        self.viewers.remove(viewer)
+        if viewer.streaming:
+            print(f"\nMJPEG viewer left: {viewer.address[0]}")
+
+    def serve(self, viewer):
+        """One step for one viewer; True when it got anywhere"""
+        if viewer.request is not None:
+            return self.read_request(viewer)
+        if viewer.out is None:
+            if not viewer.streaming or viewer.seq == self.seq:
+                return False
+            if viewer.seq:
+                self.skipped += self.seq - viewer.seq - 1
+            viewer.seq = self.seq
+            viewer.frame = self.latest
+            viewer.frame.readers += 1
+            viewer.out = memoryview(viewer.frame.buffer)[:viewer.frame.length]
+            viewer.offset = 0
+        try:
+            written = viewer.sock.send(viewer.out[viewer.offset:])
+        except OSError as e:
+            if e.args[0] not in WOULD_BLOCK:
+                self.drop(viewer)
+            return False
+        viewer.offset += written
+        if viewer.offset < len(viewer.out):
+            return True
+        viewer.out = None
+        if viewer.frame:
+            viewer.frame.readers -= 1
+            viewer.frame = None
+            self.sent += 1
+        if viewer.closing:
+            self.drop(viewer)
+        return True
+
+    def read_request(self, viewer):
+        try:
+            data = viewer.sock.recv(256)
+        except OSError as e:
+            if e.args[0] not in WOULD_BLOCK or \
+                    time.ticks_diff(time.ticks_ms(), viewer.opened) > REQUEST_TIMEOUT_MS:
+                self.drop(viewer)
+            return False
+        if not data:
+            self.drop(viewer)
+            return False
+        viewer.request.extend(data)
+        end = viewer.request.find(b'\r\n\r\n')
+        if end < 0:
+            if len(viewer.request) > MAX_REQUEST:
+                self.drop(viewer)
+            return True
+        parts = bytes(viewer.request[:end]).split(b' ')
+        path = parts[1] if len(parts) > 2 and parts[0] == b'GET' else b''
+        viewer.request = None
+        if path.startswith(b'/stream'):
+            print(f"\nMJPEG viewer: {viewer.address[0]}")
+            viewer.out = memoryview(STREAM_RESPONSE)
+            viewer.streaming = True
+        else:
+            viewer.out = memoryview(PAGE_RESPONSE if path in (b'/', b'/index.html') else NOT_FOUND)
+            viewer.closing = True
+        viewer.offset = 0
+        return True
+
+    def take_stats(self):
+        """Viewers now, and frames sent / skipped / dropped since the last call"""
+        stats = {"viewers": sum(1 for viewer in self.viewers if viewer.streaming),
+                 "sent": self.sent, "skipped": self.skipped, "dropped": self.dropped}
+        self.sent = self.skipped = self.dropped = 0
+        return stats
@@ -5,7 +5,112 @@ import time
 import binascii
 import json
 import random
+import struct
+import select
+import errno
 import gc
+try:
+    import asyncio
+except ImportError:
+    import uasyncio as asyncio
+
+# Frames are built in one reused buffer. The header is written so that it
+# ends at PAYLOAD_OFFSET and the payload starts word-aligned right after it,
+# so the mask can be applied 32 bits at a time in place.
+PAYLOAD_OFFSET = 16  # longest header: 2 + 8 length + 4 mask = 14 bytes
+MAX_PAYLOAD = 50000
+
+OP_TEXT = 0x81  # FIN + text frame
+OP_BINARY = 0x82  # FIN + binary frame
+OP_PING = 0x89
+OP_PONG = 0x8A
+OP_CLOSE = 0x88
+
+# Liveness: ping every PING_INTERVAL_MS, reconnect when nothing (pong or
+# any other frame) came back for PONG_TIMEOUT_MS
+PING_INTERVAL_MS = 5000
+PONG_TIMEOUT_MS = 15000
+# Inbound messages bigger than this (e.g. camera frames echoed by the
+# channel) are skipped without being buffered
+MAX_INBOUND = 4096
+
+# Binary camera frames: this header followed by the raw JPEG bytes.
+# magic b'OM', topic id, flags, sequence number, timestamp (ticks_ms)
+BINARY_HEADER = '>2sBBII'
+BINARY_HEADER_SIZE = struct.calcsize(BINARY_HEADER)
+BINARY_MAGIC = b'OM'
+FLAG_KEYFRAME = 0x01  # periodic refresh of a still scene, not motion
+TOPIC_IDS = {'/camera': 1, '/camera/tiles': 2, '/camera/roi': 3}
+# /camera/tiles payload after BINARY_HEADER: TILES_HEADER (frame width,
+# height, tile count), then per tile TILE_HEADER (x, y, w, h, JPEG length)
+# and the tile's JPEG bytes
+TILES_HEADER = '>HHB'
+TILE_HEADER = '>HHHHI'
+# /camera/roi payload after BINARY_HEADER: ROI_HEADER (x, y, w, h of the
+# crop in the full frame), then the crop's JPEG bytes
+ROI_HEADER = '>HHHH'
+
+try:
+    import micropython
+
+    @micropython.viper
+    def mask_words(buf: ptr32, start: int, end: int, mask: int):
+        # XOR whole 32-bit words of buf (word indexes start..end) with mask
+        i = start
+        while i < end:
+            buf[i] = buf[i] ^ mask
+            i += 1
+
+except (ImportError, AttributeError, NameError, SyntaxError):
+    # No viper emitter (or CPython): mask the words as one big integer
+    def mask_words(buf, start, end, mask):
+        first, last = start * 4, end * 4
+        words = int.from_bytes(buf[first:last], 'little')
+        mask = int.from_bytes(mask.to_bytes(4, 'little') * (end - start), 'little')
+        buf[first:last] = (words ^ mask).to_bytes(last - first, 'little')
+
+B64_TABLE = b'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+def base64_size(length):
+    return (length + 2) // 3 * 4
+
+try:
+    @micropython.viper
+    def b64_into(dst: ptr8, pos: int, src: ptr8, length: int, table: ptr8) -> int:
+        # Base64 of src[0:length] written into dst from pos; returns the end
+        i = 0
+        while i + 2 < length:
+            v = (src[i] << 16) | (src[i + 1] << 8) | src[i + 2]
+            dst[pos] = table[v >> 18]
+            dst[pos + 1] = table[(v >> 12) & 63]
+            dst[pos + 2] = table[(v >> 6) & 63]
+            dst[pos + 3] = table[v & 63]
+            i += 3
+            pos += 4
+        if i < length:
+            v = src[i] << 16
+            if i + 1 < length:
+                v |= src[i + 1] << 8
+            dst[pos] = table[v >> 18]
+            dst[pos + 1] = table[(v >> 12) & 63]
+            dst[pos + 2] = table[(v >> 6) & 63] if i + 1 < length else 61  # '='
+            dst[pos + 3] = 61
+            pos += 4
+        return pos
+
+except (NameError, AttributeError, SyntaxError):
+    def b64_into(dst, pos, src, length, table):
+        encoded = binascii.b2a_base64(bytes(src[:length]))[:-1]  # no newline
+        dst[pos:pos + len(encoded)] = encoded
+        return pos + len(encoded)
+
+class Base64:
+    """A piece of a message that goes out base64-encoded"""
+    def __init__(self, data):
+        self.data = memoryview(data)
+
+    def __len__(self):
+        return base64_size(len(self.data))
 
 class Microwebsocket():
     def __init__(self, WS_HOST, WS_PORT, WS_PATH):
@@ -13,6 +118,40 @@ class Microwebsocket():
         self.WS_HOST = WS_HOST
         self.WS_PORT = WS_PORT
         self.WS_PATH = WS_PATH
+        self.buffer = bytearray(PAYLOAD_OFFSET + 4096)
+        # Messages bigger than this go out as continuation frames (0 = never,
+        # and then nothing over MAX_PAYLOAD is sent); at least 4 bytes
+        self.fragment_size = 0
+
+        # Receive side: raw bytes not parsed yet, bytes of a skipped frame
+        # still to come, and the fragments of an unfinished message
+        self.poller = None
+        self.chunk = bytearray(1024)
+        self.rx = bytearray()
+        self.skip = 0
+        self.fragments = None
+        self.last_ping = 0
+        self.last_seen = 0
+        # Called with each inbound text message (JSON decoded when possible)
+        # or binary message (bytes)
+        self.on_message = None
+
+        # Time spent framing + writing, for the frames/s report
+        self.frames_sent = 0
+        self.send_ms = 0
+
+        # uasyncio mode (start_writer): frames are queued and written by
+        # run_writer on a non-blocking socket. At most one frame is being
+        # written and one waits, each in its own buffer, so the next frame
+        # is captured and encoded while the last one goes out.
+        self.async_mode = False
+        self.spare = None
+        self.pending = []
+        self.writing = False  # run_writer is part way through pending[0]
+        # Held by asend_pieces for a whole message, so the fragments of two
+        # messages never interleave (only control frames may go in between)
+        self.send_lock = None
+        self.addr = None  # looked up once by aconnect()
 
     def create_socket(self):
         sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -27,6 +166,22 @@ class Microwebsocket():
         """Generate random bytes compatible with OpenMV"""
         return bytes([random.randint(0, 255) for _ in range(length)])
 
+    def mask_key(self):
+        """32-bit masking key - one call instead of four randint()s"""
+        return random.getrandbits(32)
+
+    def reserve(self, length):
+        """Make sure the frame buffer fits a payload, growing it in 4 KB steps"""
+        if len(self.pending) >= 2:
+            # Both buffers are still queued: the caller has to await writable()
+            raise OSError("send queue full")
+        needed = PAYLOAD_OFFSET + (length + 3) // 4 * 4
+        if len(self.buffer) < needed:
+            self.buffer = None
+            gc.collect()
+            self.buffer = bytearray((needed + 4095) // 4096 * 4096)
+        return self.buffer
+
     def connect(self):
         try:
             print(f"Connecting to {self.WS_HOST}:{self.WS_PORT}...")
@@ -51,14 +206,8 @@ class Microwebsocket():
 
             print("SSL connection established")
 
-            # WebSocket handshake
-            random_bytes = self.get_random_bytes(16)
-            key = binascii.b2a_base64(random_bytes).decode().strip()
-            handshake = (
-                f"GET {self.WS_PATH} HTTP/1.1\r\nHost: {self.WS_HOST}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\nOrigin: https://esp32-device\r\n\r\n")
-
             print("Sending WebSocket handshake...")
-            self.ssl_sock.write(handshake.encode())
+            self.ssl_sock.write(self.upgrade_request())
 
             # Read handshake response
             response_bytes = b""
@@ -67,7 +216,83 @@ class Microwebsocket():
                 if not chunk:
                     break
                 response_bytes += chunk
+            return self.accept_upgrade(self.ssl_sock, response_bytes)
+
+        except Exception as e:
+            print(f"Connection error: {e}")
+            return None
+
+    async def aconnect(self, timeout_ms=10000):
+        """connect() for the uasyncio loop: awaits while the link is slow instead of blocking.
+
+        Only the name lookup still blocks, and only the first time.
+        """
+        sock = None
+        try:
+            print(f"Connecting to {self.WS_HOST}:{self.WS_PORT}...")
+            if not self.addr:
+                self.addr = socket.getaddrinfo(self.WS_HOST, self.WS_PORT, 0, socket.SOCK_STREAM)[0][-1]
+            deadline = time.ticks_add(time.ticks_ms(), timeout_ms)
+
+            sock = self.create_socket()
+            sock.setblocking(False)
+            try:
+                sock.connect(self.addr)
+            except OSError as e:
+                if e.args[0] not in (errno.EINPROGRESS, errno.EAGAIN):
+                    raise
+            poller = select.poll()
+            poller.register(sock, select.POLLOUT)
+            while True:
+                events = poller.poll(0)
+                if events:
+                    if events[0][1] & (select.POLLERR | select.POLLHUP):
+                        raise OSError("connection refused")
+                    break
+                if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                    raise OSError("connection timed out")
+                await asyncio.sleep_ms(20)
 
+            # The TLS handshake runs as the upgrade request goes out
+            sock = ssl.wrap_socket(sock, server_side=False, cert_reqs=ssl.CERT_NONE,
+                                   server_hostname=self.WS_HOST, do_handshake=False)
+            request = memoryview(self.upgrade_request())
+            response_bytes = b""
+            sent = 0
+            while b"\r\n\r\n" not in response_bytes:
+                if sent < len(request):
+                    sent += sock.write(request[sent:]) or 0
+                else:
+                    chunk = sock.read(1024)
+                    if chunk == b"":
+                        break
+                    if chunk:
+                        response_bytes += chunk
+                        continue
+                if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                    raise OSError("handshake timed out")
+                await asyncio.sleep_ms(10)
+            return self.accept_upgrade(sock, response_bytes)
+
+        except Exception as e:
+            print(f"Connection error: {e}")
+            if sock:
+                try:
+                    sock.close()
+                except:
+                    pass
+            return None
+
+    def upgrade_request(self):
+        """The WebSocket handshake request"""
+        random_bytes = self.get_random_bytes(16)
+        key = binascii.b2a_base64(random_bytes).decode().strip()
+        return (
+            f"GET {self.WS_PATH} HTTP/1.1\r\nHost: {self.WS_HOST}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\nOrigin: https://esp32-device\r\n\r\n").encode()
+
+    def accept_upgrade(self, sock, response_bytes):
+        """Finish connecting once the server answered the upgrade; returns sock, or None"""
+        try:
             # Decode response safely
             try:
                 response = response_bytes.decode('utf-8')
@@ -76,24 +301,39 @@ class Microwebsocket():
 
             if "101 Switching Protocols" in response:
                 print("WebSocket connected successfully!")
-                return self.ssl_sock
+                # Frames that arrived right behind the handshake response
+                self.rx = bytearray(response_bytes[response_bytes.find(b"\r\n\r\n") + 4:])
+                self.skip = 0
+                self.fragments = None
+                self.poller = select.poll()
+                self.poller.register(sock, select.POLLIN)
+                self.last_ping = self.last_seen = time.ticks_ms()
+                self.pending = []
+                if self.async_mode:
+                    sock.setblocking(False)
+                return sock
             else:
                 print("WebSocket handshake failed")
-                self.ssl_sock.close()
+                sock.close()
                 return None
 
         except Exception as e:
             print(f"Connection error: {e}")
             return None
 
+    def close(self):
+        if self.ssl_sock:
+            try:
+                self.ssl_sock.close()
+            except:
+                pass
+        self.ssl_sock = None
+        self.poller = None
+        self.pending = []
+
     def check(self):
-        # Check connection
-        if not self.ssl_sock or not self.ping():
-            if self.ssl_sock:
-                try:
-                    self.ssl_sock.close()
-                except:
-                    pass
+        self.keepalive()
+        if not self.ssl_sock:
             print("Connecting...")
             self.ssl_sock = self.connect()
 
@@ -101,51 +341,421 @@ class Microwebsocket():
             time.sleep(1)
         return True if self.ssl_sock else False
 
+    async def acheck(self):
+        """check() for the uasyncio loop: reconnects without blocking it"""
+        self.keepalive()
+        if not self.ssl_sock:
+            print("Connecting...")
+            self.ssl_sock = await self.aconnect()
+
+            print("Connected" if self.ssl_sock else "Connection failed, waiting...")
+            if not self.ssl_sock:
+                await asyncio.sleep_ms(1000)
+        return True if self.ssl_sock else False
+
+    def keepalive(self):
+        # Handle whatever the server sent, then check it is still answering
+        if self.ssl_sock:
+            self.poll()
+        if self.ssl_sock:
+            now = time.ticks_ms()
+            if time.ticks_diff(now, self.last_seen) > PONG_TIMEOUT_MS:
+                print("No reply from server, reconnecting")
+                self.close()
+            elif time.ticks_diff(now, self.last_ping) > PING_INTERVAL_MS:
+                self.last_ping = now
+                if not self.ping():
+                    self.close()
+
     def send(self, message):
+        return self.send_frame(json.dumps(message).encode('utf-8'))
+
+    def send_frame(self, payload, opcode=OP_TEXT):
+        """Mask and write one message from the reused buffer"""
+        return self.send_pieces([payload], opcode)
+
+    def image_pieces(self, topic, jpeg, fields=''):
+        """{"topic": topic, "value": "<base64 jpeg>", <fields>, "timestamp": ...} as pieces.
+
+        The base64 and the JSON around it are written straight into the
+        frame buffer, so no string the size of the image is ever allocated.
+        fields is extra JSON members, e.g. '"keyframe": true'.
+        """
+        head = b'{"topic": "' + topic.encode() + b'", "value": "'
+        tail = ('", ' + fields + (', ' if fields else '') + f'"timestamp": {time.ticks_ms()}}}').encode()
+        return [head, Base64(jpeg), tail]
+
+    def binary_pieces(self, topic, seq, data, flags=0):
+        """A BINARY_HEADER followed by data (e.g. a JPEG, or a list of buffers)"""
+        header = struct.pack(BINARY_HEADER, BINARY_MAGIC, TOPIC_IDS[topic], flags,
+                             seq & 0xFFFFFFFF, time.ticks_ms() & 0xFFFFFFFF)
+        return [header] + (list(data) if isinstance(data, (list, tuple)) else [data])
+
+    def send_image(self, topic, jpeg, fields=''):
+        """Send a JPEG as base64 in a JSON message (see image_pieces)"""
+        return self.send_pieces(self.image_pieces(topic, jpeg, fields), OP_TEXT)
+
+    def send_binary(self, topic, seq, data, flags=0):
+        """Send data (e.g. a JPEG) as a binary frame behind a BINARY_HEADER.
+
+        data can also be a list of buffers, which are sent back to back.
+        """
+        return self.send_pieces(self.binary_pieces(topic, seq, data, flags), OP_BINARY)
+
+    def send_pieces(self, pieces, opcode):
+        """Send buffers (and Base64 pieces) back to back as one message"""
+        if self.too_large(pieces) or (self.async_mode and not self.queue_room(pieces)):
+            return False
         try:
-            json_data = json.dumps(message)
-            payload = json_data.encode('utf-8')
-            length = len(payload)
+            for _ in self.message_frames(pieces, opcode):
+                pass
+            return True
+        except Exception as e:
+            print(f"Send error: {e}")
+            return False
 
-            if length > 50000:
-                print(f"Message too large: {length} bytes")
-                return False
+    def too_large(self, pieces):
+        length = 0
+        for piece in pieces:
+            length += len(piece)
+        if not self.fragment_size and length > MAX_PAYLOAD:
+            print(f"Message too large: {length} bytes")
+            return True
+        return False
 
-            # Create WebSocket frame
-            frame = bytearray()
-            frame.append(0x81)  # FIN bit set + text frame opcode
+    def queue_room(self, pieces):
+        """uasyncio mode: can a send() queue the whole message right now?
 
-            # Add payload length with mask bit
-            if length <= 125:
-                frame.append(0x80 | length)
-            elif length < 65536:
-                frame.append(0x80 | 126)
-                frame.extend(length.to_bytes(2, 'big'))
-            else:
-                frame.append(0x80 | 127)
-                frame.extend(length.to_bytes(8, 'big'))
+        It has to fit in one frame in a free buffer, with no asend() part
+        way through a message; otherwise nothing is queued at all.
+        """
+        length = 0
+        for piece in pieces:
+            length += len(piece)
+        if self.send_lock.locked() or len(self.pending) >= 2 or \
+                (self.fragment_size and length > self.fragment_size):
+            print("Send error: send queue full, use asend()")
+            return False
+        return True
 
-            # Add masking key
-            mask = self.get_random_bytes(4)
-            frame.extend(mask)
+    def message_frames(self, pieces, opcode):
+        """Write pieces as one message, yielding before each frame is built.
 
-            # Mask payload
-            for i, byte in enumerate(payload):
-                frame.append(byte ^ mask[i % 4])
+        With fragment_size set, a longer message goes out as a first frame
+        plus continuation frames of at most fragment_size, each filled
+        straight from the pieces, so the send buffer never holds more than
+        one fragment however big the image is.
+        """
+        pieces = [piece if isinstance(piece, Base64) else memoryview(piece) for piece in pieces]
+        remaining = 0
+        for piece in pieces:
+            remaining += len(piece)
+        limit = self.fragment_size or remaining
+        index = offset = 0  # where in pieces the next frame starts
+        frame_opcode = opcode & 0x0F  # text/binary first, then continuation (0)
+        while True:
+            yield
+            size = min(limit, remaining)
+            buf = self.reserve(size)
+            pos, end = PAYLOAD_OFFSET, PAYLOAD_OFFSET + size
+            while pos < end:
+                piece = pieces[index]
+                if isinstance(piece, Base64):
+                    data = piece.data
+                    # Whole 3-byte groups, except at the very end of the data
+                    take = min(len(data) - offset, (end - pos) // 4 * 3)
+                    if take <= 0 and offset < len(data):
+                        break  # no room for another group: next frame
+                    pos = b64_into(buf, pos, data[offset:offset + take], take, B64_TABLE)
+                else:
+                    data = piece
+                    take = min(len(data) - offset, end - pos)
+                    buf[pos:pos + take] = data[offset:offset + take]
+                    pos += take
+                offset += take
+                if offset >= len(data):
+                    index += 1
+                    offset = 0
+            length = pos - PAYLOAD_OFFSET
+            remaining -= length
+            self.write_frame(length, frame_opcode | (0 if remaining else 0x80))
+            if not remaining:
+                return
+            frame_opcode = 0
+
+    def write_frame(self, length, opcode):
+        """Add header and mask to the payload already at PAYLOAD_OFFSET, and write it"""
+        start_ms = time.ticks_ms()
+        buf = self.buffer
+
+        # Header right before the payload, mask bit set
+        if length <= 125:
+            start = PAYLOAD_OFFSET - 6
+            buf[start + 1] = 0x80 | length
+        elif length < 65536:
+            start = PAYLOAD_OFFSET - 8
+            buf[start + 1] = 0x80 | 126
+            struct.pack_into('>H', buf, start + 2, length)
+        else:
+            start = PAYLOAD_OFFSET - 14
+            buf[start + 1] = 0x80 | 127
+            struct.pack_into('>Q', buf, start + 2, length)
+        buf[start] = opcode
+
+        # Masking key goes in little-endian so byte i of the payload is
+        # XORed with key byte i % 4 when whole words are masked
+        mask = self.mask_key()
+        struct.pack_into('<I', buf, PAYLOAD_OFFSET - 4, mask)
+        mask_words(buf, PAYLOAD_OFFSET // 4, (PAYLOAD_OFFSET + length + 3) // 4, mask)
 
-            self.ssl_sock.write(frame)
+        frame = memoryview(buf)[start:PAYLOAD_OFFSET + length]
+        if self.async_mode:
+            # run_writer sends it; the next frame is built in the other buffer
+            self.pending.append(frame)
+            self.buffer, self.spare = self.spare or bytearray(len(buf)), buf
             return True
 
+        self.ssl_sock.write(frame)
+        if opcode & 0x80:  # count whole messages, not fragments
+            self.frames_sent += 1
+            self.send_ms += time.ticks_diff(time.ticks_ms(), start_ms)
+        return True
+
+    def start_writer(self):
+        """Switch to queued, non-blocking writes; returns the writer task"""
+        self.async_mode = True
+        self.send_lock = asyncio.Lock()
+        if self.ssl_sock:
+            self.ssl_sock.setblocking(False)
+        return asyncio.create_task(self.run_writer())
+
+    async def writable(self):
+        """Wait until a buffer is free for the next frame"""
+        while len(self.pending) >= 2:
+            await asyncio.sleep_ms(1)
+
+    async def asend(self, message):
+        """send(), waiting for a free buffer instead of blocking on the socket"""
+        return await self.asend_pieces([json.dumps(message).encode('utf-8')], OP_TEXT)
+
+    async def asend_image(self, topic, jpeg, fields=''):
+        """send_image(), waiting for a free buffer instead of blocking on the socket"""
+        return await self.asend_pieces(self.image_pieces(topic, jpeg, fields), OP_TEXT)
+
+    async def asend_binary(self, topic, seq, data, flags=0):
+        """send_binary(), waiting for a free buffer instead of blocking on the socket"""
+        return await self.asend_pieces(self.binary_pieces(topic, seq, data, flags), OP_BINARY)
+
+    async def asend_pieces(self, pieces, opcode):
+        """send_pieces(), waiting for a free buffer before each frame"""
+        if self.too_large(pieces):
+            return False
+        try:
+            async with self.send_lock:
+                sock = self.ssl_sock
+                for _ in self.message_frames(pieces, opcode):
+                    await self.writable()
+                    if self.ssl_sock is not sock:
+                        return False  # connection dropped partway through the message
+            return True
         except Exception as e:
             print(f"Send error: {e}")
             return False
 
+    async def run_writer(self):
+        """Write queued frames as fast as the socket takes them"""
+        while True:
+            if not self.ssl_sock or not self.pending:
+                await asyncio.sleep_ms(1)
+                continue
+            frame = self.pending[0]
+            sock = self.ssl_sock
+            start_ms = time.ticks_ms()
+            offset = 0
+            self.writing = True
+            try:
+                while offset < len(frame):
+                    written = sock.write(frame[offset:])
+                    if written:
+                        offset += written
+                    # Let capture and encoding run while the link catches up
+                    await asyncio.sleep_ms(0 if written else 1)
+                    if self.ssl_sock is not sock:
+                        break  # closed (and maybe reconnected) meanwhile
+            except OSError as e:
+                print(f"Send error: {e}")
+                self.close()
+                continue
+            finally:
+                self.writing = False
+            if self.pending and self.pending[0] is frame:
+                self.pending.pop(0)
+                if frame[0] & 0x80 and frame[0] & 0x0F < 0x8:  # whole messages, not fragments or pings
+                    self.frames_sent += 1
+                    self.send_ms += time.ticks_diff(time.ticks_ms(), start_ms)
+
+    def take_stats(self):
+        """(frames sent, average ms per send) since the last call"""
+        frames, send_ms = self.frames_sent, self.send_ms
+        self.frames_sent = self.send_ms = 0
+        return frames, send_ms / frames if frames else 0
+
     def ping(self):
+        """Send a ping; the answering pong shows up in last_seen"""
+        return self.send_control(OP_PING)
+
+    def send_control(self, opcode, payload=b'', now=False):
+        """Write a small control frame (ping, pong, close); now=True skips the queue"""
         try:
-            # Try to send a small ping frame
-            ping_frame = bytearray([0x89, 0x80])  # Ping frame with mask bit
-            ping_frame.extend(self.get_random_bytes(4))  # Mask key
-            self.ssl_sock.write(ping_frame)
+            mask = struct.pack('<I', self.mask_key())
+            frame = bytearray([opcode, 0x80 | len(payload)])  # mask bit set
+            frame.extend(mask)
+            for i, byte in enumerate(payload):
+                frame.append(byte ^ mask[i % 4])
+            if self.async_mode and not now:
+                # Never in the middle of a data frame: goes in the queue too
+                self.pending.append(memoryview(frame))
+            else:
+                self.ssl_sock.write(frame)
             return True
         except:
             return False
+
+    def poll(self):
+        """Read and handle the frames that have arrived, without blocking"""
+        try:
+            while self.ssl_sock and self.poller.poll(0):
+                count = self.ssl_sock.readinto(self.chunk)
+                if count is None:
+                    break  # non-blocking and only part of a TLS record so far
+                if not count:
+                    print("Server closed the connection")
+                    self.close()
+                    return False
+                data = memoryview(self.chunk)[:count]
+                # Throw away the rest of a frame we decided to skip
+                if self.skip:
+                    dropped = min(self.skip, count)
+                    self.skip -= dropped
+                    data = data[dropped:]
+                self.rx.extend(data)
+                while self.ssl_sock and self.read_frame():
+                    pass
+                if count < len(self.chunk):
+                    break
+        except OSError as e:
+            print(f"Receive error: {e}")
+            self.close()
+        return self.ssl_sock is not None
+
+    def read_frame(self):
+        """Take one complete frame off the receive buffer; False if there is none"""
+        rx = self.rx
+        if len(rx) < 2:
+            return False
+        length = rx[1] & 0x7F
+        pos = 2
+        if length == 126:
+            if len(rx) < 4:
+                return False
+            length = struct.unpack_from('>H', rx, 2)[0]
+            pos = 4
+        elif length == 127:
+            if len(rx) < 10:
+                return False
+            length = struct.unpack_from('>Q', rx, 2)[0]
+            pos = 10
+        mask = None
+        if rx[1] & 0x80:  # servers shouldn't mask, but allow it
+            if len(rx) < pos + 4:
+                return False
+            mask = rx[pos:pos + 4]
+            pos += 4
+
+        self.last_seen = time.ticks_ms()
+        fin = rx[0] & 0x80
+        opcode = rx[0] & 0x0F
+
+        if length > MAX_INBOUND:
+            # Too big to care about: drop it, including bytes still on the way
+            self.skip = max(0, pos + length - len(rx))
+            self.rx = rx[pos + length:] if not self.skip else bytearray()
+            self.fragments = None if fin else False  # False: skip the rest of the message
+            return True
+
+        if len(rx) < pos + length:
+            return False
+        payload = bytearray(rx[pos:pos + length])
+        self.rx = rx[pos + length:]
+        if mask:
+            for i in range(length):
+                payload[i] ^= mask[i % 4]
+
+        self.handle_frame(opcode, fin, payload)
+        return True
+
+    def handle_frame(self, opcode, fin, payload):
+        if opcode == 0x9:  # ping
+            self.send_control(OP_PONG, payload)
+        elif opcode == 0xA:  # pong, last_seen already updated
+            pass
+        elif opcode == 0x8:  # close
+            print("Server closed the connection")
+            # Written straight away: close() drops the queue. Not if the
+            # writer stopped part way through a frame - that would garble it.
+            if not self.writing:
+                self.send_control(OP_CLOSE, payload[:2], now=True)
+            self.close()
+        elif opcode in (0x1, 0x2):  # text, binary
+            self.fragments = None if fin else [opcode, payload]
+            if fin:
+                self.deliver(opcode, payload)
+        elif opcode == 0x0 and self.fragments:  # continuation
+            self.fragments[1].extend(payload)
+            if fin:
+                opcode, payload = self.fragments
+                self.fragments = None
+                self.deliver(opcode, payload)
+        elif opcode == 0x0 and fin:
+            self.fragments = None
+
+    def deliver(self, opcode, payload):
+        """Hand an inbound message to on_message"""
+        if not self.on_message:
+            return
+        if opcode == 0x1:
+            payload = bytes(payload).decode('utf-8')
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                pass
+        else:
+            payload = bytes(payload)
+        try:
+            self.on_message(payload)
+        except Exception as e:
+            print(f"Message callback error: {e}")
+
+def benchmark(size=16000, rounds=10):
+    """Time the old per-byte masking loop against the word-wide mask"""
+    payload = bytes(random.getrandbits(8) for _ in range(size))
+    mask = random.getrandbits(32)
+    mask_bytes = mask.to_bytes(4, 'little')
+
+    start = time.ticks_ms()
+    for _ in range(rounds):
+        frame = bytearray()
+        for i, byte in enumerate(payload):
+            frame.append(byte ^ mask_bytes[i % 4])
+    loop_ms = time.ticks_diff(time.ticks_ms(), start) / rounds
+
+    buf = bytearray(PAYLOAD_OFFSET + (size + 3) // 4 * 4)
+    start = time.ticks_ms()
+    for _ in range(rounds):
+        buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + size] = payload
+        mask_words(buf, PAYLOAD_OFFSET // 4, (PAYLOAD_OFFSET + size + 3) // 4, mask)
+    word_ms = time.ticks_diff(time.ticks_ms(), start) / rounds
+
+    assert bytes(buf[PAYLOAD_OFFSET:PAYLOAD_OFFSET + size]) == bytes(frame)
+    print(f"Masking {size} bytes: byte loop {loop_ms:.1f} ms, word-wide {word_ms:.1f} ms")
+    return loop_ms, word_ms
@@ -5,27 +5,132 @@ import websocket
 import ssl
 import json
 import time
+import socket
 from IPython.display import display, Javascript
 from google.colab.output import eval_js
-from base64 import b64decode, b64encode
-import PIL
-import io
+from base64 import b64decode
 import ipywidgets as widgets
+from concurrent.futures import ThreadPoolExecutor
+
+# Width of the grayscale frames the browser sends instead of 640x480 color
+# JPEGs (e.g. 320); 0 keeps the JPEGs. Smaller frames transfer and detect
+# faster, small or distant tags may be missed.
+GRAY_FRAME_WIDTH = 0
 
 class wss_CEEO():
-    def __init__(self, url):
+    """One persistent channel connection, reopened when it drops"""
+    def __init__(self, url, reconnect_delay=1.0):
         self.url = url
-    
-    def send_message(self, message):
-        ws = websocket.WebSocket(sslopt={"cert_reqs": ssl.CERT_NONE})
+        self.ws = None
+        self.reconnect_delay = reconnect_delay
+        self.last_connect_attempt = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.start_time = time.time()
+        self.messages_sent = 0
+        self.writes = 0
+        self.send_time = 0.0
+        self.connections = 0
+
+    def connect(self):
+        """Open the connection unless it is already open; False while backing off"""
+        if self.ws is not None and self.ws.connected:
+            return True
+        if time.time() - self.last_connect_attempt < self.reconnect_delay:
+            return False
+        self.last_connect_attempt = time.time()
+        self.close()
         try:
-            ws.connect(self.url)
-            ws.send(json.dumps(message))
-            print(f"Sent: {message}")
+            self.ws = websocket.WebSocket(sslopt={"cert_reqs": ssl.CERT_NONE})
+            self.ws.connect(self.url)
+            self.ws.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.connections += 1
+            print(f"Connected to {self.url}")
+            return True
         except Exception as e:
-            print(f"Error: {e}")
-        finally:
-            ws.close()
+            print(f"Connection error: {e}")
+            self.close()
+            return False
+
+    def send_messages(self, messages):
+        """Send several messages with a single socket write"""
+        if not messages:
+            return True
+        # Retry once on a fresh connection if the old one went away
+        for attempt in range(2):
+            if not self.connect():
+                return False
+            try:
+                start = time.perf_counter()
+                data = b''.join(websocket.ABNF.create_frame(json.dumps(message), websocket.ABNF.OPCODE_TEXT).format()
+                                for message in messages)
+                self.ws.sock.sendall(data)
+                self.send_time += time.perf_counter() - start
+                self.writes += 1
+                self.messages_sent += len(messages)
+                return True
+            except Exception as e:
+                print(f"Send error: {e}")
+                self.close()
+                self.last_connect_attempt = 0
+        return False
+
+    def send_message(self, message):
+        return self.send_messages([message])
+
+    def get_stats(self):
+        """Messages per second and average write latency since reset_stats()"""
+        elapsed = max(time.time() - self.start_time, 1e-6)
+        return {
+            'messages': self.messages_sent,
+            'messages_per_sec': self.messages_sent / elapsed,
+            'avg_write_ms': 1000 * self.send_time / self.writes if self.writes else 0.0,
+            'connections': self.connections
+        }
+
+    def close(self):
+        if self.ws is not None:
+            try:
+                self.ws.close()
+            except Exception:
+                pass
+            self.ws = None
+
+def benchmark_send(url, frames=50, tags_per_frame=4):
+    """Compare a connection per message with one persistent connection.
+
+    Sends the same frames of fake tag messages both ways and prints the
+    messages/s and the average latency per frame.
+    """
+    messages = [{'topic': '/Benchmark/All', 'value': {'x': i, 'y': i, 'rotation': 0.0}}
+                for i in range(tags_per_frame)]
+
+    # Before: a new TLS + WebSocket handshake for every message
+    start = time.perf_counter()
+    for _ in range(frames):
+        for message in messages:
+            ws = websocket.WebSocket(sslopt={"cert_reqs": ssl.CERT_NONE})
+            try:
+                ws.connect(url)
+                ws.send(json.dumps(message))
+            finally:
+                ws.close()
+    per_message = time.perf_counter() - start
+
+    # After: one connection, all tags of a frame in one write
+    client = wss_CEEO(url)
+    client.connect()
+    start = time.perf_counter()
+    for _ in range(frames):
+        client.send_messages(messages)
+    persistent = time.perf_counter() - start
+    client.close()
+
+    total = frames * tags_per_frame
+    for name, elapsed in (("connection per message", per_message), ("persistent connection", persistent)):
+        print(f"{name}: {total / elapsed:.1f} messages/s, {1000 * elapsed / frames:.1f} ms per frame")
+    return per_message, persistent
 
 class AprilTagDetector:
     def __init__(self):
@@ -36,7 +141,10 @@ class AprilTagDetector:
         self.ws_client = None
     
     def setup_websocket(self):
-        self.ws_client = wss_CEEO(self.uri)
+        if self.ws_client is None:
+            self.ws_client = wss_CEEO(self.uri)
+        self.ws_client.reset_stats()
+        self.ws_client.connect()
     
     def calculate_rotation(self, corners):
         dx = corners[1][0] - corners[0][0]  
@@ -47,6 +155,7 @@ class AprilTagDetector:
         if not tag_data or not self.ws_client:
             return
             
+        messages = []
         for tag in tag_data:
             message = {
                 'topic': f'/{self.selected_topic}/All',
@@ -56,28 +165,58 @@ class AprilTagDetector:
                     'rotation': round(tag['rotation'], 3)
                 }
             }
-            self.ws_client.send_message(message)
+            messages.append(message)
+        # All tags of the frame go out together on the open connection
+        self.ws_client.send_messages(messages)
 
 def video_stream():
     js = Javascript('''
-        var video, div = null, stream, captureCanvas, imgElement, labelElement;
-        var pendingResolve = null, shutdown = false;
+        var video, div = null, stream, captureCanvas, grayCanvas, overlayCanvas, labelElement;
+        var pendingResolve = null, prefetched = null, shutdown = false, grayWidth = 0;
         
         function removeDom() {
            stream.getVideoTracks()[0].stop();
            video.remove();
            div.remove();
-           video = div = stream = imgElement = captureCanvas = labelElement = null;
+           video = div = stream = overlayCanvas = captureCanvas = grayCanvas = labelElement = null;
+           prefetched = null;
+        }
+        
+        // Downscaled 8-bit luma, base64 encoded, or a color JPEG data URL
+        function captureFrame() {
+          if (grayWidth > 0) {
+            var grayHeight = Math.round(grayWidth * 480 / 640);
+            if (grayCanvas.width != grayWidth) {
+              grayCanvas.width = grayWidth;
+              grayCanvas.height = grayHeight;
+            }
+            var ctx = grayCanvas.getContext('2d', {willReadFrequently: true});
+            ctx.drawImage(video, 0, 0, grayWidth, grayHeight);
+            var rgba = ctx.getImageData(0, 0, grayWidth, grayHeight).data;
+            var gray = new Uint8Array(grayWidth * grayHeight);
+            for (var i = 0; i < gray.length; i++) {
+              gray[i] = (rgba[4 * i] * 77 + rgba[4 * i + 1] * 150 + rgba[4 * i + 2] * 29) >> 8;
+            }
+            var binary = '';
+            for (var i = 0; i < gray.length; i += 0x8000) {
+              binary += String.fromCharCode.apply(null, gray.subarray(i, i + 0x8000));
+            }
+            return {'gray': btoa(binary), 'width': grayWidth, 'height': grayHeight};
+          }
+          captureCanvas.getContext('2d').drawImage(video, 0, 0, 640, 480);
+          return {'img': captureCanvas.toDataURL('image/jpeg', 0.8)};
+        }
+        
+        function grabFrame() {
+          return new Promise(function(resolve, reject) {
+            pendingResolve = resolve;
+          });
         }
         
         function onAnimationFrame() {
           if (!shutdown) window.requestAnimationFrame(onAnimationFrame);
           if (pendingResolve) {
-            var result = "";
-            if (!shutdown) {
-              captureCanvas.getContext('2d').drawImage(video, 0, 0, 640, 480);
-              result = captureCanvas.toDataURL('image/jpeg', 0.8)
-            }
+            var result = shutdown ? "" : captureFrame();
             var lp = pendingResolve;
             pendingResolve = null;
             lp(result);
@@ -110,11 +249,13 @@ def video_stream():
           stream = await navigator.mediaDevices.getUserMedia({video: { facingMode: "environment"}});
           div.appendChild(video);
 
-          imgElement = document.createElement('img');
-          imgElement.style.position = 'absolute';
-          imgElement.style.zIndex = 1;
-          imgElement.onclick = () => { shutdown = true; };
-          div.appendChild(imgElement);
+          overlayCanvas = document.createElement('canvas');
+          overlayCanvas.width = 640;
+          overlayCanvas.height = 480;
+          overlayCanvas.style.position = 'absolute';
+          overlayCanvas.style.zIndex = 1;
+          overlayCanvas.onclick = () => { shutdown = true; };
+          div.appendChild(overlayCanvas);
           
           const instruction = document.createElement('div');
           instruction.innerHTML = '<span style="color: red; font-weight: bold;">When finished, click here or on the video to stop this demo</span>';
@@ -127,12 +268,39 @@ def video_stream():
           captureCanvas = document.createElement('canvas');
           captureCanvas.width = 640;
           captureCanvas.height = 480;
+          grayCanvas = document.createElement('canvas');
           window.requestAnimationFrame(onAnimationFrame);
           
           return stream;
         }
         
-        async function stream_frame(label, imgData) {
+        // Draw primitives sent from Python, in 640x480 frame coordinates
+        function drawOverlay(commands) {
+          var ctx = overlayCanvas.getContext('2d');
+          ctx.clearRect(0, 0, overlayCanvas.width, overlayCanvas.height);
+          for (const cmd of commands) {
+            ctx.strokeStyle = ctx.fillStyle = cmd.color;
+            if (cmd.type == 'circle') {
+              ctx.beginPath();
+              ctx.arc(cmd.x, cmd.y, cmd.r, 0, 2 * Math.PI);
+              ctx.fill();
+            } else if (cmd.type == 'text') {
+              ctx.font = 'bold 14px sans-serif';
+              ctx.fillText(cmd.text, cmd.x, cmd.y);
+            } else if (cmd.type == 'poly') {
+              ctx.lineWidth = 2;
+              ctx.beginPath();
+              ctx.moveTo(cmd.points[0][0], cmd.points[0][1]);
+              for (const p of cmd.points.slice(1)) ctx.lineTo(p[0], p[1]);
+              ctx.closePath();
+              ctx.stroke();
+            }
+          }
+        }
+        
+        // Returns the frame captured while Python worked on the previous one
+        // and starts capturing the next, so capture overlaps detection
+        async function stream_frame(label, overlay, frameWidth) {
           if (shutdown) {
             removeDom();
             shutdown = false;
@@ -140,24 +308,28 @@ def video_stream():
           }
 
           stream = await createDom();
+          grayWidth = frameWidth;
           
           if (label != "") labelElement.innerHTML = label;
                 
-          if (imgData != "") {
+          if (overlay !== null) {
             var videoRect = video.getClientRects()[0];
-            imgElement.style.top = videoRect.top + "px";
-            imgElement.style.left = videoRect.left + "px";
-            imgElement.style.width = videoRect.width + "px";
-            imgElement.style.height = videoRect.height + "px";
-            imgElement.src = imgData;
+            overlayCanvas.style.top = videoRect.top + "px";
+            overlayCanvas.style.left = videoRect.left + "px";
+            overlayCanvas.style.width = videoRect.width + "px";
+            overlayCanvas.style.height = videoRect.height + "px";
+            drawOverlay(overlay);
           }
           
-          var result = await new Promise(function(resolve, reject) {
-            pendingResolve = resolve;
-          });
-          shutdown = false;
+          var result = prefetched !== null ? await prefetched : await grabFrame();
+          if (result === "") {
+            removeDom();
+            shutdown = false;
+            return '';
+          }
+          prefetched = grabFrame();
           
-          return {'img': result};
+          return result;
         }
         
         function stopVideoStream() {
@@ -166,35 +338,51 @@ def video_stream():
         ''')
     display(js)
   
-def video_frame(label, bbox):
-    return eval_js('stream_frame("{}", "{}")'.format(label, bbox))
-
-def js_to_image(js_reply):
-    image_bytes = b64decode(js_reply.split(',')[1])
-    jpg_as_np = np.frombuffer(image_bytes, dtype=np.uint8)
-    return cv2.imdecode(jpg_as_np, flags=1)
-
-def bbox_to_bytes(bbox_array):
-    bbox_PIL = PIL.Image.fromarray(bbox_array, 'RGBA')
-    iobuf = io.BytesIO()
-    bbox_PIL.save(iobuf, format='png')
-    return 'data:image/png;base64,{}'.format(str(b64encode(iobuf.getvalue()), 'utf-8'))
-
-def detect_apriltags(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+def video_frame(label, overlay, gray_width=GRAY_FRAME_WIDTH):
+    # json.dumps quotes the label and turns the overlay into a JS array literal
+    return eval_js('stream_frame({}, {}, {})'.format(json.dumps(label), json.dumps(overlay), int(gray_width)))
+
+def js_to_gray(js_reply):
+    """Grayscale frame and its scale factor to 640x480 coordinates"""
+    if 'gray' in js_reply:
+        gray = np.frombuffer(b64decode(js_reply['gray']), dtype=np.uint8)
+        gray = gray.reshape(js_reply['height'], js_reply['width'])
+        return gray, 640 / js_reply['width']
+    return cv2.imdecode(np.frombuffer(b64decode(js_reply['img'].split(',')[1]), dtype=np.uint8),
+                        cv2.IMREAD_GRAYSCALE), 1.0
+
+def build_overlay(results, scale=1.0):
+    """Draw commands for stream_frame: tag outline, center dot and ID label"""
+    overlay = []
+    for r in results:
+        corners = np.round(r.corners * scale).astype(int)
+        overlay.append({'type': 'poly', 'points': corners.tolist(), 'color': 'lime'})
+        overlay.append({'type': 'circle', 'x': int(r.center[0] * scale), 'y': int(r.center[1] * scale),
+                        'r': 5, 'color': 'blue'})
+        overlay.append({'type': 'text', 'text': f"ID: {r.tag_id}", 'color': 'yellow',
+                        'x': int(corners[0][0]), 'y': int(corners[0][1]) - 15})
+    return overlay
+
+def detect_apriltags(gray, scale=1.0):
     results = detector.detector.detect(gray)
     
     tag_data = []
     for r in results:
         tag_data.append({
             'id': r.tag_id,
-            'x': float(r.center[0]),
-            'y': float(r.center[1]),
+            'x': float(r.center[0]) * scale,
+            'y': float(r.center[1]) * scale,
             'rotation': detector.calculate_rotation(r.corners)
         })
     
     return results, tag_data
 
+def process_frame(js_reply):
+    """Decode and detect one frame (runs on the worker thread)"""
+    gray, scale = js_to_gray(js_reply)
+    results, tag_data = detect_apriltags(gray, scale)
+    return results, tag_data, scale
+
 def create_ui():
     global detector, topic_dropdown, start_button, stop_button, status_label
     
@@ -264,49 +452,61 @@ def stop_detection():
     stop_button.disabled = True
     status_label.value = "<b>Status:</b> Stopped"
     
+    if detector.ws_client:
+        stats = detector.ws_client.get_stats()
+        print(f"Sent {stats['messages']} messages, {stats['messages_per_sec']:.1f}/s, "
+              f"{stats['avg_write_ms']:.2f} ms per write, {stats['connections']} connections")
+        detector.ws_client.close()
+    
     try:
         eval_js('stopVideoStream()')
     except:
         pass
 
 def detection_loop():
-    bbox = ''
+    overlay = None
     last_send_time = time.time()
     send_interval = 0.1
-    bbox_array = np.zeros([480,640,4], dtype=np.uint8)
+    label = 'Detecting AprilTags...'
+    
+    # Frame N is decoded and detected on the worker while the browser
+    # round trip fetches frame N+1
+    worker = ThreadPoolExecutor(max_workers=1)
+    pending = None
+    frame_count = 0
+    fps_start = time.time()
     
     while detector.is_running:
         try:
-            js_reply = video_frame('Detecting AprilTags...', bbox)
+            js_reply = video_frame(label, overlay)
             if not js_reply:
                 break
 
-            img = js_to_image(js_reply["img"])
-            results, tag_data = detect_apriltags(img)
-            
-            bbox_array.fill(0)
-            bbox = ''
+            if pending is not None:
+                results, tag_data, scale = pending.result()
+                
+                # A few draw commands instead of a PNG; an empty list clears the overlay
+                overlay = build_overlay(results, scale)
 
-            if results:
-                for r in results:
-                    (cX, cY) = (int(r.center[0]), int(r.center[1]))
-                    cv2.circle(bbox_array, (cX, cY), 5, (0, 0, 255), -1)
-                    cv2.putText(bbox_array, f"ID: {r.tag_id}", (int(r.corners[0][0]), int(r.corners[0][1]) - 15),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+                current_time = time.time()
+                if tag_data and (current_time - last_send_time) > send_interval:
+                    detector.send_apriltag_data(tag_data)
+                    last_send_time = current_time
 
-                bbox_array[:,:,3] = (bbox_array.max(axis=2) > 0).astype(int) * 255
-                bbox = bbox_to_bytes(bbox_array)
+                frame_count += 1
+                if current_time - fps_start >= 1.0:
+                    label = f'Detecting AprilTags... {frame_count / (current_time - fps_start):.1f} FPS'
+                    frame_count = 0
+                    fps_start = current_time
 
-            current_time = time.time()
-            if tag_data and (current_time - last_send_time) > send_interval:
-                detector.send_apriltag_data(tag_data)
-                last_send_time = current_time
+            pending = worker.submit(process_frame, js_reply)
 
         except Exception as e:
             print(f"Detection error: {e}")
             detector.is_running = False
             break
     
+    worker.shutdown(wait=False)
     stop_detection()
 
 def main():
@@ -0,0 +1,39 @@
+"""SharedMemorySink read from another process: python -m pytest test_shared_memory_sink.py"""
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import shared_memory
+
+import pytest
+
+from vscode_apriltag import DetectionBatch, SharedMemorySink
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+READER = """
+import vscode_apriltag
+print(vscode_apriltag.SharedMemorySink.read({name!r}))
+"""
+
+def test_reader_process_leaves_the_segment():
+    name = f"apriltag_test_{os.getpid()}"
+    sink = SharedMemorySink(name)
+    try:
+        tags = DetectionBatch([7], [[100.0, 50.0]], positions=[[100, 50]], rotations=[90.0])
+        sink.write({'topic': 'test', 'seq': 3, 'timestamp': time.time(), 'tags': tags})
+
+        # Separate consumers, not multiprocessing children sharing our tracker;
+        # the second only finds the segment if the first left it alone
+        for _ in range(2):
+            result = subprocess.run([sys.executable, "-c", READER.format(name=name)], cwd=HERE,
+                                    capture_output=True, text=True, timeout=60)
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.startswith("(3, ")
+            assert "(7.0, 100.0, 50.0, 90.0)" in result.stdout
+            assert "leaked shared_memory" not in result.stderr
+    finally:
+        sink.close()
+    # ...and the sink still cleans up after itself
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
@@ -3,16 +3,226 @@ import numpy as np
 import websocket
 import ssl
 import json
+import os
 import time
 import math
+import base64
+import socket
+import struct
+import logging
 import tkinter as tk
 from tkinter import ttk
-from threading import Thread, Event
+from threading import Thread, Event, Condition, Lock
 import queue
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
  
 # WebSocket channel configuration
 uri = "wss://chrisrogers.pyscriptapps.com/talking-on-a-channel/api/channels/hackathon"
+
+# Run capture + detection and the network sender in their own processes.
+# Frames and detections are shared through a shared-memory ring buffer so the
+# Tk GUI, the preview window and the WebSocket sends can't stall detection.
+USE_DETECTION_PROCESS = False
+RING_SLOTS = 4  # Frames kept in the shared ring (must be >= 3)
+
+# Capture sources (webcam indexes or video URLs). With more than one camera,
+# each one is mapped into the shared arena frame (ARENA_SIZE) by its own
+# homography, detection runs per camera in parallel and tags seen by several
+# cameras are fused into one stream.
+CAMERA_SOURCES = [0]
+# Arena rectangle (x0, y0, x1, y1) covered by each camera. Calibrate a camera
+# by clicking that rectangle's 4 corners in its window ('s' key); the
+# homographies are saved to CALIBRATION_FILE. Example for two overlapping
+# cameras: [(0, 0, 1100, 1080), (820, 0, 1920, 1080)]
+CAMERA_ARENA_REGIONS = [(0, 0, 1920, 1080)]
+CALIBRATION_FILE = "camera_calibration.json"
+ARENA_SIZE = (1920, 1080)
+SEAM_MARGIN = 0.1  # Share of the image size over which a camera's weight fades out at its edges
+FUSION_MAX_AGE = 0.15  # Seconds a camera's detections are used for fusion
+
+# Publish the annotated detector view as JPEGs on the channel, in the same
+# format as the OpenMV streamer so the OpenMV Stream page can show it
+STREAM_ENABLED = False
+STREAM_TOPIC = "/camera"
+STREAM_FPS = 10  # Max frames per second sent
+STREAM_QUALITY = 60  # JPEG quality (0-100)
+STREAM_WIDTH = 640  # Frames are downscaled to this width before encoding
+
+# Extra outputs for the detections, next to the WebSocket channel. Every
+# output (sink) has its own queue and thread, so a slow one never holds back
+# the others.
+UDP_MULTICAST_ENABLED = False  # One datagram per frame for consumers on the LAN
+UDP_MULTICAST_GROUP = "239.255.42.99"
+UDP_MULTICAST_PORT = 5005
+FILE_SINK_PATH = None  # e.g. "detections.jsonl", or "detections.bin" for packed records
+SHM_SINK_NAME = None  # e.g. "apriltag_positions" - latest positions in shared memory
+
+# Console logging. Per-send messages are DEBUG, so the default WARNING level
+# keeps production runs quiet; the counters in the status API and overlay
+# show what is happening instead.
+LOG_LEVEL = logging.WARNING
+LOG_INTERVAL = 5.0  # Seconds between repeats of the same log message
+
+def setup_logging():
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(message)s")
+
+class RateLimitedLogger:
+    """Levelled logger that emits each message key at most once per interval.
+
+    Messages are an event key plus keyword fields. Repeats inside the interval
+    are only counted and the count is added to the next line that gets out,
+    so hot paths can log every tick without flooding the console.
+    """
+    def __init__(self, name, interval=LOG_INTERVAL):
+        self.logger = logging.getLogger(name)
+        self.interval = interval
+        self.last_emit = {}
+        self.suppressed = {}
+        self.lock = Lock()
+
+    def log(self, level, key, message, interval=None, **fields):
+        # Cheap exit before any formatting when the level is off
+        if not self.logger.isEnabledFor(level):
+            return
+        interval = self.interval if interval is None else interval
+
+        now = time.monotonic()
+        with self.lock:
+            if now - self.last_emit.get(key, -interval) < interval:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return
+            self.last_emit[key] = now
+            suppressed = self.suppressed.pop(key, 0)
+
+        if fields:
+            message += " " + " ".join(f"{name}={value}" for name, value in fields.items())
+        if suppressed:
+            message += f" (+{suppressed} similar)"
+        self.logger.log(level, f"[{key}] {message}")
+
+    def debug(self, key, message, **fields):
+        self.log(logging.DEBUG, key, message, **fields)
+
+    def info(self, key, message, **fields):
+        self.log(logging.INFO, key, message, **fields)
+
+    def warning(self, key, message, **fields):
+        self.log(logging.WARNING, key, message, **fields)
+
+    def error(self, key, message, **fields):
+        self.log(logging.ERROR, key, message, **fields)
+
+class Counters:
+    """Thread-safe in-memory event counters"""
+    def __init__(self, *names):
+        self.values = dict.fromkeys(names, 0)
+        self.lock = Lock()
+
+    def increment(self, name, amount=1):
+        with self.lock:
+            self.values[name] = self.values.get(name, 0) + amount
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.values)
+
+log = RateLimitedLogger("apriltag")
+
+class DetectionBatch:
+    """The tags detected in one frame, stored as parallel NumPy arrays.
+
+    ids (n,), centers (n, 2) in image pixels, corners (n, 4, 2) in image
+    pixels (NaN when unknown), confidences (n,), positions (n, 2) integer
+    arena coordinates and rotations (n,) in degrees. Scaling, clamping,
+    rotation and serialization run on whole arrays, so the cost barely
+    changes between 2 and 50 tags.
+    """
+    # Packed record layout shared by the binary file sink: tag_id, x, y, rotation
+    RECORD_DTYPE = np.dtype([('tag_id', '<i4'), ('x', '<i4'), ('y', '<i4'), ('rotation', '<f4')])
+
+    def __init__(self, ids, centers, corners=None, confidences=None, positions=None, rotations=None):
+        count = len(ids)
+        self.ids = np.asarray(ids, dtype=np.int64).reshape(count)
+        self.centers = np.asarray(centers, dtype=np.float64).reshape(count, 2)
+        if corners is None:
+            corners = np.full((count, 4, 2), np.nan)
+        self.corners = np.asarray(corners, dtype=np.float64).reshape(count, 4, 2)
+        self.confidences = np.ones(count) if confidences is None else \
+            np.asarray(confidences, dtype=np.float64).reshape(count)
+        self.positions = self.centers.astype(np.int64) if positions is None else \
+            np.asarray(positions, dtype=np.int64).reshape(count, 2)
+        self.rotations = self.compute_rotations(self.corners) if rotations is None else \
+            np.asarray(rotations, dtype=np.float64).reshape(count)
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros(0), np.zeros((0, 2)))
+
+    @classmethod
+    def from_detections(cls, detections):
+        """Gather the fields of apriltag/pupil_apriltags results into arrays"""
+        if not detections:
+            return cls.empty()
+        first = detections[0]
+        id_field = 'tag_id' if hasattr(first, 'tag_id') else 'id'
+        corners = np.array([tag.corners for tag in detections], dtype=np.float64)
+        if hasattr(first, 'center'):
+            centers = np.array([tag.center for tag in detections], dtype=np.float64)
+        else:
+            centers = corners.mean(axis=1)
+        return cls([getattr(tag, id_field) for tag in detections], centers, corners,
+                   [getattr(tag, 'decision_margin', 1.0) for tag in detections])
+
+    @staticmethod
+    def compute_rotations(corners):
+        """Heading of each tag's top edge (corner 3 -> corner 2), 0-360 degrees"""
+        top_edge = corners[:, 2] - corners[:, 3]  # top-right - top-left
+        rotations = np.degrees(np.arctan2(top_edge[:, 1], top_edge[:, 0])) % 360
+        # Less precision for performance; no corners means no heading
+        return np.nan_to_num(np.round(rotations, 1))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def scale(self, scale_x, scale_y, width=1920, height=1080):
+        """Set the arena positions from the image centers"""
+        positions = (self.centers * (scale_x, scale_y)).astype(np.int64)
+        np.clip(positions, 0, (width, height), out=positions)
+        self.positions = positions
+        return self
+
+    def subset(self, index):
+        """The tags selected by a slice, index array or boolean mask"""
+        return DetectionBatch(self.ids[index], self.centers[index], self.corners[index],
+                              self.confidences[index], self.positions[index], self.rotations[index])
+
+    def rows(self):
+        """(n, 4) float64 rows of tag_id, x, y, rotation"""
+        return np.column_stack((self.ids, self.positions, self.rotations)).astype(np.float64)
+
+    def records(self):
+        """Packed little-endian records, see RECORD_DTYPE"""
+        records = np.empty(len(self), dtype=self.RECORD_DTYPE)
+        records['tag_id'] = self.ids
+        records['x'] = self.positions[:, 0]
+        records['y'] = self.positions[:, 1]
+        records['rotation'] = self.rotations
+        return records.tobytes()
+
+    def to_dicts(self):
+        """[{'id', 'x', 'y', 'rotation'}, ...] for JSON outputs"""
+        return [{'id': tag_id, 'x': x, 'y': y, 'rotation': rotation}
+                for tag_id, (x, y), rotation in zip(self.ids.tolist(), self.positions.tolist(),
+                                                    self.rotations.tolist())]
+
+    def messages(self, topic):
+        """Channel messages, one per tag"""
+        topic = f'/{topic}/All'
+        return [{'topic': topic, 'value': {'x': x, 'y': y, 'rotation': rotation}}
+                for (x, y), rotation in zip(self.positions.tolist(), self.rotations.tolist())]
  
 class wss_CEEO():
     def __init__(self, url):
@@ -30,13 +240,29 @@ class wss_CEEO():
         self.keepalive_thread = None
         self.keepalive_running = False
         self.connection_event = Event()
+        self.connect_lock = Lock()
+
+        # Message counters for the status API
+        self.counters = Counters('sent', 'failed', 'reconnects', 'superseded')
+        self.ever_connected = False
         
-        # Connect and start keepalive
-        self.connect()
+        # Connect in the keepalive thread so creating a client never blocks;
+        # wait on connection_event to know when the link is up
         self.start_keepalive()
  
     def connect(self):
         """Establish persistent WebSocket connection with retry logic"""
+        with self.connect_lock:
+            # Another thread may have connected while we waited for the lock
+            if self.connected:
+                return
+            delay = self._connect()
+        # Back off outside the lock so senders aren't stuck behind the wait
+        if delay:
+            time.sleep(delay)
+
+    def _connect(self):
+        """One connection attempt; returns how long to wait before the next (0 when connected)"""
         try:
             if self.ws:
                 try:
@@ -44,7 +270,7 @@ class wss_CEEO():
                 except:
                     pass
                     
-            print(f"Attempting to connect to WebSocket... (attempt {self.reconnect_attempts + 1})")
+            log.info("connect", "Attempting to connect to WebSocket...", attempt=self.reconnect_attempts + 1)
             self.ws = websocket.WebSocket(sslopt={"cert_reqs": ssl.CERT_NONE})
             self.ws.settimeout(10)  # Set timeout for connection
             self.ws.connect(self.url)
@@ -53,22 +279,25 @@ class wss_CEEO():
             self.last_activity = time.time()
             self.reconnect_attempts = 0
             self.connection_event.set()
-            print("✓ WebSocket connected successfully")
+            if self.ever_connected:
+                self.counters.increment('reconnects')
+            self.ever_connected = True
+            log.info("connected", "✓ WebSocket connected successfully")
+            return 0
             
         except Exception as e:
-            print(f"✗ WebSocket connection error: {e}")
+            log.warning("connect.error", "✗ WebSocket connection error", error=e)
             self.connected = False
             self.connection_event.clear()
             self.reconnect_attempts += 1
             
             if self.reconnect_attempts < self.max_reconnect_attempts:
                 delay = min(self.reconnect_delay * self.reconnect_attempts, 60)  # Exponential backoff, max 60s
-                print(f"Will retry connection in {delay} seconds...")
-                time.sleep(delay)
-            else:
-                print("Max reconnection attempts reached. Will continue trying with longer delays...")
-                time.sleep(60)  # Wait longer before retrying
-                self.reconnect_attempts = 0  # Reset counter for continued attempts
+                log.info("connect.retry", "Will retry connection", delay_s=delay)
+                return delay
+            log.warning("connect.backoff", "Max reconnection attempts reached. Will continue trying with longer delays...")
+            self.reconnect_attempts = 0  # Reset counter for continued attempts
+            return 60  # Wait longer before retrying
 
     def start_keepalive(self):
         """Start the keepalive thread"""
@@ -76,7 +305,7 @@ class wss_CEEO():
             self.keepalive_running = True
             self.keepalive_thread = Thread(target=self._keepalive_worker, daemon=True)
             self.keepalive_thread.start()
-            print("Keepalive thread started")
+            log.debug("keepalive.start", "Keepalive thread started")
 
     def _keepalive_worker(self):
         """Background thread for connection monitoring and keepalive"""
@@ -86,7 +315,7 @@ class wss_CEEO():
                 
                 # Check if connection is stale
                 if self.connected and (current_time - self.last_activity) > self.connection_timeout:
-                    print("Connection appears stale, forcing reconnection...")
+                    log.warning("stale", "Connection appears stale, forcing reconnection...")
                     self.connected = False
                     self.connection_event.clear()
                 
@@ -102,7 +331,7 @@ class wss_CEEO():
                 time.sleep(5)  # Check every 5 seconds
                 
             except Exception as e:
-                print(f"Keepalive worker error: {e}")
+                log.error("keepalive.error", "Keepalive worker error", error=e)
                 time.sleep(10)  # Wait longer on error
 
     def _send_keepalive(self):
@@ -115,10 +344,10 @@ class wss_CEEO():
                 }
                 self.ws.send(json.dumps(keepalive_msg))
                 self.last_activity = time.time()
-                print("♥ Keepalive sent")
+                log.debug("keepalive", "♥ Keepalive sent")
                 return True
         except Exception as e:
-            print(f"Keepalive send error: {e}")
+            log.warning("keepalive.send_error", "Keepalive send error", error=e)
             self.connected = False
             self.connection_event.clear()
             return False
@@ -148,7 +377,7 @@ class wss_CEEO():
         while retry_count < max_retries:
             # Ensure we're connected
             if not self.connected:
-                print("Not connected, attempting to reconnect...")
+                log.info("reconnect", "Not connected, attempting to reconnect...")
                 self.connect()
                 if not self.connected:
                     retry_count += 1
@@ -158,10 +387,11 @@ class wss_CEEO():
                 if self.ws:
                     self.ws.send(json.dumps(message))
                     self.last_activity = time.time()
+                    self.counters.increment('sent')
                     return True
                     
             except Exception as e:
-                print(f"Send error (attempt {retry_count + 1}): {e}")
+                log.warning("send.error", "Send error", attempt=retry_count + 1, error=e)
                 self.connected = False
                 self.connection_event.clear()
                 
@@ -172,7 +402,8 @@ class wss_CEEO():
                 else:
                     break
         
-        print("Failed to send message after retries")
+        self.counters.increment('failed')
+        log.warning("send.failed", "Failed to send message after retries")
         return False
 
     def send_multiple(self, messages, retry_on_failure=True):
@@ -186,7 +417,7 @@ class wss_CEEO():
         while retry_count < max_retries:
             # Ensure we're connected
             if not self.connected:
-                print("Not connected, attempting to reconnect...")
+                log.info("reconnect", "Not connected, attempting to reconnect...")
                 self.connect()
                 if not self.connected:
                     retry_count += 1
@@ -200,11 +431,12 @@ class wss_CEEO():
                         successful_sends += 1
                     
                     self.last_activity = time.time()
-                    print(f"✓ Successfully sent {successful_sends} messages")
+                    self.counters.increment('sent', successful_sends)
+                    log.debug("send.multiple", "✓ Successfully sent messages", count=successful_sends)
                     return True
                     
             except Exception as e:
-                print(f"Send multiple error (attempt {retry_count + 1}): {e}")
+                log.warning("send.error", "Send multiple error", attempt=retry_count + 1, error=e)
                 self.connected = False
                 self.connection_event.clear()
                 
@@ -215,7 +447,8 @@ class wss_CEEO():
                 else:
                     break
         
-        print("Failed to send multiple messages after retries")
+        self.counters.increment('failed', len(messages))
+        log.warning("send.failed", "Failed to send multiple messages after retries", count=len(messages))
         return False
 
     def get_connection_status(self):
@@ -225,12 +458,13 @@ class wss_CEEO():
             'last_activity': self.last_activity,
             'time_since_activity': time.time() - self.last_activity,
             'reconnect_attempts': self.reconnect_attempts,
-            'keepalive_running': self.keepalive_running
+            'keepalive_running': self.keepalive_running,
+            'counters': self.counters.snapshot()
         }
 
     def close(self):
         """Close the WebSocket connection and cleanup"""
-        print("Closing WebSocket connection...")
+        log.info("close", "Closing WebSocket connection...")
         self.keepalive_running = False
         
         if self.keepalive_thread:
@@ -244,8 +478,345 @@ class wss_CEEO():
             
         self.connected = False
         self.connection_event.clear()
-        print("WebSocket connection closed")
+        log.info("closed", "WebSocket connection closed")
  
+class FrameStreamer:
+    """Publishes annotated frames as base64 JPEGs on a channel topic.
+
+    submit() only swaps in the newest frame, so the detection loop never
+    waits on encoding or the network. A worker thread encodes and sends at
+    most `fps` frames a second over its own connection; frames that arrive
+    while it is busy are dropped, never queued.
+    """
+    def __init__(self, url, topic=STREAM_TOPIC, fps=STREAM_FPS,
+                 quality=STREAM_QUALITY, width=STREAM_WIDTH):
+        self.url = url
+        self.topic = topic
+        self.interval = 1.0 / fps
+        self.quality = quality
+        self.width = width
+        self.channel_client = None
+
+        self.pending = None
+        self.condition = Condition()
+        self.running = False
+        self.thread = None
+
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        """Start the encoder/sender thread"""
+        self.running = True
+        self.thread = Thread(target=self._stream_worker, daemon=True)
+        self.thread.start()
+        print(f"Streaming annotated view on {self.topic} "
+              f"({1.0 / self.interval:.0f} FPS max, quality {self.quality})")
+
+    def submit(self, frame):
+        """Offer a frame to the stream; replaces any frame not yet sent"""
+        with self.condition:
+            if self.pending is not None:
+                self.frames_dropped += 1
+            self.pending = frame
+            self.condition.notify()
+
+    def _stream_worker(self):
+        """Background thread that encodes and publishes the newest frame"""
+        # Own connection, so big image messages never delay tag positions
+        self.channel_client = wss_CEEO(self.url)
+        next_time = 0
+
+        while self.running:
+            delay = next_time - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+            with self.condition:
+                while self.pending is None and self.running:
+                    self.condition.wait(0.5)
+                frame, self.pending = self.pending, None
+            if frame is None:
+                continue
+
+            next_time = time.time() + self.interval
+            if not self.channel_client.connected:
+                # The keepalive thread reconnects; don't stall on it here
+                self.frames_dropped += 1
+                continue
+
+            try:
+                if frame.shape[1] > self.width:
+                    height = int(frame.shape[0] * self.width / frame.shape[1])
+                    frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+                ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                if not ok:
+                    continue
+
+                message = {
+                    "topic": self.topic,
+                    "value": base64.b64encode(jpeg).decode('ascii'),
+                    "timestamp": int(time.time() * 1000)
+                }
+                if self.channel_client.send_message(message, retry_on_failure=False):
+                    self.frames_sent += 1
+                else:
+                    self.frames_dropped += 1
+            except Exception as e:
+                log.warning("stream.error", "Stream error", error=e)
+
+    def stop(self):
+        """Stop streaming and close the stream connection"""
+        self.running = False
+        with self.condition:
+            self.condition.notify()
+        if self.thread:
+            self.thread.join(timeout=2)
+        if self.channel_client:
+            self.channel_client.close()
+
+class OutputSink:
+    """One output for detection batches, with its own queue and thread.
+
+    publish() never blocks: when the sink is still busy with an older batch,
+    that batch is replaced by the new one and counted as superseded.
+    Subclasses implement write(batch), which returns True on success. A batch
+    is a dict with 'topic', 'seq', 'timestamp' and 'tags'.
+    """
+    name = "sink"
+
+    def __init__(self, queue_size=1):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.counters = Counters('sent', 'failed', 'superseded')
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._sink_worker, daemon=True)
+        self.thread.start()
+        log.info("sink.start", "Output sink started", sink=self.name)
+
+    def publish(self, batch):
+        """Queue a batch for this sink, replacing one that wasn't written yet"""
+        while True:
+            try:
+                self.queue.put_nowait(batch)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.counters.increment('superseded')
+                except queue.Empty:
+                    pass
+
+    def _sink_worker(self):
+        """Background thread that writes batches as they arrive"""
+        while self.running:
+            try:
+                batch = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                self.write(batch)
+            except Exception as e:
+                self.counters.increment('failed')
+                log.warning("sink.error", "Sink error", sink=self.name, error=e)
+
+    def write(self, batch):
+        raise NotImplementedError
+
+    def close(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+
+class WebSocketSink(OutputSink):
+    """Sends batches as channel messages over a wss_CEEO connection"""
+    name = "websocket"
+
+    def __init__(self, channel_client, max_consecutive_failures=5):
+        super().__init__()
+        self.channel_client = channel_client
+        # Share the client's counters so the status API shows one set
+        self.counters = channel_client.counters
+        self.consecutive_failures = 0
+        self.max_consecutive_failures = max_consecutive_failures
+
+    def write(self, batch):
+        # Until the link is up keep only the newest batch (latest-value buffering)
+        while not self.channel_client.connection_event.wait(0.1):
+            if not self.running:
+                return False
+            try:
+                batch = self.queue.get_nowait()
+                self.counters.increment('superseded')
+            except queue.Empty:
+                pass
+
+        messages = batch['tags'].messages(batch['topic'])
+        log.debug("send", "Sending messages", count=len(messages))
+        if self.channel_client.send_multiple(messages):
+            self.consecutive_failures = 0
+            return True
+
+        self.consecutive_failures += 1
+        log.warning("send.failed", "✗ Failed to send messages", failure=self.consecutive_failures)
+        # If too many consecutive failures, wait longer
+        if self.consecutive_failures >= self.max_consecutive_failures:
+            log.warning("send.pause", "Too many consecutive failures, waiting 30 seconds...")
+            time.sleep(30)
+            self.consecutive_failures = 0
+        return False
+
+class UdpMulticastSink(OutputSink):
+    """Sends each batch as one JSON datagram to a LAN multicast group"""
+    name = "udp"
+
+    def __init__(self, group=UDP_MULTICAST_GROUP, port=UDP_MULTICAST_PORT, ttl=1):
+        super().__init__()
+        self.address = (group, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, ttl)
+
+    def write(self, batch):
+        payload = {
+            'topic': f"/{batch['topic']}/All",
+            'seq': batch['seq'],
+            'timestamp': batch['timestamp'],
+            'tags': batch['tags'].to_dicts()
+        }
+        self.sock.sendto(json.dumps(payload).encode(), self.address)
+        self.counters.increment('sent', len(batch['tags']))
+        return True
+
+    def close(self):
+        super().close()
+        self.sock.close()
+
+class FileSink(OutputSink):
+    """Appends batches to a file: JSON lines, or packed records for .bin files"""
+    name = "file"
+    BATCH_HEADER = struct.Struct('<dIH')  # timestamp, seq, tag count
+    # Followed by DetectionBatch.RECORD_DTYPE records: tag_id, x, y, rotation
+
+    def __init__(self, path=FILE_SINK_PATH, flush_interval=1.0):
+        # Deeper queue - a file keeps every batch rather than just the latest
+        super().__init__(queue_size=256)
+        self.name = f"file:{path}"
+        self.binary = path.endswith('.bin')
+        self.file = open(path, 'ab' if self.binary else 'a')
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+
+    def write(self, batch):
+        tags = batch['tags']
+        if self.binary:
+            self.file.write(self.BATCH_HEADER.pack(batch['timestamp'], batch['seq'], len(tags)))
+            self.file.write(tags.records())
+        else:
+            line = {
+                'topic': f"/{batch['topic']}/All",
+                'seq': batch['seq'],
+                'timestamp': batch['timestamp'],
+                'tags': tags.to_dicts()
+            }
+            self.file.write(json.dumps(line) + "\n")
+
+        if time.time() - self.last_flush > self.flush_interval:
+            self.file.flush()
+            self.last_flush = time.time()
+        self.counters.increment('sent', len(tags))
+        return True
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+def attach_shared_memory(name):
+    """Open another process's shared memory without taking it over.
+
+    Before Python 3.13 attaching also registers the segment with this
+    process's resource tracker, which unlinks it (warning about a leak) when
+    this process exits - out from under the process that created it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+class SharedMemorySink(OutputSink):
+    """Keeps the latest positions in a named shared-memory slot.
+
+    Layout: int64 sequence (-1 while writing), float64 timestamp, int64 tag
+    count, then MAX_TAGS rows of float64 (tag_id, x, y, rotation). Other
+    processes on this machine can read it with SharedMemorySink.read(name).
+    """
+    name = "shm"
+    MAX_TAGS = 64
+    HEADER = struct.Struct('<qdq')
+
+    def __init__(self, shm_name=SHM_SINK_NAME):
+        super().__init__()
+        size = self.HEADER.size + self.MAX_TAGS * 4 * 8
+        try:
+            self.shm = shared_memory.SharedMemory(name=shm_name, create=True, size=size)
+            self.owner = True
+        except FileExistsError:
+            self.shm = attach_shared_memory(shm_name)
+            self.owner = False
+        self.rows = np.ndarray((self.MAX_TAGS, 4), dtype=np.float64,
+                               buffer=self.shm.buf, offset=self.HEADER.size)
+
+    def write(self, batch):
+        rows = batch['tags'].rows()[:self.MAX_TAGS]
+        self.HEADER.pack_into(self.shm.buf, 0, -1, batch['timestamp'], len(rows))
+        self.rows[:len(rows)] = rows
+        self.HEADER.pack_into(self.shm.buf, 0, batch['seq'], batch['timestamp'], len(rows))
+        self.counters.increment('sent', len(rows))
+        return True
+
+    @classmethod
+    def read(cls, shm_name=SHM_SINK_NAME):
+        """Read (seq, timestamp, [(tag_id, x, y, rotation), ...]) from a slot"""
+        shm = attach_shared_memory(shm_name)
+        view = None
+        try:
+            view = np.ndarray((cls.MAX_TAGS, 4), dtype=np.float64,
+                              buffer=shm.buf, offset=cls.HEADER.size)
+            while True:
+                seq, timestamp, count = cls.HEADER.unpack_from(shm.buf, 0)
+                rows = view[:max(count, 0)].copy()
+                # Retry if the writer was in the middle of an update
+                if seq >= 0 and cls.HEADER.unpack_from(shm.buf, 0)[0] == seq:
+                    return seq, timestamp, [tuple(row) for row in rows.tolist()]
+                time.sleep(0)
+        finally:
+            view = None
+            shm.close()
+
+    def close(self):
+        super().close()
+        self.rows = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+def create_sinks(channel_client):
+    """Build the output sinks selected in the configuration"""
+    sinks = []
+    if channel_client is not None:
+        sinks.append(WebSocketSink(channel_client))
+    if UDP_MULTICAST_ENABLED:
+        sinks.append(UdpMulticastSink())
+    if FILE_SINK_PATH:
+        sinks.append(FileSink())
+    if SHM_SINK_NAME:
+        sinks.append(SharedMemorySink())
+    return sinks
+
 class PerspectiveSelector:
     def __init__(self, frame_shape):
         self.points = []
@@ -341,31 +912,185 @@ class PerspectiveSelector:
         self.reset()
         self.selecting = True
         print("Click 4 corners of the area you want to crop (in any order)")
- 
+
+class SharedFrameRing:
+    """Ring buffer of frames and detections in multiprocessing shared memory.
+
+    A single writer (the detection process) fills the slots in order and any
+    number of readers map the same block. Each slot has a sequence number that
+    is set to -1 while the slot is written, so a reader can detect a torn read
+    by checking the number again after copying (seqlock style).
+    """
+    MAX_TAGS = 64
+    TAG_FIELDS = 6  # tag_id, x, y, rotation, center_x, center_y
+    STATUS_FIELDS = ('connected', 'last_activity', 'reconnect_attempts',
+                     'keepalive_running', 'detection_fps',
+                     'sent', 'failed', 'reconnects', 'superseded')
+
+    def __init__(self, frame_shape, num_slots=RING_SLOTS, name=None):
+        self.frame_shape = tuple(frame_shape)
+        self.num_slots = num_slots
+        height, width, channels = self.frame_shape
+
+        layout = [
+            ('latest', np.int64, (1,)),
+            ('status', np.float64, (len(self.STATUS_FIELDS),)),
+            ('slot_seq', np.int64, (num_slots,)),
+            ('timestamps', np.float64, (num_slots,)),
+            ('tag_counts', np.int64, (num_slots,)),
+            ('tags', np.float64, (num_slots, self.MAX_TAGS, self.TAG_FIELDS)),
+            ('corners', np.float32, (num_slots, self.MAX_TAGS, 4, 2)),
+            ('frames', np.uint8, (num_slots, height, width, channels)),
+        ]
+
+        # Lay the arrays out back to back, 64-byte aligned
+        offsets = []
+        size = 0
+        for field, dtype, shape in layout:
+            offsets.append(size)
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            size += (nbytes + 63) // 64 * 64
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        for (field, dtype, shape), offset in zip(layout, offsets):
+            setattr(self, field, np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offset))
+
+        if self.owner:
+            self.latest[0] = 0
+            self.status.fill(0)
+            self.slot_seq.fill(0)
+            self.tag_counts.fill(0)
+
+    def spec(self):
+        """Everything another process needs to attach to this ring"""
+        return {'name': self.shm.name, 'frame_shape': self.frame_shape, 'num_slots': self.num_slots}
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to a ring created by another process"""
+        return cls(spec['frame_shape'], spec['num_slots'], name=spec['name'])
+
+    def latest_seq(self):
+        return int(self.latest[0])
+
+    def begin_write(self):
+        """Claim the next slot; returns (slot, seq, frame view to fill in place)"""
+        seq = self.latest_seq() + 1
+        slot = seq % self.num_slots
+        self.slot_seq[slot] = -1
+        return slot, seq, self.frames[slot]
+
+    def end_write(self, slot, seq, tags, timestamp=None):
+        """Store the detections for a slot and publish it to readers"""
+        count = min(len(tags), self.MAX_TAGS)
+        self.tags[slot, :count, :4] = tags.rows()[:count]
+        self.tags[slot, :count, 4:] = tags.centers[:count]
+        self.corners[slot, :count] = tags.corners[:count]
+        self.tag_counts[slot] = count
+        self.timestamps[slot] = timestamp if timestamp is not None else time.time()
+        self.slot_seq[slot] = seq
+        self.latest[0] = seq
+
+    def abort_write(self, slot):
+        """Give back a slot claimed with begin_write without publishing it"""
+        self.slot_seq[slot] = 0
+
+    def read(self, seq=None, with_frame=True):
+        """Read a slot (the newest by default).
+
+        Returns (seq, timestamp, frame, tags) or None when the slot is empty or
+        was overwritten while it was read. The frame is a private copy so the
+        caller can draw on it; pass with_frame=False to skip it entirely.
+        """
+        if seq is None:
+            seq = self.latest_seq()
+        if seq <= 0:
+            return None
+        slot = seq % self.num_slots
+        if self.slot_seq[slot] != seq:
+            return None
+
+        timestamp = float(self.timestamps[slot])
+        count = int(self.tag_counts[slot])
+        tag_rows = self.tags[slot, :count].copy()
+        corner_rows = self.corners[slot, :count].copy()
+        frame = self.frames[slot].copy() if with_frame else None
+
+        # Writer got to this slot while we were copying it
+        if self.slot_seq[slot] != seq:
+            return None
+
+        tags = DetectionBatch(tag_rows[:, 0], tag_rows[:, 4:6], corner_rows,
+                              positions=tag_rows[:, 1:3], rotations=tag_rows[:, 3])
+        return seq, timestamp, frame, tags
+
+    def write_status(self, status):
+        # Message counters are flattened into the same status array
+        status = dict(status, **status.get('counters', {}))
+        for i, field in enumerate(self.STATUS_FIELDS):
+            if field in status:
+                self.status[i] = float(status[field])
+
+    def read_status(self):
+        return {field: float(self.status[i]) for i, field in enumerate(self.STATUS_FIELDS)}
+
+    def close(self):
+        """Detach from the ring; the creating process also frees it"""
+        # Drop our numpy views first, otherwise the buffer can't be released
+        for field in ('latest', 'status', 'slot_seq', 'timestamps', 'tag_counts',
+                      'tags', 'corners', 'frames'):
+            setattr(self, field, None)
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
 class AprilTagDetector:
-    def __init__(self, channel_client):
-        # Import and initialize AprilTag detector
+    def __init__(self, channel_client, source=0):
+        # Building the detector and opening the camera are independent and
+        # both slow - do them at the same time
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            detector_future = pool.submit(self.create_detector)
+            self.open_camera(source)
+            self.detector = detector_future.result()
+        self.init_state(channel_client)
+        # Capture-only instances (detection process, camera workers) publish nothing
+        if channel_client is not None:
+            self.sinks = create_sinks(channel_client)
+
+    @staticmethod
+    def create_detector():
+        """Import and initialize the AprilTag detector"""
         try:
             from pupil_apriltags import Detector
-            self.detector = Detector(families="tag36h11",
-                                   nthreads=2,  # Reduced threads to prevent CPU overload
-                                   quad_decimate=1.5,  # Increased to improve performance
-                                   quad_sigma=0.0,
-                                   refine_edges=1,
-                                   decode_sharpening=0.25,
-                                   debug=0)
+            detector = Detector(families="tag36h11",
+                                nthreads=2,  # Reduced threads to prevent CPU overload
+                                quad_decimate=1.5,  # Increased to improve performance
+                                quad_sigma=0.0,
+                                refine_edges=1,
+                                decode_sharpening=0.25,
+                                debug=0)
             print("Using pupil_apriltags library")
         except ImportError:
             try:
                 import apriltag
-                self.detector = apriltag.Detector()
+                detector = apriltag.Detector()
                 print("Using apriltag library")
             except ImportError:
                 raise ImportError("Neither pupil_apriltags nor apriltag library found. Please install one of them.")
- 
-        # Initialize webcam with optimized settings
+        return detector
+
+    def open_camera(self, source=0):
+        """Initialize webcam with optimized settings"""
         print("Initializing webcam...")
-        self.cap = cv2.VideoCapture(0) # webcam index - change if necessary (index starts at 0)
+        self.cap = cv2.VideoCapture(source) # webcam index - change CAMERA_SOURCES if necessary (index starts at 0)
         print("Webcam initialized.")
  
         # Set camera properties for better performance
@@ -379,7 +1104,9 @@ class AprilTagDetector:
         self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
         self.fps = self.cap.get(cv2.CAP_PROP_FPS)
         print(f"Camera resolution: {self.width}x{self.height} @ {self.fps} FPS")
- 
+
+    def init_state(self, channel_client):
+        """Set up everything that only depends on the frame size"""
         # Initialize perspective selector
         self.perspective_selector = PerspectiveSelector((self.height, self.width))
  
@@ -397,10 +1124,9 @@ class AprilTagDetector:
         self.last_send_time = 0
         self.send_interval = 0.033  # ~30 FPS for network updates
  
-        # Message queue for asynchronous sending
-        self.message_queue = queue.Queue()
-        self.sender_thread = None
-        self.sender_running = False
+        # Output sinks, each sends asynchronously from its own queue
+        self.sinks = []
+        self.batch_seq = 0
  
         # Performance tracking
         self.frame_count = 0
@@ -409,6 +1135,9 @@ class AprilTagDetector:
  
         # Cropping mode
         self.crop_mode_enabled = False
+
+        # Optional FrameStreamer for the annotated view
+        self.streamer = None
  
         # Add running flag for main loop control
         self.running = False
@@ -416,48 +1145,16 @@ class AprilTagDetector:
         # Connection monitoring
         self.last_connection_check = time.time()
         self.connection_check_interval = 10  # Check connection every 10 seconds
+
+        # Startup timing (the GUI sets startup_time to when the app started)
+        self.startup_time = time.time()
+        self.first_frame_reported = False
+        self.first_detection_reported = False
  
     def start_sender_thread(self):
-        """Start the asynchronous message sender thread"""
-        self.sender_running = True
-        self.sender_thread = Thread(target=self._sender_worker)
-        self.sender_thread.daemon = True
-        self.sender_thread.start()
-        print("Sender thread started")
- 
-    def _sender_worker(self):
-        """Background thread for sending messages with enhanced error handling"""
-        consecutive_failures = 0
-        max_consecutive_failures = 5
-        
-        while self.sender_running:
-            try:
-                messages = self.message_queue.get(timeout=0.1)
-                if messages:
-                    print(f"Sending {len(messages)} messages")
-                    success = self.channel_client.send_multiple(messages)
-                    
-                    if success:
-                        print("✓ Messages sent successfully")
-                        consecutive_failures = 0  # Reset failure counter
-                    else:
-                        consecutive_failures += 1
-                        print(f"✗ Failed to send messages (failure #{consecutive_failures})")
-                        
-                        # If too many consecutive failures, wait longer
-                        if consecutive_failures >= max_consecutive_failures:
-                            print(f"Too many consecutive failures, waiting 30 seconds...")
-                            time.sleep(30)
-                            consecutive_failures = 0  # Reset counter
-                            
-                self.message_queue.task_done()
-                
-            except queue.Empty:
-                continue
-            except Exception as e:
-                print(f"Sender thread error: {e}")
-                consecutive_failures += 1
-                time.sleep(1)  # Brief pause on error
+        """Start the output sink threads"""
+        for sink in self.sinks:
+            sink.start()
 
     def check_connection_health(self):
         """Periodically check and report connection health"""
@@ -465,17 +1162,17 @@ class AprilTagDetector:
         if current_time - self.last_connection_check > self.connection_check_interval:
             status = self.channel_client.get_connection_status()
             if not status['connected']:
-                print(f"⚠ Connection lost - attempting reconnection...")
+                log.warning("health.lost", "⚠ Connection lost - attempting reconnection...")
             elif status['time_since_activity'] > 45:
-                print(f"⚠ No activity for {status['time_since_activity']:.1f}s - connection may be stale")
+                log.warning("health.stale", "⚠ No activity - connection may be stale",
+                            idle_s=round(status['time_since_activity'], 1))
             
             self.last_connection_check = current_time
 
     def stop_sender_thread(self):
-        """Stop the sender thread"""
-        self.sender_running = False
-        if self.sender_thread:
-            self.sender_thread.join()
+        """Stop the output sink threads"""
+        for sink in self.sinks:
+            sink.close()
  
     def set_topic(self, topic):
         """Set the topic for sending data"""
@@ -501,18 +1198,18 @@ class AprilTagDetector:
             self.scale_y = 1080 / self.height
             print(f"Full view scaling factors: x={self.scale_x:.3f}, y={self.scale_y:.3f}")
  
-    def calculate_rotation_fast(self, corners):
-        """Optimized rotation calculation"""
-        if corners is None or len(corners) < 4:
-            return 0.0
- 
-        # Use numpy operations for speed
-        top_edge = corners[2] - corners[3]  # top-right - top-left
-        rotation = math.degrees(math.atan2(top_edge[1], top_edge[0]))
- 
-        # Normalize to 0-360 degrees
-        return rotation % 360
- 
+    def start_selection(self):
+        """Start clicking the 4 corners of the area to use"""
+        self.perspective_selector.start_selection()
+
+    def reset_crop(self):
+        """Clear the selected area and go back to the full camera view"""
+        self.perspective_selector.reset()
+        self.crop_mode_enabled = False
+        # Reset scaling factors
+        self.scale_x = 1920 / self.width
+        self.scale_y = 1080 / self.height
+
     def detect_apriltags(self, frame):
         """Detect AprilTags in the frame and return their coordinates"""
         # Convert to grayscale
@@ -525,43 +1222,9 @@ class AprilTagDetector:
         except TypeError:
             tags = self.detector.detect(gray)
  
-        detected_tags = []
-        for tag in tags:
-            # Get center coordinates
-            if hasattr(tag, 'center'):
-                center_x, center_y = tag.center
-            else:
-                # Calculate center from corners
-                corners = tag.corners if hasattr(tag, 'corners') else tag.pose_R
-                center_x = np.mean(corners[:, 0])
-                center_y = np.mean(corners[:, 1])
- 
-            # Fast scaling using pre-calculated factors
-            scaled_x = int(center_x * self.scale_x)
-            scaled_y = int(center_y * self.scale_y)
- 
-            # Clamp coordinates
-            scaled_x = max(0, min(1920, scaled_x))
-            scaled_y = max(0, min(1080, scaled_y))
- 
-            # Get tag ID
-            tag_id = getattr(tag, 'tag_id', getattr(tag, 'id', 0))
- 
-            # Get corners and calculate rotation
-            corners = tag.corners if hasattr(tag, 'corners') else None
-            rotation = self.calculate_rotation_fast(corners) if corners is not None else 0.0
- 
-            detected_tags.append({
-                'tag_id': tag_id,
-                'x': scaled_x,
-                'y': scaled_y,
-                'rotation': round(rotation, 1),  # Less precision for performance
-                'center_actual': (int(center_x), int(center_y)),
-                'corners': corners
-            })
- 
-        return detected_tags
- 
+        # Scale and clamp every tag at once using the pre-calculated factors
+        return DetectionBatch.from_detections(tags).scale(self.scale_x, self.scale_y)
+
     def send_tag_coordinates(self, tags):
         """Send tag coordinates with rate limiting - NO MOVEMENT FILTERING"""
         current_time = time.time()
@@ -570,23 +1233,16 @@ class AprilTagDetector:
         if current_time - self.last_send_time < self.send_interval:
             return
  
-        messages = []
-        for tag in tags:
-            # Send ALL tags regardless of movement
-            message = {
-                'topic': f'/{self.selected_topic}/All',
-                'value': {'x': tag['x'], 'y': tag['y'], 'rotation': tag['rotation']}
-            }
-            messages.append(message)
- 
-        # Send messages asynchronously
-        if messages:
-            try:
-                self.message_queue.put_nowait(messages)
-                print(f"Queued {len(messages)} messages")
-                self.last_send_time = current_time
-            except queue.Full:
-                print("Message queue full, dropping messages")
+        # Send ALL tags regardless of movement
+        self.batch_seq += 1
+        batch = {'topic': self.selected_topic, 'seq': self.batch_seq,
+                 'timestamp': current_time, 'tags': tags}
+
+        # Hand the batch to every sink; none of them blocks
+        for sink in self.sinks:
+            sink.publish(batch)
+        log.debug("queue", "Queued messages", count=len(tags))
+        self.last_send_time = current_time
  
     def draw_detections(self, frame, tags):
         """Draw detected AprilTags on the frame"""
@@ -596,34 +1252,44 @@ class AprilTagDetector:
             # Draw colored text on top
             cv2.putText(img, text, pos, font, scale, color, thickness)
  
-        for tag in tags:
-            center = tag['center_actual']
- 
-            # Draw tag corners if available
-            if tag['corners'] is not None:
-                corners = tag['corners'].astype(int)
-                cv2.polylines(frame, [corners], True, (0, 255, 0), 2)
+        if not len(tags):
+            return frame
+
+        # Integer pixel geometry for all tags at once
+        centers = tags.centers.astype(int)
+        has_corners = ~np.isnan(tags.corners[:, 0, 0])
+        corners = np.nan_to_num(tags.corners).astype(np.int32)
+        top_centers = ((corners[:, 2] + corners[:, 3]) // 2)
+
+        # Draw tag corners if available, all outlines in one call
+        if has_corners.any():
+            cv2.polylines(frame, list(corners[has_corners]), True, (0, 255, 0), 2)
+
+        for tag_id, center, (x, y), rotation, top_center, with_corners in zip(
+                tags.ids.tolist(), centers.tolist(), tags.positions.tolist(),
+                tags.rotations.tolist(), top_centers.tolist(), has_corners.tolist()):
+            center = tuple(center)
  
-                # Draw rotation indicator
-                top_center = ((corners[2] + corners[3]) / 2).astype(int)
+            # Draw rotation indicator
+            if with_corners:
                 cv2.arrowedLine(frame, center, tuple(top_center), (255, 0, 0), 2)
  
             # Draw center point
             cv2.circle(frame, center, 3, (0, 0, 255), -1)
  
             # Draw tag ID with outline for visibility
-            draw_text_with_outline(frame, f"ID: {tag['tag_id']}", 
+            draw_text_with_outline(frame, f"ID: {tag_id}", 
                                  (center[0] - 15, center[1] - 25),
                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
  
             # Draw scaled coordinates with outline
-            coord_text = f"({tag['x']}, {tag['y']})"
+            coord_text = f"({x}, {y})"
             draw_text_with_outline(frame, coord_text,
                                  (center[0] - 30, center[1] + 15),
                                  cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
  
             # Draw rotation with outline
-            rotation_text = f"R: {tag['rotation']:.0f}°"
+            rotation_text = f"R: {rotation:.0f}°"
             draw_text_with_outline(frame, rotation_text,
                                  (center[0] - 30, center[1] + 30),
                                  cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
@@ -668,14 +1334,37 @@ class AprilTagDetector:
         """Process a single frame - called from main thread"""
         if not self.running:
             return False
- 
-        ret, frame = self.cap.read()
-        if not ret:
-            print("Failed to capture frame")
+
+        result = self.capture_and_detect()
+        if result is None:
             return False
-            
+        display_frame, tags = result
+        self.report_startup_timing(tags)
+
         # Check connection health periodically
         self.check_connection_health()
+
+        # Send coordinates (rate limited but NO movement filtering)
+        if tags:
+            self.send_tag_coordinates(tags)
+
+        return self.show_frame(display_frame, tags)
+
+    def report_startup_timing(self, tags):
+        """Print time-to-first-frame and time-to-first-detection once"""
+        if not self.first_frame_reported:
+            self.first_frame_reported = True
+            print(f"⏱ Time to first frame: {time.time() - self.startup_time:.2f}s")
+        if tags and not self.first_detection_reported:
+            self.first_detection_reported = True
+            print(f"⏱ Time to first detection: {time.time() - self.startup_time:.2f}s")
+
+    def capture_and_detect(self):
+        """Grab a frame and detect tags; returns (display_frame, tags) or None"""
+        ret, frame = self.cap.read()
+        if not ret:
+            print("Failed to capture frame")
+            return None
  
         # Store original frame for selection overlay
         display_frame = frame.copy()
@@ -689,11 +1378,10 @@ class AprilTagDetector:
  
         # Detect AprilTags (on appropriate frame)
         tags = self.detect_apriltags(detection_frame)
- 
-        # Send coordinates (rate limited but NO movement filtering)
-        if tags:
-            self.send_tag_coordinates(tags)
- 
+        return display_frame, tags
+
+    def show_frame(self, display_frame, tags):
+        """Draw overlays, show the frame and handle key presses"""
         # Draw detections on the display frame
         display_frame = self.draw_detections(display_frame, tags)
  
@@ -729,6 +1417,13 @@ class AprilTagDetector:
         
         draw_text_with_outline(display_frame, connection_text, 
                              (10, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.5, connection_color, 1)
+
+        # Add message counters
+        counters = status.get('counters', {})
+        counter_text = (f"Sent: {counters.get('sent', 0)}  Failed: {counters.get('failed', 0)}  "
+                        f"Reconnects: {counters.get('reconnects', 0)}  Superseded: {counters.get('superseded', 0)}")
+        draw_text_with_outline(display_frame, counter_text,
+                             (10, 210), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
  
         # Add crop mode status with dimensions
         if self.crop_mode_enabled:
@@ -745,6 +1440,12 @@ class AprilTagDetector:
         draw_text_with_outline(display_frame, scale_text, 
                              (10, 180), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
  
+        # Add stream status
+        if self.streamer:
+            stream_text = f"Stream: {self.streamer.frames_sent} sent, {self.streamer.frames_dropped} dropped"
+            draw_text_with_outline(display_frame, stream_text,
+                                 (10, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 255), 1)
+
         # Add selection status
         if self.perspective_selector.selecting:
             draw_text_with_outline(display_frame, "SELECTING AREA - Click 4 corners", 
@@ -755,6 +1456,10 @@ class AprilTagDetector:
                                  (10, display_frame.shape[0] - 50), 
                                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
  
+        # Hand the annotated frame to the stream (never blocks)
+        if self.streamer:
+            self.streamer.submit(display_frame)
+
         # Display frame
         cv2.imshow('AprilTag Detection', display_frame)
  
@@ -763,13 +1468,9 @@ class AprilTagDetector:
         if key == ord('q'):
             return False
         elif key == ord('s'):
-            self.perspective_selector.start_selection()
+            self.start_selection()
         elif key == ord('r'):
-            self.perspective_selector.reset()
-            self.crop_mode_enabled = False
-            # Reset scaling factors
-            self.scale_x = 1920 / self.width
-            self.scale_y = 1080 / self.height
+            self.reset_crop()
         elif key == ord('c'):
             if self.perspective_selector.transform_matrix is not None:
                 self.toggle_crop_mode()
@@ -797,21 +1498,577 @@ class AprilTagDetector:
         self.cap.release()
         cv2.destroyAllWindows()
  
+def load_calibration(path=CALIBRATION_FILE):
+    """Saved camera-to-arena homographies, keyed by camera index"""
+    try:
+        with open(path) as f:
+            return {int(index): np.array(matrix, dtype=np.float64) for index, matrix in json.load(f).items()}
+    except (OSError, ValueError):
+        return {}
+
+def save_calibration(homographies, path=CALIBRATION_FILE):
+    with open(path, 'w') as f:
+        json.dump({str(index): matrix.tolist() for index, matrix in homographies.items()}, f, indent=2)
+
+def region_transform(region, width, height):
+    """Homography that stretches a width x height image onto an arena rectangle"""
+    x0, y0, x1, y1 = region
+    return np.array([[(x1 - x0) / width, 0, x0],
+                     [0, (y1 - y0) / height, y0],
+                     [0, 0, 1]], dtype=np.float64)
+
+class TagFusion:
+    """Fuses per-camera tag observations into one set of arena positions.
+
+    Each camera reports rows of (tag_id, x, y, rotation, weight) in arena
+    coordinates. Positions of a tag seen by several cameras are averaged by
+    weight and rotations as weighted unit vectors. A camera's weight fades
+    to zero towards its image border, so a tag crossing a seam is handed
+    over to the next camera without a jump.
+    """
+    def __init__(self, max_age=FUSION_MAX_AGE):
+        self.max_age = max_age
+        self.observations = {}  # camera index -> (timestamp, rows)
+        self.lock = Lock()
+
+    def update(self, camera_index, timestamp, rows):
+        with self.lock:
+            self.observations[camera_index] = (timestamp, rows)
+
+    def fuse(self, now=None):
+        """DetectionBatch of the fused arena positions of fresh observations"""
+        now = time.time() if now is None else now
+        with self.lock:
+            fresh = [rows for timestamp, rows in self.observations.values()
+                     if now - timestamp <= self.max_age and len(rows)]
+        if not fresh:
+            return DetectionBatch.empty()
+
+        # Weighted sums per tag id in one pass
+        rows = np.concatenate(fresh)
+        ids, group = np.unique(rows[:, 0], return_inverse=True)
+        weights = rows[:, 4]
+        total = np.bincount(group, weights)
+        x = np.bincount(group, rows[:, 1] * weights) / total
+        y = np.bincount(group, rows[:, 2] * weights) / total
+        angles = np.radians(rows[:, 3])
+        rotations = np.degrees(np.arctan2(np.bincount(group, np.sin(angles) * weights),
+                                          np.bincount(group, np.cos(angles) * weights))) % 360
+
+        centers = np.column_stack((x, y))
+        return DetectionBatch(ids, centers, rotations=np.round(rotations, 1)).scale(1, 1, *ARENA_SIZE)
+
+class CameraWorker:
+    """Capture + detection thread for one camera of a multi-camera setup"""
+    def __init__(self, index, camera, region, homography, on_detections):
+        self.index = index
+        self.camera = camera  # AprilTagDetector that owns the capture and detector
+        self.region = region
+        self.window = f"AprilTag Detection - Camera {index}"
+        self.selector = camera.perspective_selector
+        self.calibrated_matrix = None
+        self.homography = homography if homography is not None else \
+            region_transform(region, camera.width, camera.height)
+        self.on_detections = on_detections
+
+        self.latest = None  # (frame, tags) for the preview
+        self.lock = Lock()
+        self.fps = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._camera_worker, daemon=True)
+        self.thread.start()
+
+    def update_calibration(self):
+        """Use the 4 clicked corners as this camera's arena region, if new"""
+        matrix = self.selector.transform_matrix
+        if matrix is None or matrix is self.calibrated_matrix:
+            return False
+        self.calibrated_matrix = matrix
+        # The selector maps the corners onto the full image; stretch that onto the region
+        width, height = self.selector.output_size
+        self.homography = region_transform(self.region, width - 1, height - 1) @ matrix
+        print(f"Camera {self.index} calibrated to arena region {self.region}")
+        return True
+
+    def to_arena(self, tags):
+        """Rows of (tag_id, x, y, rotation, weight) in arena coordinates"""
+        if not len(tags):
+            return np.zeros((0, 5))
+
+        # Centers plus the two top corners, mapped in one call
+        points = np.stack((tags.centers, tags.corners[:, 2], tags.corners[:, 3]), axis=1)
+        mapped = cv2.perspectiveTransform(points.reshape(-1, 1, 2), self.homography).reshape(-1, 3, 2)
+        edges = mapped[:, 1] - mapped[:, 2]
+        rotations = np.degrees(np.arctan2(edges[:, 1], edges[:, 0])) % 360
+
+        # Fade out near the image border so neighbouring cameras take over
+        width, height = self.camera.width, self.camera.height
+        cx, cy = tags.centers[:, 0], tags.centers[:, 1]
+        border = np.minimum(np.minimum(cx, width - cx), np.minimum(cy, height - cy))
+        weights = np.clip(border / (SEAM_MARGIN * min(width, height)), 0.01, 1.0) * \
+            np.maximum(tags.confidences, 0.01)
+
+        return np.column_stack((tags.ids, mapped[:, 0], np.nan_to_num(rotations), weights))
+
+    def _camera_worker(self):
+        """Background thread: capture, detect, map to the arena, report"""
+        while self.running:
+            result = self.camera.capture_and_detect()
+            if result is None:
+                break
+            frame, tags = result
+            timestamp = time.time()
+
+            self.update_calibration()
+            rows = self.to_arena(tags)
+            # Show arena coordinates in the preview
+            tags.positions = rows[:, 1:3].astype(np.int64)
+
+            self.on_detections(self.index, timestamp, rows)
+            self.fps = self.camera.calculate_fps()
+            with self.lock:
+                self.latest = (frame, tags)
+        self.running = False
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        self.camera.cap.release()
+
+class MultiCameraAprilTagDetector(AprilTagDetector):
+    """Runs one CameraWorker per capture source and publishes fused tags.
+
+    Cameras capture and detect in their own threads (OpenCV and the AprilTag
+    library release the GIL), so throughput grows with cameras and cores.
+    Every camera shows its own preview window.
+    """
+    def __init__(self, channel_client, sources=CAMERA_SOURCES, regions=CAMERA_ARENA_REGIONS):
+        if len(regions) != len(sources):
+            raise ValueError("CAMERA_ARENA_REGIONS needs one region per camera in CAMERA_SOURCES")
+
+        # Open every camera and build its detector in parallel
+        with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+            cameras = list(pool.map(lambda source: AprilTagDetector(None, source), sources))
+
+        self.width, self.height = ARENA_SIZE
+        self.fps = 0
+        self.init_state(channel_client)
+        self.sinks = create_sinks(channel_client)
+        self.publish_lock = Lock()
+
+        self.fusion = TagFusion()
+        self.fused_tags = DetectionBatch.empty()
+        self.calibration = load_calibration()
+        self.workers = [CameraWorker(i, camera, regions[i], self.calibration.get(i), self.on_detections)
+                        for i, camera in enumerate(cameras)]
+        print(f"Multi-camera mode: {len(self.workers)} cameras fused into a "
+              f"{ARENA_SIZE[0]}x{ARENA_SIZE[1]} arena")
+
+    def on_detections(self, camera_index, timestamp, rows):
+        """Called from the camera threads with fresh arena observations"""
+        self.fusion.update(camera_index, timestamp, rows)
+        with self.publish_lock:
+            self.fused_tags = self.fusion.fuse()
+            if self.fused_tags:
+                self.send_tag_coordinates(self.fused_tags)
+
+    def start_detection(self):
+        """Open a preview window per camera and start the camera threads"""
+        print("Starting multi-camera AprilTag detection...")
+        print("Controls:")
+        print("  'q' - Quit")
+        print("  's' - Calibrate: click the 4 corners of each camera's arena region")
+        print("  'r' - Reset calibration")
+        for worker in self.workers:
+            cv2.namedWindow(worker.window, cv2.WINDOW_NORMAL)
+            cv2.setMouseCallback(worker.window, worker.selector.mouse_callback)
+
+        self.start_sender_thread()
+        for worker in self.workers:
+            worker.start()
+        self.running = True
+
+    def process_frame(self):
+        """Show every camera's newest frame - detection runs in the camera threads"""
+        if not self.running:
+            return False
+        if not any(worker.running for worker in self.workers):
+            print("All cameras stopped")
+            return False
+
+        tags = self.fused_tags
+        self.report_startup_timing(tags)
+        self.check_connection_health()
+
+        for worker in self.workers:
+            with worker.lock:
+                latest = worker.latest
+            if latest is None:
+                continue
+            frame, camera_tags = latest
+            # Draw on a copy: worker.latest is shared with the camera thread,
+            # and the streamer encodes this frame on its own thread
+            frame = self.draw_detections(frame.copy(), camera_tags)
+            frame = worker.selector.draw_selection(frame)
+            cv2.putText(frame, f"Camera {worker.index}  FPS: {worker.fps:.1f}  Tags: {len(camera_tags)}",
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(frame, f"Fused tags: {len(tags)}  Topic: /{self.selected_topic}/All",
+                        (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 1)
+            if self.streamer and worker.index == 0:
+                self.streamer.submit(frame)
+            cv2.imshow(worker.window, frame)
+
+        # Save new calibrations
+        calibrated = {worker.index: worker.homography for worker in self.workers
+                      if worker.calibrated_matrix is not None}
+        if calibrated and any(self.calibration.get(i) is not h for i, h in calibrated.items()):
+            self.calibration.update(calibrated)
+            save_calibration(self.calibration)
+
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            return False
+        elif key == ord('s'):
+            self.start_selection()
+        elif key == ord('r'):
+            self.reset_crop()
+        return True
+
+    def start_selection(self):
+        """Calibrate every camera: each one's window takes its own 4 clicks"""
+        for worker in self.workers:
+            worker.selector.start_selection()
+
+    def reset_crop(self):
+        """Forget the calibration and map each camera straight onto its region"""
+        super().reset_crop()
+        for worker in self.workers:
+            worker.selector.reset()
+            worker.calibrated_matrix = None
+            worker.homography = region_transform(worker.region, worker.camera.width, worker.camera.height)
+        self.calibration = {}
+        # Or the next start would load the calibration just reset
+        try:
+            os.remove(CALIBRATION_FILE)
+        except OSError:
+            pass
+
+    def toggle_crop_mode(self):
+        print("Crop mode is not used with several cameras - calibrate each camera with 's' instead")
+
+    def stop_detection(self):
+        """Stop the camera threads and the sinks"""
+        print("\nStopping detection...")
+        self.running = False
+        for worker in self.workers:
+            worker.stop()
+        self.stop_sender_thread()
+        cv2.destroyAllWindows()
+
+class RingAprilTagDetector(AprilTagDetector):
+    """GUI-side detector that previews frames from a DetectionProcessPipeline.
+
+    Capture, detection and sending all happen in the pipeline's processes;
+    this class only shows the shared frames and forwards GUI settings to them.
+    """
+    def __init__(self, pipeline):
+        self.height, self.width = pipeline.ring.frame_shape[:2]
+        self.fps = 0
+        self.init_state(pipeline)
+        self.last_seq = 0
+        self.last_result = None
+
+    def start_sender_thread(self):
+        pass  # Sending happens in the sender process
+
+    def stop_sender_thread(self):
+        pass
+
+    def send_tag_coordinates(self, tags):
+        pass
+
+    def set_topic(self, topic):
+        super().set_topic(topic)
+        self.channel_client.set_topic(topic)
+
+    def toggle_crop_mode(self):
+        super().toggle_crop_mode()
+        self.push_crop_settings()
+
+    def reset_crop(self):
+        super().reset_crop()
+        self.push_crop_settings()
+
+    def push_crop_settings(self):
+        """Hand the current crop and scaling to the detection process"""
+        matrix = self.perspective_selector.transform_matrix if self.crop_mode_enabled else None
+        self.channel_client.set_crop(matrix, self.scale_x, self.scale_y)
+
+    def calculate_fps(self):
+        """Report the detection rate rather than the preview rate"""
+        return self.channel_client.ring.read_status()['detection_fps']
+
+    def capture_and_detect(self):
+        """Take the newest frame and detections from the shared ring"""
+        ring = self.channel_client.ring
+        deadline = time.time() + 0.05
+        while True:
+            seq = ring.latest_seq()
+            if seq != self.last_seq:
+                result = ring.read(seq)
+                if result is not None:
+                    self.last_seq = seq
+                    self.last_result = (result[2], result[3])
+                    return result[2], result[3]
+            elif not self.channel_client.is_alive():
+                print("Detection process stopped")
+                return None
+
+            # Nothing new yet - keep the GUI responsive by showing the last frame
+            if time.time() > deadline and self.last_result is not None:
+                frame, tags = self.last_result
+                return frame.copy(), tags
+            time.sleep(0.001)
+
+    def stop_detection(self):
+        """Stop the detection process"""
+        print("\nStopping detection...")
+        self.running = False
+        cv2.destroyAllWindows()
+
+def run_detection_process(ring_queue, control_queue, stop_event):
+    """Capture + detection loop of the detection process"""
+    setup_logging()
+    detector = AprilTagDetector(None)
+    selector = detector.perspective_selector
+    ring = SharedFrameRing((detector.height, detector.width, 3))
+    ring_queue.put(ring.spec())
+    raw_frame = None
+
+    try:
+        while not stop_event.is_set():
+            # Apply crop settings sent by the GUI process
+            try:
+                while True:
+                    matrix, scale_x, scale_y = control_queue.get_nowait()
+                    selector.transform_matrix = matrix
+                    detector.crop_mode_enabled = matrix is not None
+                    detector.scale_x, detector.scale_y = scale_x, scale_y
+            except queue.Empty:
+                pass
+
+            slot, seq, slot_frame = ring.begin_write()
+            if detector.crop_mode_enabled:
+                ret, raw_frame = detector.cap.read(raw_frame)
+                if ret:
+                    cv2.warpPerspective(raw_frame, selector.transform_matrix,
+                                        selector.output_size, dst=slot_frame)
+            else:
+                # Capture straight into shared memory
+                ret, frame = detector.cap.read(slot_frame)
+                if ret and not np.shares_memory(frame, slot_frame):
+                    cv2.resize(frame, selector.output_size, dst=slot_frame)
+
+            if not ret:
+                ring.abort_write(slot)
+                print("Failed to capture frame")
+                break
+
+            tags = detector.detect_apriltags(slot_frame)
+            ring.end_write(slot, seq, tags)
+            ring.write_status({'detection_fps': detector.calculate_fps()})
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        detector.cap.release()
+        ring.close()
+
+def run_sender_process(url, ring_spec, topic_queue, stop_event, send_interval):
+    """Network sender loop of the sender process"""
+    setup_logging()
+    ring = SharedFrameRing.attach(ring_spec)
+    channel_client = wss_CEEO(url)
+    sinks = create_sinks(channel_client)
+    for sink in sinks:
+        sink.start()
+    topic = "Car_Location_1"
+    last_seq = 0
+
+    try:
+        while not stop_event.is_set():
+            try:
+                while True:
+                    topic = topic_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            ring.write_status(channel_client.get_connection_status())
+
+            seq = ring.latest_seq()
+            if seq != last_seq:
+                result = ring.read(seq, with_frame=False)
+                if result is not None:
+                    # Detections written since the last send were never sent
+                    if last_seq and seq - last_seq > 1:
+                        channel_client.counters.increment('superseded', seq - last_seq - 1)
+                    last_seq = seq
+                    tags = result[3]
+                    if tags:
+                        batch = {'topic': topic, 'seq': seq, 'timestamp': result[1], 'tags': tags}
+                        for sink in sinks:
+                            sink.publish(batch)
+
+            time.sleep(send_interval)
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for sink in sinks:
+            sink.close()
+        channel_client.close()
+        ring.close()
+
+class DetectionProcessPipeline:
+    """Detection process and sender process connected by a SharedFrameRing.
+
+    On the GUI side it takes the place of the channel client: it reports the
+    sender process's connection status, and close() stops both processes.
+    """
+    def __init__(self, url, send_interval=0.033):
+        self.url = url
+        self.send_interval = send_interval
+        # spawn: forking a process that already runs Tk/OpenCV is not safe
+        self.ctx = mp.get_context("spawn")
+        self.stop_event = self.ctx.Event()
+        self.control_queue = self.ctx.Queue()
+        self.topic_queue = self.ctx.Queue()
+        self.ring = None
+        self.detection_process = None
+        self.sender_process = None
+
+    def start(self, timeout=30):
+        """Start the detection process, wait for its ring, then start the sender"""
+        ring_queue = self.ctx.Queue()
+        self.detection_process = self.ctx.Process(
+            target=run_detection_process,
+            args=(ring_queue, self.control_queue, self.stop_event),
+            daemon=True)
+        self.detection_process.start()
+
+        print("Waiting for detection process to open the camera...")
+        spec = ring_queue.get(timeout=timeout)
+        self.ring = SharedFrameRing.attach(spec)
+
+        self.sender_process = self.ctx.Process(
+            target=run_sender_process,
+            args=(self.url, spec, self.topic_queue, self.stop_event, self.send_interval),
+            daemon=True)
+        self.sender_process.start()
+        print(f"Detection process ({self.detection_process.pid}) and "
+              f"sender process ({self.sender_process.pid}) started")
+
+    def is_alive(self):
+        return self.detection_process is not None and self.detection_process.is_alive()
+
+    def set_topic(self, topic):
+        self.topic_queue.put(topic)
+
+    def set_crop(self, matrix, scale_x, scale_y):
+        self.control_queue.put((matrix, scale_x, scale_y))
+
+    def get_connection_status(self):
+        """Connection status as last reported by the sender process"""
+        status = self.ring.read_status()
+        last_activity = status['last_activity'] or time.time()
+        return {
+            'connected': bool(status['connected']),
+            'last_activity': last_activity,
+            'time_since_activity': time.time() - last_activity,
+            'reconnect_attempts': int(status['reconnect_attempts']),
+            'keepalive_running': bool(status['keepalive_running']),
+            'counters': {name: int(status[name]) for name in ('sent', 'failed', 'reconnects', 'superseded')}
+        }
+
+    def close(self):
+        """Stop both processes and detach from the ring"""
+        print("Stopping detection and sender processes...")
+        self.stop_event.set()
+        for process in (self.detection_process, self.sender_process):
+            if process is not None:
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        print("Processes stopped")
+
 class DetectorGUI:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("AprilTag Detector Control")
         self.root.geometry("300x320")  # Slightly larger to accommodate connection status
- 
-        # Create detector and channel client
-        self.channel_client = wss_CEEO(uri)
-        self.detector = AprilTagDetector(self.channel_client)
+        self.startup_time = time.time()
+        self.connection_reported = False
+
+        # Create the channel client (connects in the background) and build the
+        # detector and camera on a worker thread while the GUI is created here
+        if USE_DETECTION_PROCESS and len(CAMERA_SOURCES) == 1:
+            self.channel_client = DetectionProcessPipeline(uri)
+        else:
+            self.channel_client = wss_CEEO(uri)
+        self.detector = None
+        self.startup_failed = False
+        self.startup_pool = ThreadPoolExecutor(max_workers=1)
+        self.detector_future = self.startup_pool.submit(self.create_detector)
  
         # Create GUI elements
         self.setup_gui()
- 
+
+    def create_detector(self):
+        """Build the detector (runs on the startup thread)"""
+        if isinstance(self.channel_client, DetectionProcessPipeline):
+            self.channel_client.start()
+            detector = RingAprilTagDetector(self.channel_client)
+        elif len(CAMERA_SOURCES) > 1:
+            detector = MultiCameraAprilTagDetector(self.channel_client)
+        else:
+            detector = AprilTagDetector(self.channel_client)
+        detector.startup_time = self.startup_time
+
+        if STREAM_ENABLED:
+            detector.streamer = FrameStreamer(uri)
+            detector.streamer.start()
+        return detector
+
+    def detector_ready(self):
+        """Pick up the detector once the startup thread has built it"""
+        if self.detector is not None:
+            return True
+        if not self.detector_future.done():
+            return False
+
+        try:
+            self.detector = self.detector_future.result()
+        except Exception as e:
+            # e.g. no apriltag library, or the detection process never came up
+            log.error("startup.error", "✗ Detector failed to start", error=repr(e))
+            self.startup_failed = True
+            self.channel_client.close()
+            self.root.destroy()
+            return False
+        self.detector.set_topic(self.topic_var.get())
+        print(f"⏱ Detector ready after {time.time() - self.startup_time:.2f}s")
+
         # Start detector on main thread
         self.detector.start_detection()
+        return True
  
     def setup_gui(self):
         # Title
@@ -882,23 +2139,26 @@ class DetectorGUI:
  
     def on_topic_change(self, event):
         selected_topic = self.topic_var.get()
-        self.detector.set_topic(selected_topic)
+        if self.detector:
+            self.detector.set_topic(selected_topic)
         self.topic_label.config(text=f"Current Topic: /{selected_topic}/All")
  
     def start_selection(self):
-        self.detector.perspective_selector.start_selection()
+        if not self.detector:
+            return
+        self.detector.start_selection()
         self.update_status()
  
     def reset_selection(self):
-        self.detector.perspective_selector.reset()
-        self.detector.crop_mode_enabled = False
-        # Reset scaling factors
-        self.detector.scale_x = 1920 / self.detector.width
-        self.detector.scale_y = 1080 / self.detector.height
+        if not self.detector:
+            return
+        self.detector.reset_crop()
         print(f"Reset - Full view scaling factors: x={self.detector.scale_x:.3f}, y={self.detector.scale_y:.3f}")
         self.update_status()
  
     def toggle_crop(self):
+        if not self.detector:
+            return
         if self.detector.perspective_selector.transform_matrix is not None:
             self.detector.toggle_crop_mode()
         else:
@@ -917,18 +2177,40 @@ class DetectorGUI:
         # Update connection status
         conn_status = self.channel_client.get_connection_status()
         if conn_status['connected']:
+            if not self.connection_reported:
+                self.connection_reported = True
+                print(f"⏱ Channel connected after {time.time() - self.startup_time:.2f}s")
             self.connection_label.config(text="Connection: ✓ Connected", fg="green")
         else:
             self.connection_label.config(text=f"Connection: ✗ Reconnecting... (#{conn_status['reconnect_attempts']})", fg="red")
  
     def quit_app(self):
-        self.detector.stop_detection()
+        if self.detector is None and not self.startup_failed:
+            # Startup is still running: wait for it, so the camera or
+            # detection process it opens can be released below
+            print("Waiting for startup to finish...")
+            try:
+                self.detector = self.detector_future.result()
+            except Exception as e:
+                log.error("startup.error", "✗ Detector failed to start", error=repr(e))
+        if self.detector:
+            self.detector.stop_detection()
+            if self.detector.streamer:
+                self.detector.streamer.stop()
+        self.startup_pool.shutdown()
         self.channel_client.close()
         self.root.quit()
  
     def run(self):
         # Process frames and update GUI on main thread
         def process_and_update():
+            if not self.detector_ready():
+                if self.startup_failed:
+                    return  # the window is gone
+                # Still starting up - the GUI stays responsive meanwhile
+                self.root.after(10, process_and_update)
+                return
+
             if self.detector.running:
                 # Process one frame
                 continue_running = self.detector.process_frame()
@@ -949,6 +2231,7 @@ class DetectorGUI:
         self.root.mainloop()
  
 def main():
+    setup_logging()
     # Create and run the GUI application
     app = DetectorGUI()
     app.run()
@@ -1,6 +1,8 @@
 from pyscript import document, window
 import asyncio
 import json
+import random
+from stream_stats import ClockSync, StreamStats
 
 print("=== Robot Controller & OpenMV Camera ===")
 
@@ -8,6 +10,14 @@ print("=== Robot Controller & OpenMV Camera ===")
 ACCELERATION_RATE = 50
 UPDATE_INTERVAL = 50
 MAX_VALUE = 1000
+# How often to sync clocks with the camera and publish the receive stats
+# (latency, jitter, loss) on /camera/viewer_stats
+STATS_INTERVAL = 5000
+
+# The OpenMV can send raw JPEGs as binary WebSocket frames (BINARY_FRAMES in
+# main_code.py). The channel library only handles text messages, so a plain
+# browser WebSocket on the same channel picks up the binary ones.
+CHANNEL_URL = "wss://chrisrogers.pyscriptapps.com/talking-on-a-channel/api/channels/hackathon"
 
 # Import channel
 import channel
@@ -29,6 +39,13 @@ movement_timer = None
 image_count = 0
 selected_controller = "Controller_1"  # Default controller
 
+# Receive-side camera stats; the id tells our clock replies from other viewers'
+viewer_id = random.randint(0, 0xFFFFFF)
+camera_clock = ClockSync()
+stream_stats = StreamStats(camera_clock)
+camera_stats = None  # latest /camera/stats from the OpenMV
+viewer_stats = None  # latest report of stream_stats
+
 def update_display():
     """Update coordinate display"""
     try:
@@ -174,33 +191,188 @@ def update_camera_status(message):
     except:
         pass
 
+def setup_camera_view():
+    """Canvases the camera frames, changed tiles and ROI crops are painted on"""
+    window.eval('''
+    window.cameraView = (function() {
+        // Base64 string (JSON messages) or Blob (binary frames) -> promise of a drawable image
+        function decode(data) {
+            if (typeof data === "string") {
+                return new Promise(function(resolve, reject) {
+                    var img = new Image();
+                    img.onload = function() { resolve(img); };
+                    img.onerror = reject;
+                    img.src = "data:image/jpeg;base64," + data;
+                });
+            }
+            return createImageBitmap(data);
+        }
+        // Images decode side by side but are painted in the order they came in,
+        // so a keyframe that is slow to decode never covers newer tiles. One
+        // queue per canvas; a JPEG that fails to decode is skipped.
+        var queues = {};
+        function load(canvasId, data, done) {
+            var decoded = decode(data);
+            decoded.catch(function() {});  // reported below, in its turn
+            queues[canvasId] = (queues[canvasId] || Promise.resolve()).then(function() {
+                return decoded;
+            }).then(function(img) {
+                done(img);
+                if (img.close) img.close();
+            }).catch(function() {});
+        }
+        function draw(source, x, y, width, height) {
+            var canvas = document.getElementById("displayCanvas");
+            // A new frame size (or the first frame) resets the canvas
+            if (canvas.width != width || canvas.height != height) {
+                canvas.width = width;
+                canvas.height = height;
+            }
+            canvas.getContext("2d").drawImage(source, x, y);
+            canvas.style.display = "block";
+            var noImage = document.getElementById("noImageMessage");
+            if (noImage) noImage.style.display = "none";
+        }
+        function drawImage(data, x, y, width, height) {
+            load("displayCanvas", data, function(img) { draw(img, x, y, width || img.width, height || img.height); });
+        }
+        return {
+            // JPEG bytes from a binary frame; width 0 = full frame, use its own size
+            drawBlob: drawImage,
+            // Base64 JPEG from a JSON message
+            drawBase64: drawImage,
+            // Sharp crop of the full-size frame, shown under the overview
+            drawRoi: function(data, x, y, width, height) {
+                load("roiCanvas", data, function(img) {
+                    var canvas = document.getElementById("roiCanvas");
+                    canvas.width = img.width;
+                    canvas.height = img.height;
+                    canvas.getContext("2d").drawImage(img, 0, 0);
+                    document.getElementById("roiContainer").style.display = "flex";
+                    document.getElementById("roiCaption").textContent =
+                        "Close-up: " + width + "x" + height + " at (" + x + ", " + y + ")";
+                });
+            }
+        };
+    })();
+    ''')
+
+def record_frame(seq, sent_ms, size, arrival=None):
+    """Count a camera frame and feed the receive stats"""
+    global image_count
+    image_count += 1
+    if seq is not None and sent_ms is not None:
+        stream_stats.frame(seq, sent_ms, size, window.performance.now() if arrival is None else arrival)
+    if viewer_stats is None:
+        update_camera_status(f"Receiving live feed - Frame {image_count}")
+
 def grab_camera(data):
     """Display received camera image"""
-    global image_count
     try:
-        data_url = f"data:image/jpeg;base64,{data}"
-        img = document.getElementById("displayImage")
-        container = document.getElementById("imageContainer")
-        no_image_msg = document.getElementById("noImageMessage")
-        
-        # Hide the "no image" message
-        if no_image_msg:
-            no_image_msg.style.display = "none"
-        
-        # Set the image source and show it
-        img.src = data_url
-        img.style.display = "block"
-        
-        # Update image count and status
-        image_count += 1
-        update_camera_status(f"Receiving live feed - Frame {image_count}")
-        
+        window.cameraView.drawBase64(data, 0, 0, 0, 0)
     except Exception as e:
         print(f"Camera display error: {e}")
         update_camera_status("Error displaying camera feed")
 
+def grab_tiles(value):
+    """Paint the changed tiles of a frame over the last one"""
+    try:
+        for x, y, w, h, data in value['tiles']:
+            window.cameraView.drawBase64(data, x, y, value['width'], value['height'])
+    except Exception as e:
+        print(f"Camera tile error: {e}")
+
+def binary_frame_received(seq, sent_ms, size, arrival):
+    """Count a camera frame shown by the binary frame listener"""
+    record_frame(seq, sent_ms, size, arrival)
+
+def show_stats():
+    """Camera-side and receive-side stats in the status line"""
+    parts = []
+    if camera_stats:
+        parts.append(f"{camera_stats['framesize']} at quality {camera_stats['quality']}")
+    if viewer_stats:
+        parts.append(f"{viewer_stats['fps']} fps, {viewer_stats['kbps']} kbps")
+        if viewer_stats['latency_ms'] is not None:
+            parts.append(f"latency {viewer_stats['latency_ms']} ms (max {viewer_stats['latency_max_ms']})")
+        parts.append(f"jitter {viewer_stats['jitter_ms']} ms, lost {viewer_stats['loss_percent']}%")
+    elif camera_stats:
+        parts.append(f"{camera_stats['fps']} fps, {camera_stats['kbps']} kbps sent")
+    if parts:
+        update_camera_status("Live feed - " + ", ".join(parts))
+
+async def stats_loop():
+    """Sync clocks with the camera, then report the receive stats, every STATS_INTERVAL"""
+    global viewer_stats
+    while True:
+        try:
+            # Answered on /camera/clock/reply with the camera's clock
+            await signaling_channel.post('/camera/clock', {"id": viewer_id, "t0": window.performance.now()})
+            await asyncio.sleep(STATS_INTERVAL / 1000)
+            if stream_stats.frames:
+                viewer_stats = stream_stats.report(window.performance.now())
+                await signaling_channel.post('/camera/viewer_stats', viewer_stats)
+                show_stats()
+        except Exception as e:
+            print(f"Stats error: {e}")
+            await asyncio.sleep(STATS_INTERVAL / 1000)
+
+def setup_binary_camera():
+    """Show binary camera frames: 12-byte header + JPEG(s), straight into Blobs"""
+    window.pythonBinaryFrame = binary_frame_received
+    window.eval(f'''
+    (function() {{
+        var lastSeq = -1;
+        function connect() {{
+            var ws = new WebSocket("{CHANNEL_URL}");
+            ws.binaryType = "arraybuffer";
+            ws.onmessage = function(event) {{
+                // Text messages are handled by the channel library
+                if (typeof event.data === "string" || event.data.byteLength < 12) return;
+                // Header: magic "OM", topic id, flags, sequence, timestamp (big-endian)
+                var arrival = performance.now();
+                var view = new DataView(event.data);
+                var topic = view.getUint8(2);
+                if (view.getUint8(0) != 0x4F || view.getUint8(1) != 0x4D || topic < 1 || topic > 3) return;
+                var seq = view.getUint32(4);
+                if (topic == 3) {{
+                    // ROI crop: x, y, w, h in the full frame, then the JPEG; has its own pace
+                    var crop = new Blob([new Uint8Array(event.data, 20)], {{type: "image/jpeg"}});
+                    window.cameraView.drawRoi(crop, view.getUint16(12), view.getUint16(14),
+                                              view.getUint16(16), view.getUint16(18));
+                    return;
+                }}
+                // Skip frames that arrive late; a big jump back means the camera restarted
+                if (seq <= lastSeq && lastSeq - seq < 30) return;
+                lastSeq = seq;
+
+                if (topic == 1) {{
+                    // Whole frame
+                    var blob = new Blob([new Uint8Array(event.data, 12)], {{type: "image/jpeg"}});
+                    window.cameraView.drawBlob(blob, 0, 0, 0, 0);
+                }} else {{
+                    // Changed tiles: frame width, height, count, then x, y, w, h, length + JPEG each
+                    var width = view.getUint16(12), height = view.getUint16(14), count = view.getUint8(16);
+                    var pos = 17;
+                    for (var i = 0; i < count; i++) {{
+                        var x = view.getUint16(pos), y = view.getUint16(pos + 2);
+                        var length = view.getUint32(pos + 8);
+                        var tile = new Blob([new Uint8Array(event.data, pos + 12, length)], {{type: "image/jpeg"}});
+                        window.cameraView.drawBlob(tile, x, y, width, height);
+                        pos += 12 + length;
+                    }}
+                }}
+                window.pythonBinaryFrame(seq, view.getUint32(8), event.data.byteLength, arrival);
+            }};
+            ws.onclose = function() {{ setTimeout(connect, 2000); }};
+        }}
+        connect();
+    }})();
+    ''')
+
 def camera_callback(message):
     """Handle camera messages from OpenMV"""
+    global camera_stats
     try:
         if message['type'] == 'data' and 'payload' in message:
             payload_data = json.loads(message['payload'])
@@ -209,6 +381,17 @@ def camera_callback(message):
             
             if topic == '/camera' and value:
                 grab_camera(value)
+                record_frame(payload_data.get('seq'), payload_data.get('timestamp'), len(message['payload']))
+            elif topic == '/camera/tiles' and value:
+                grab_tiles(value)
+                record_frame(value.get('seq'), payload_data.get('timestamp'), len(message['payload']))
+            elif topic == '/camera/roi' and value:
+                window.cameraView.drawRoi(value, *payload_data.get('roi', [0, 0, 0, 0]))
+            elif topic == '/camera/clock/reply' and value and value.get('id') == viewer_id:
+                camera_clock.add(value['t0'], value['t1'], value['t2'], window.performance.now())
+            elif topic == '/camera/stats' and value:
+                camera_stats = value
+                show_stats()
                 
     except Exception as e:
         print(f"Camera callback error: {e}")
@@ -273,6 +456,9 @@ def initialize():
     
     # Set up the camera callback
     signaling_channel.callback = camera_callback
+    setup_camera_view()
+    setup_binary_camera()
+    asyncio.create_task(stats_loop())
     
     def delayed_setup():
         setup_events()
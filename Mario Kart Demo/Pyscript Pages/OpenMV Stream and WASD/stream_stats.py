@@ -0,0 +1,113 @@
+"""Receive-side statistics for the OpenMV camera stream.
+
+Every camera message carries a sequence number and the camera's
+time.ticks_ms(). StreamStats turns the arrivals into frames/s, bytes/s,
+arrival jitter, lost frames and latency. Latency needs the camera clock in
+browser time, which ClockSync estimates NTP-style from /camera/clock
+round trips.
+"""
+
+# The camera's time.ticks_ms() wraps at 2**30 on the OpenMV
+TICKS_PERIOD = 1 << 30
+
+def ticks_diff(end, start):
+    """end - start in camera ticks across the wrap, like time.ticks_diff()"""
+    return (end - start + TICKS_PERIOD // 2) % TICKS_PERIOD - TICKS_PERIOD // 2
+
+class ClockSync:
+    """Offset between the camera clock and the browser clock.
+
+    The browser sends t0, the camera answers with its clock at t1 (read)
+    and t2 (reply), and the answer arrives at t3. Then
+        offset = ((t1 - t0) + (t2 - t3)) / 2   (camera minus browser)
+        rtt    = (t3 - t0) - (t2 - t1)
+    The sample with the shortest round trip out of the last few is the
+    least skewed by queueing, so that one is used.
+    """
+    def __init__(self, keep=8):
+        self.keep = keep
+        self.samples = []  # (rtt, offset)
+        self.offset = None
+        self.rtt = None
+
+    def add(self, t0, t1, t2, t3):
+        rtt = (t3 - t0) - ticks_diff(t2, t1)
+        if rtt < 0:
+            return  # camera restarted or ticks wrapped mid-exchange
+        self.samples.append((rtt, ((t1 - t0) + (t2 - t3)) / 2))
+        self.samples = self.samples[-self.keep:]
+        self.rtt, self.offset = min(self.samples)
+
+    def to_camera(self, browser_ms):
+        """Browser time -> camera ticks (None until the first sample)"""
+        if self.offset is None:
+            return None
+        return (browser_ms + self.offset) % TICKS_PERIOD
+
+class StreamStats:
+    """Rolling stats of arriving frames, reported and reset by report()"""
+    def __init__(self, clock):
+        self.clock = clock
+        self.last_seq = None
+        self.last_arrival = None
+        self.last_sent = None
+        self.jitter = 0.0  # RFC 3550 interarrival jitter, ms
+        self.reset(None)
+
+    def reset(self, now):
+        self.start = now
+        self.frames = 0
+        self.bytes = 0
+        self.lost = 0
+        self.late = 0
+        self.latency_sum = 0.0
+        self.latency_count = 0
+        self.latency_max = 0.0
+
+    def frame(self, seq, sent_ms, size, now):
+        """Record one frame: camera sequence number and ticks, bytes received, browser ms"""
+        if self.start is None:
+            self.start = now
+        self.frames += 1
+        self.bytes += size
+
+        if self.last_seq is not None:
+            if seq > self.last_seq:
+                self.lost += seq - self.last_seq - 1
+            elif self.last_seq - seq < 30:
+                self.late += 1
+                return
+            # else: big jump back, the camera restarted
+        self.last_seq = seq
+
+        # Jitter: how much the spacing on arrival differs from the spacing on sending
+        if self.last_arrival is not None:
+            spread = (now - self.last_arrival) - ticks_diff(sent_ms, self.last_sent)
+            if abs(spread) < 10000:
+                self.jitter += (abs(spread) - self.jitter) / 16
+        self.last_arrival, self.last_sent = now, sent_ms
+
+        camera_now = self.clock.to_camera(now)
+        latency = None if camera_now is None else ticks_diff(camera_now, sent_ms)
+        if latency is not None and 0 <= latency < 60000:
+            self.latency_sum += latency
+            self.latency_count += 1
+            self.latency_max = max(self.latency_max, latency)
+
+    def report(self, now):
+        """Stats since the last report, for the status line and /camera/viewer_stats"""
+        elapsed = max(1, now - self.start) if self.start is not None else 1
+        expected = self.frames + self.lost
+        stats = {
+            "fps": round(self.frames * 1000 / elapsed, 1),
+            "kbps": int(self.bytes * 8 / elapsed),
+            "jitter_ms": round(self.jitter, 1),
+            "lost": self.lost,
+            "loss_percent": round(self.lost * 100 / expected, 1) if expected else 0.0,
+            "late": self.late,
+            "latency_ms": round(self.latency_sum / self.latency_count) if self.latency_count else None,
+            "latency_max_ms": round(self.latency_max) if self.latency_count else None,
+            "clock_rtt_ms": round(self.clock.rtt) if self.clock.rtt is not None else None
+        }
+        self.reset(now)
+        return stats